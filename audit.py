@@ -0,0 +1,80 @@
+import argparse
+import datetime
+import logging
+import os
+from pathlib import Path
+
+from epi_monitor.config.logging_config import setup_logging
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.offline import (
+    DEFAULT_OVERLAP_S,
+    DEFAULT_SEGMENT_S,
+    run_offline,
+    write_events_jsonl,
+)
+from epi_monitor.db.database import (
+    close_db_pool,
+    create_events_table,
+    initialize_db_pool,
+    insert_events,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    setup_logging()
+    parser = argparse.ArgumentParser(
+        description="Audit recorded footage for EPI compliance, in parallel."
+    )
+    parser.add_argument("video", type=Path, help="Recorded video file.")
+    parser.add_argument("--camera-id", default=SETTINGS.CAMERA_ID)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--segment-s", type=float, default=DEFAULT_SEGMENT_S)
+    parser.add_argument(
+        "--overlap-s",
+        type=float,
+        default=DEFAULT_OVERLAP_S,
+        help="Tracker warm-up before each segment, used to reconcile track IDs.",
+    )
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument(
+        "--start-time",
+        type=datetime.datetime.fromisoformat,
+        help="When the recording started (ISO 8601). Default: file mtime - duration.",
+    )
+    parser.add_argument("--snapshots", type=Path, help="Save event images here.")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output", type=Path, help="Write the events to a JSONL file.")
+    output.add_argument(
+        "--db", action="store_true", help="Insert the events into the events table."
+    )
+    args = parser.parse_args()
+
+    events = run_offline(
+        args.video,
+        args.camera_id,
+        args.workers,
+        segment_s=args.segment_s,
+        overlap_s=args.overlap_s,
+        device=args.device,
+        video_start=args.start_time,
+        snapshot_dir=args.snapshots,
+    )
+
+    if args.output:
+        write_events_jsonl(events, args.output)
+        logger.info(f"Events written to {args.output}")
+    else:
+        initialize_db_pool()
+        create_events_table()
+        try:
+            for start in range(0, len(events), SETTINGS.EVENT_BATCH_SIZE):
+                insert_events(events[start : start + SETTINGS.EVENT_BATCH_SIZE])
+            logger.info(f"Inserted {len(events)} events.")
+        finally:
+            close_db_pool()
+
+
+if __name__ == "__main__":
+    main()
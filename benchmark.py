@@ -0,0 +1,127 @@
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+from epi_monitor.benchmark.runner import (
+    BenchmarkConfig,
+    compare_to_baseline,
+    load_report,
+    run_benchmark,
+    save_report,
+)
+from epi_monitor.config.logging_config import setup_logging
+from epi_monitor.core.processing import EPI_MODES
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    setup_logging()
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark the full pipeline headless on synthetic videos, with stub "
+            "detectors, a local webhook and an in-memory database."
+        )
+    )
+    defaults = BenchmarkConfig()
+    parser.add_argument("--persons", type=int, default=defaults.persons)
+    parser.add_argument("--frames", type=int, default=defaults.frames)
+    parser.add_argument("--cameras", type=int, default=defaults.cameras)
+    parser.add_argument("--width", type=int, default=defaults.width)
+    parser.add_argument("--height", type=int, default=defaults.height)
+    parser.add_argument("--fps", type=int, default=defaults.fps)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--source", help="Benchmark this video instead of a synthetic one."
+    )
+    parser.add_argument(
+        "--real-models",
+        action="store_true",
+        help="Run the configured YOLO models on the CPU instead of the stubs.",
+    )
+    parser.add_argument(
+        "--stub-latency-ms",
+        type=float,
+        default=defaults.stub_latency_ms,
+        help="Fixed delay added to every stub model call.",
+    )
+    parser.add_argument(
+        "--webhook-delay-ms", type=float, default=defaults.webhook_delay_ms
+    )
+    parser.add_argument("--skip-frames", type=int, default=defaults.skip_frames)
+    parser.add_argument(
+        "--epi-cache-ttl-s", type=float, default=defaults.epi_cache_ttl_s
+    )
+    parser.add_argument(
+        "--epi-mode",
+        choices=EPI_MODES,
+        default=defaults.epi_mode,
+        help="Run the EPI model per person crop or once on the full frame.",
+    )
+    parser.add_argument(
+        "--motion-gate",
+        action="store_true",
+        help="Skip the models on static frames without tracks.",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Draw and encode the annotated output (times the draw stage).",
+    )
+    parser.add_argument("--output", type=Path, help="Write the report to this file.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail if the run regresses from this report."
+    )
+    parser.add_argument(
+        "--save-baseline", type=Path, help="Store the report as the new baseline."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed regression against the baseline, as a fraction.",
+    )
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        BenchmarkConfig(
+            persons=args.persons,
+            frames=args.frames,
+            cameras=args.cameras,
+            width=args.width,
+            height=args.height,
+            fps=args.fps,
+            seed=args.seed,
+            source=args.source,
+            real_models=args.real_models,
+            stub_latency_ms=args.stub_latency_ms,
+            webhook_delay_ms=args.webhook_delay_ms,
+            skip_frames=args.skip_frames,
+            epi_cache_ttl_s=args.epi_cache_ttl_s,
+            epi_mode=args.epi_mode,
+            motion_gate=args.motion_gate,
+            record=args.record,
+        )
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        save_report(report, args.output)
+    if args.save_baseline:
+        save_report(report, args.save_baseline)
+        logger.info(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            report, load_report(args.baseline), args.tolerance
+        )
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        logger.info("No regression against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
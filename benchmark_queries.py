@@ -0,0 +1,58 @@
+import argparse
+import json
+import logging
+from pathlib import Path
+
+from epi_monitor.benchmark.queries import QueryBenchmarkConfig, run_query_benchmark
+from epi_monitor.config.logging_config import setup_logging
+from epi_monitor.config.settings import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    setup_logging()
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark the event history queries on a seeded events table, in a "
+            "separate schema of the configured database."
+        )
+    )
+    defaults = QueryBenchmarkConfig()
+    parser.add_argument("--database-url", default=SETTINGS.DATABASE_URL)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(defaults.sizes),
+        help="Table sizes at which the queries are timed.",
+    )
+    parser.add_argument("--cameras", type=int, default=defaults.cameras)
+    parser.add_argument("--page-size", type=int, default=defaults.page_size)
+    parser.add_argument("--deep-page", type=int, default=defaults.deep_page)
+    parser.add_argument("--repeats", type=int, default=defaults.repeats)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the seeded schema afterwards."
+    )
+    parser.add_argument("--output", type=Path, help="Write the report to this file.")
+    args = parser.parse_args()
+
+    report = run_query_benchmark(
+        args.database_url,
+        QueryBenchmarkConfig(
+            sizes=tuple(args.sizes),
+            cameras=args.cameras,
+            page_size=args.page_size,
+            deep_page=args.deep_page,
+            repeats=args.repeats,
+            keep=args.keep,
+        ),
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import datetime
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import pool
+
+from epi_monitor.db import database
+from epi_monitor.db.queries import EventPage, explain_event_query, query_events
+from epi_monitor.utils.timing import summarize_ms
+
+logger = logging.getLogger(__name__)
+
+# Schema holding the seeded events, so the real table is never touched
+BENCH_SCHEMA = "epi_bench"
+
+
+@dataclass
+class QueryBenchmarkConfig:
+    """Parameters of an event history query benchmark run."""
+
+    sizes: Tuple[int, ...] = (10_000, 100_000, 1_000_000)  # Table sizes timed
+    cameras: int = 20
+    event_interval_s: int = 5  # Time between two seeded events
+    page_size: int = 50
+    deep_page: int = 20  # Page reached by following cursors
+    repeats: int = 50  # Timed runs of every query per table size
+    keep: bool = False  # Keep the seeded schema afterwards
+
+
+def _seed(conn: Any, start: int, stop: int, config: QueryBenchmarkConfig) -> None:
+    """
+    Inserts events start..stop-1, newest first, spread over the cameras. One
+    event in three misses the helmet, one in five the gloves.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO events (
+                track_id, present_epis, missing_epis, image_path,
+                notification_status, camera_id, event_timestamp
+            )
+            SELECT
+                g %% 1000,
+                ARRAY['Oculos de protecao'],
+                ARRAY_REMOVE(ARRAY[
+                    CASE WHEN g %% 3 = 0 THEN 'Capacete de seguranca' END,
+                    CASE WHEN g %% 5 = 0 THEN 'Luvas de protecao' END
+                ], NULL),
+                'events/bench_' || g || '.jpg',
+                'sent',
+                'cam_' || (g %% %s),
+                NOW() - g * %s * INTERVAL '1 second'
+            FROM generate_series(%s, %s) AS g;
+            """,
+            (config.cameras, config.event_interval_s, start, stop - 1),
+        )
+        cur.execute("ANALYZE events;")
+    conn.commit()
+
+
+def _time(query: Callable[[], EventPage], repeats: int) -> Dict[str, float]:
+    durations: List[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        query()
+        durations.append(time.perf_counter() - start)
+    return summarize_ms(durations)
+
+
+def _deep_cursor(filters: Dict[str, Any], pages: int) -> Optional[str]:
+    """Follows the cursors of a query to the start of page `pages + 1`."""
+    cursor = None
+    for _ in range(pages):
+        cursor = query_events(cursor=cursor, **filters).next_cursor
+        if cursor is None:
+            break
+    return cursor
+
+
+def _time_queries(config: QueryBenchmarkConfig) -> Dict[str, Any]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    week = {"since": now - datetime.timedelta(days=7), "until": now}
+    cases = {
+        "latest": {},
+        "camera_week": {"camera_id": "cam_0", **week},
+        "camera_week_missing_helmet": {
+            "camera_id": "cam_0",
+            "missing_epis": ["Capacete de seguranca"],
+            **week,
+        },
+        "missing_gloves": {"missing_epis": ["Luvas de protecao"]},
+    }
+    results: Dict[str, Any] = {}
+    for name, filters in cases.items():
+        filters = {**filters, "limit": config.page_size}
+        results[name] = _time(lambda: query_events(**filters), config.repeats)
+        deep_cursor = _deep_cursor(filters, config.deep_page)
+        if deep_cursor is not None:
+            results[f"{name}_page_{config.deep_page + 1}"] = _time(
+                lambda: query_events(cursor=deep_cursor, **filters), config.repeats
+            )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Plan of {name}:\n{explain_event_query(**filters)}")
+    return results
+
+
+def run_query_benchmark(
+    database_url: str, config: QueryBenchmarkConfig
+) -> Dict[str, Any]:
+    """
+    Seeds an events table in its own schema with growing numbers of rows and
+    times the event history queries at each size. With the indexes in place,
+    latency stays flat as the table grows, including for deep pages.
+    Returns the report: query statistics in milliseconds per table size.
+    """
+    with psycopg2.connect(database_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+            cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+    conn.close()
+
+    bench_pool = pool.ThreadedConnectionPool(
+        minconn=1,
+        maxconn=2,
+        dsn=database_url,
+        options=f"-c search_path={BENCH_SCHEMA}",
+    )
+    previous_pool, database.db_pool = database.db_pool, bench_pool
+    report: Dict[str, Any] = {"config": vars(config), "sizes": {}}
+    try:
+        database.create_events_table()
+        seeded = 0
+        for size in sorted(config.sizes):
+            start = time.perf_counter()
+            with database.get_db_connection() as conn:
+                _seed(conn, seeded, size, config)
+            seeded = size
+            logger.info(
+                f"Seeded {size} events in {time.perf_counter() - start:.1f}s, "
+                "timing queries..."
+            )
+            report["sizes"][str(size)] = _time_queries(config)
+    finally:
+        database.db_pool = previous_pool
+        if not config.keep:
+            conn = bench_pool.getconn()
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+            conn.commit()
+            bench_pool.putconn(conn)
+        bench_pool.closeall()
+    return report
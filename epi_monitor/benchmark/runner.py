@@ -0,0 +1,302 @@
+import json
+import logging
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+
+from epi_monitor.benchmark.stubs import (
+    SqliteEventWriter,
+    StubDetector,
+    StubTracker,
+    StubWebhookServer,
+)
+from epi_monitor.benchmark.synthetic import generate_video
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.capture import VideoSource
+from epi_monitor.core.detector import Detector
+from epi_monitor.core.epi_cache import EpiResultCache
+from epi_monitor.core.frame_processor import CameraState, build_frame_processor
+from epi_monitor.core.motion_gate import MotionGate
+from epi_monitor.core.output import OutputStage
+from epi_monitor.core.pipeline import END_OF_STREAM, Pipeline
+from epi_monitor.core.processing import EPI_MODE_CROP
+from epi_monitor.core.tracking import PersonTracker
+from epi_monitor.db import event_writer as event_writer_module
+from epi_monitor.notification.dispatcher import NotificationDispatcher
+from epi_monitor.notification.notifier import Notifier
+from epi_monitor.utils.event_logger import shutdown_snapshot_pool
+from epi_monitor.utils.timing import StageTimer, summarize_ms
+
+logger = logging.getLogger(__name__)
+
+# Metrics compared against a baseline: (path in the report, higher is better)
+REGRESSION_METRICS: Tuple[Tuple[str, bool], ...] = (
+    ("fps", True),
+    ("latency.p50_ms", False),
+    ("latency.p95_ms", False),
+    ("latency.p99_ms", False),
+    ("peak_rss_mb", False),
+)
+
+
+@dataclass
+class BenchmarkConfig:
+    """Everything that defines a benchmark run, stored in its report."""
+
+    persons: int = 4
+    frames: int = 300
+    cameras: int = 1
+    width: int = 1280
+    height: int = 720
+    fps: int = 30
+    seed: int = 0
+    source: Optional[str] = None  # Replaces the synthetic video when given
+    real_models: bool = False
+    stub_latency_ms: float = 0.0
+    webhook_delay_ms: float = 0.0
+    skip_frames: int = 2
+    epi_cache_ttl_s: float = 2.0
+    epi_mode: str = EPI_MODE_CROP
+    motion_gate: bool = False
+    record: bool = False  # Draw and encode the annotated output
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Returns the peak resident set size of the process, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _build_detectors(config: BenchmarkConfig) -> Tuple[Any, Any]:
+    if config.real_models:
+        return (
+            Detector(SETTINGS.MODEL_PERSON_PATH, device="cpu"),
+            Detector(SETTINGS.EPI_DETECTOR_PATH, device="cpu"),
+        )
+    latency_s = config.stub_latency_ms / 1000.0
+    return StubDetector("person", latency_s), StubDetector("epi", latency_s)
+
+
+def run_benchmark(config: BenchmarkConfig) -> Dict[str, Any]:
+    """
+    Runs the full pipeline (capture, inference, alerts, database writes) on
+    synthetic videos, headless, with a local webhook and an in-memory database.
+    Returns the report: throughput, end-to-end latency, per-stage times and
+    peak memory.
+    """
+    work_dir = tempfile.TemporaryDirectory(prefix="epi-benchmark-")
+    work_path = Path(work_dir.name)
+    SETTINGS.EVENT_LOG_DIR = work_path / "events"
+
+    # --- Sources ---
+    sources: List[str] = []
+    for i in range(config.cameras):
+        if config.source:
+            sources.append(config.source)
+            continue
+        video_path = generate_video(
+            work_path / f"synthetic_{i}.mp4",
+            config.persons,
+            config.frames,
+            width=config.width,
+            height=config.height,
+            fps=config.fps,
+            seed=config.seed + i,
+        )
+        sources.append(str(video_path))
+
+    # --- Models ---
+    person_detector, epi_detector = _build_detectors(config)
+
+    # --- Local stand-ins for the webhook and the database ---
+    timer = StageTimer()
+    webhook = StubWebhookServer(delay_s=config.webhook_delay_ms / 1000.0)
+    webhook.start()
+    dispatcher = NotificationDispatcher(
+        Notifier(webhook.url, timeout_s=SETTINGS.NOTIFICATION_TIMEOUT_S),
+        max_queue_size=SETTINGS.NOTIFICATION_QUEUE_SIZE,
+    )
+    writer = SqliteEventWriter(
+        work_path / "events_journal.jsonl",
+        timer=timer,
+        batch_size=SETTINGS.EVENT_BATCH_SIZE,
+        flush_interval_s=SETTINGS.EVENT_FLUSH_INTERVAL_S,
+        max_queue_size=SETTINGS.EVENT_QUEUE_SIZE,
+    )
+    writer.start()
+    event_writer_module.event_writer = writer
+
+    # --- Cameras ---
+    captures: Dict[str, VideoSource] = {}
+    cameras: Dict[str, CameraState] = {}
+    video_writers: Dict[str, cv2.VideoWriter] = {}
+    record_sizes: Dict[str, Tuple[int, int]] = {}
+    for i, source in enumerate(sources):
+        camera_id = f"BENCH-{i + 1:02d}"
+        cap = VideoSource(source, live=False, camera_id=camera_id)
+        if not cap.open():
+            raise RuntimeError(f"Could not open benchmark source: {source}")
+        captures[camera_id] = cap
+        fps = int(cap.get(cv2.CAP_PROP_FPS)) or config.fps
+        cameras[camera_id] = CameraState(
+            camera_id=camera_id,
+            tracker=(
+                PersonTracker(frame_rate=fps) if config.real_models else StubTracker()
+            ),
+            epi_cache=(
+                EpiResultCache(
+                    ttl_s=config.epi_cache_ttl_s,
+                    min_iou=SETTINGS.EPI_CACHE_MIN_IOU,
+                    max_scale_change=SETTINGS.EPI_CACHE_MAX_SCALE_CHANGE,
+                )
+                if config.epi_cache_ttl_s > 0 and config.epi_mode == EPI_MODE_CROP
+                else None
+            ),
+            frame_stride=max(0, config.skip_frames) + 1,
+            epi_mode=config.epi_mode,
+            motion_gate=MotionGate(camera_id=camera_id) if config.motion_gate else None,
+        )
+        if config.record:
+            record_sizes[camera_id] = (
+                int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            )
+            video_writers[camera_id] = cv2.VideoWriter(
+                str(work_path / f"output_{camera_id}.mp4"),
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                fps,
+                record_sizes[camera_id],
+            )
+
+    frame_processor = build_frame_processor(
+        person_detector, epi_detector, cameras, timer=timer
+    )
+    # Video files never drop frames, so every frame is measured
+    pipeline = Pipeline(
+        captures,
+        frame_processor.process_batch,
+        capture_queue_size=SETTINGS.CAPTURE_QUEUE_SIZE,
+        result_queue_size=SETTINGS.RESULT_QUEUE_SIZE,
+    )
+    output_stage = OutputStage(
+        dispatcher,
+        list(cameras),
+        frame_processor.epi_class_names,
+        video_writers=video_writers,
+        record_sizes=record_sizes,
+        headless=True,
+        timer=timer,
+    )
+
+    # --- Run ---
+    latencies: List[float] = []
+    logger.info(f"Running benchmark: {config}")
+    dispatcher.start()
+    start = time.perf_counter()
+    pipeline.start()
+    try:
+        while True:
+            result = pipeline.get_result()
+            if result is END_OF_STREAM:
+                break
+            if result is None:
+                continue
+            output_stage.handle(result)
+            latencies.append(time.time() - result.captured_at)
+        elapsed = time.perf_counter() - start
+    finally:
+        pipeline.stop()
+        dispatcher.stop()
+        shutdown_snapshot_pool()
+        event_writer_module.stop_event_writer()
+        webhook.stop()
+        for video_writer in video_writers.values():
+            video_writer.release()
+        for cap in captures.values():
+            cap.release()
+
+    report = {
+        "config": asdict(config),
+        "frames": len(latencies),
+        "elapsed_s": elapsed,
+        "fps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency": summarize_ms(latencies),
+        "stages": timer.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+        "notifications": dict(dispatcher.status_counts),
+        "webhook_requests": webhook.requests,
+        "events_written": writer.row_count(),
+        "track_states": {
+            camera_id: store.stats()
+            for camera_id, store in output_stage.track_states.items()
+        },
+        "crop_buckets": frame_processor.crop_buckets.stats(),
+        "motion_gate_skipped": {
+            camera_id: camera.motion_gate.skipped
+            for camera_id, camera in cameras.items()
+            if camera.motion_gate is not None
+        },
+        "epi_cache": {
+            camera_id: camera.epi_cache.stats()
+            for camera_id, camera in cameras.items()
+            if camera.epi_cache is not None
+        },
+    }
+    work_dir.cleanup()
+    return report
+
+
+def _metric(report: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = report
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_to_baseline(
+    report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """
+    Returns a message for every metric that is worse than the baseline by
+    more than `tolerance` (a fraction, 0.1 = 10%). Empty means no regression.
+    """
+    if report.get("config") != baseline.get("config"):
+        logger.warning("Benchmark config differs from the baseline config.")
+
+    regressions: List[str] = []
+    for path, higher_is_better in REGRESSION_METRICS:
+        current, reference = _metric(report, path), _metric(baseline, path)
+        if current is None or not reference:
+            continue
+        change = (current - reference) / reference
+        if (higher_is_better and change < -tolerance) or (
+            not higher_is_better and change > tolerance
+        ):
+            regressions.append(
+                f"{path}: {current:.2f} vs baseline {reference:.2f} ({change:+.1%})"
+            )
+    return regressions
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_report(report: Dict[str, Any], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
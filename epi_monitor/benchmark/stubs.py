@@ -0,0 +1,268 @@
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from epi_monitor.benchmark.synthetic import BACKGROUND_COLOR, EPI_COLORS
+from epi_monitor.db.database import EVENT_COLUMNS, EventRow
+from epi_monitor.db.event_writer import EventWriter
+from epi_monitor.utils.box_utils import box_iou
+from epi_monitor.utils.timing import NULL_TIMER, NullTimer
+
+# Class maps of the stub models, named like the real ones
+STUB_PERSON_NAMES: Dict[int, str] = {0: "person"}
+STUB_EPI_NAMES: Dict[int, str] = {
+    **{i: name for i, name in enumerate(EPI_COLORS)},
+    len(EPI_COLORS): "Pessoa",
+}
+
+# Synthetic colours survive video compression only approximately
+COLOR_TOLERANCE: int = 40
+MIN_BLOB_AREA: int = 20
+
+
+# --- Detection results ---
+class StubBoxes:
+    """
+    Mimics ultralytics `Boxes`: a float array with one row per box, laid out as
+    [x1, y1, x2, y2, (track_id,) conf, cls]. `is_track` once tracked.
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = data.reshape(-1, data.shape[-1] if data.size else 6)
+        self.is_track = self.data.shape[1] == 7
+        self.id = self.data[:, 4] if self.is_track else None
+
+    def cpu(self) -> "StubBoxes":
+        return self
+
+    def numpy(self) -> "StubBoxes":
+        return self
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class StubResult:
+    """Mimics an ultralytics `Results` object."""
+
+    def __init__(self, boxes: List[List[float]], orig_img: np.ndarray):
+        self.boxes = StubBoxes(np.array(boxes, dtype=np.float32))
+        self.orig_img = orig_img
+
+
+# --- Models ---
+def _color_mask(image: np.ndarray, color: Tuple[int, int, int]) -> np.ndarray:
+    lower = np.clip(np.array(color) - COLOR_TOLERANCE, 0, 255).astype(np.uint8)
+    upper = np.clip(np.array(color) + COLOR_TOLERANCE, 0, 255).astype(np.uint8)
+    return cv2.inRange(image, lower, upper)
+
+
+def _blobs(mask: np.ndarray) -> List[List[float]]:
+    """Returns the [x1, y1, x2, y2] boxes of the connected blobs of a mask."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    boxes: List[List[float]] = []
+    for x, y, w, h, area in stats[1:count]:
+        if area >= MIN_BLOB_AREA:
+            boxes.append([float(x), float(y), float(x + w), float(y + h)])
+    return boxes
+
+
+class StubDetector:
+    """
+    Deterministic stand-in for `Detector` on synthetic videos.
+    The "person" model returns every blob that differs from the background;
+    the "epi" model returns one box per blob of an EPI colour, so it works on
+    person crops and on full frames alike.
+    `latency_s` adds a fixed delay per call to emulate the cost of a model.
+    """
+
+    def __init__(self, kind: str, latency_s: float = 0.0):
+        if kind not in ("person", "epi"):
+            raise ValueError(f"Unknown stub detector kind '{kind}'")
+        self.kind = kind
+        self.latency_s = latency_s
+        # Same shape as `Detector.model`, where the class names are looked up
+        self.model = SimpleNamespace(
+            names=STUB_PERSON_NAMES if kind == "person" else STUB_EPI_NAMES
+        )
+
+    def detect(self, frame: np.ndarray, conf: float) -> List[StubResult]:
+        return self.detect_batch([frame], conf)
+
+    def detect_batch(
+        self, frames: List[np.ndarray], conf: float, imgsz: Optional[int] = None
+    ) -> List[StubResult]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        detect = self._detect_persons if self.kind == "person" else self._detect_epis
+        return [StubResult(detect(frame), frame) for frame in frames]
+
+    def _detect_persons(self, frame: np.ndarray) -> List[List[float]]:
+        diff = cv2.absdiff(frame, np.array(BACKGROUND_COLOR, dtype=np.uint8))
+        mask = (diff.max(axis=2) > COLOR_TOLERANCE).astype(np.uint8)
+        return [[*box, 0.9, 0.0] for box in _blobs(mask)]
+
+    def _detect_epis(self, crop: np.ndarray) -> List[List[float]]:
+        boxes: List[List[float]] = []
+        for class_id, name in enumerate(EPI_COLORS):
+            for blob in _blobs(_color_mask(crop, EPI_COLORS[name])):
+                boxes.append([*blob, 0.9, float(class_id)])
+        return boxes
+
+
+class StubTracker:
+    """
+    Stand-in for `PersonTracker`: greedy IoU matching against the boxes of the
+    previous frame. Good enough for non-overlapping synthetic persons.
+    """
+
+    def __init__(self, min_iou: float = 0.3):
+        self.min_iou = min_iou
+        self._tracks: Dict[int, List[float]] = {}
+        self._next_id = 1
+
+    def update(self, result: StubResult) -> StubResult:
+        boxes = result.boxes.data.tolist()
+        if not boxes:
+            self._tracks = {}
+            return result
+
+        candidates = sorted(
+            (
+                (box_iou(box[:4], track_box), track_id, i)
+                for track_id, track_box in self._tracks.items()
+                for i, box in enumerate(boxes)
+            ),
+            reverse=True,
+        )
+        assigned: Dict[int, int] = {}
+        used_tracks = set()
+        for iou, track_id, i in candidates:
+            if iou < self.min_iou:
+                break
+            if i in assigned or track_id in used_tracks:
+                continue
+            assigned[i] = track_id
+            used_tracks.add(track_id)
+        for i in range(len(boxes)):
+            if i not in assigned:
+                assigned[i] = self._next_id
+                self._next_id += 1
+
+        self._tracks = {assigned[i]: box[:4] for i, box in enumerate(boxes)}
+        tracked = [
+            [*box[:4], float(assigned[i]), *box[4:]] for i, box in enumerate(boxes)
+        ]
+        return StubResult(tracked, result.orig_img)
+
+
+# --- Services ---
+# (status code, headers) of a scripted webhook response
+StubResponse = Tuple[int, Dict[str, str]]
+
+
+class StubWebhookServer:
+    """
+    Local HTTP server standing in for the Discord webhook. Answers every POST
+    after an optional delay and counts the requests it received, with their
+    arrival times. The first requests get the scripted `responses` in order
+    (e.g. 429 with Retry-After, 503); the others are accepted with 204.
+    """
+
+    def __init__(
+        self, delay_s: float = 0.0, responses: Optional[List[StubResponse]] = None
+    ):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server._lock:
+                    server.requests += 1
+                    server.request_times.append(time.monotonic())
+                    status, headers = (
+                        server._responses.pop(0) if server._responses else (204, {})
+                    )
+                if delay_s:
+                    time.sleep(delay_s)
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                except OSError:
+                    pass  # The client timed out and went away
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.requests: int = 0
+        self.request_times: List[float] = []  # time.monotonic() of every request
+        self._responses: List[StubResponse] = list(responses or [])
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="stub-webhook", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/webhook"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class SqliteEventWriter(EventWriter):
+    """
+    `EventWriter` that inserts its batches into an in-memory SQLite database
+    instead of PostgreSQL, timing every flush as the "db" stage.
+    Batching, queueing and shutdown behave exactly like the real writer.
+    """
+
+    def __init__(self, journal_path: Path, timer: NullTimer = NULL_TIMER, **kwargs):
+        super().__init__(journal_path, **kwargs)
+        self.timer = timer
+        self._db_lock = threading.Lock()
+        self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self._connection.execute(f"CREATE TABLE events ({', '.join(EVENT_COLUMNS)})")
+
+    def _flush(self, batch: List[EventRow]) -> None:
+        if not batch:
+            return
+        start = time.perf_counter()
+        rows = [
+            tuple(
+                json.dumps(row.get(column))
+                if isinstance(row.get(column), list)
+                else row.get(column)
+                for column in EVENT_COLUMNS
+            )
+            for row in batch
+        ]
+        placeholders = ", ".join("?" for _ in EVENT_COLUMNS)
+        with self._db_lock:
+            self._connection.executemany(
+                f"INSERT INTO events VALUES ({placeholders})", rows
+            )
+            self._connection.commit()
+        self.written += len(batch)
+        self.timer.record("db", time.perf_counter() - start)
+
+    def row_count(self) -> int:
+        with self._db_lock:
+            return self._connection.execute("SELECT COUNT(*) FROM events").fetchone()[0]
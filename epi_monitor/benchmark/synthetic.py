@@ -0,0 +1,143 @@
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+# BGR colours painted on the synthetic frames. The stub detectors look for
+# exactly these colours, so the scene and the detectors must agree on them.
+BACKGROUND_COLOR: Tuple[int, int, int] = (60, 60, 60)
+PERSON_COLOR: Tuple[int, int, int] = (200, 90, 40)
+EPI_COLORS: Dict[str, Tuple[int, int, int]] = {
+    "Capacete de seguranca": (0, 220, 255),
+    "Oculos de protecao": (255, 0, 255),
+    "Luvas de protecao": (0, 255, 0),
+}
+
+
+@dataclass
+class SyntheticPerson:
+    """A rectangle bouncing inside its own grid cell, wearing some EPIs."""
+
+    x: float
+    y: float
+    vx: float
+    vy: float
+    width: int
+    height: int
+    cell: Tuple[int, int, int, int]  # x1, y1, x2, y2 the person stays within
+    epis: List[str]
+
+    def step(self) -> None:
+        cx1, cy1, cx2, cy2 = self.cell
+        self.x += self.vx
+        self.y += self.vy
+        if self.x < cx1 or self.x + self.width > cx2:
+            self.vx = -self.vx
+            self.x = min(max(self.x, cx1), cx2 - self.width)
+        if self.y < cy1 or self.y + self.height > cy2:
+            self.vy = -self.vy
+            self.y = min(max(self.y, cy1), cy2 - self.height)
+
+    def box(self) -> Tuple[int, int, int, int]:
+        x1, y1 = int(self.x), int(self.y)
+        return x1, y1, x1 + self.width, y1 + self.height
+
+
+def _epi_patches(
+    box: Tuple[int, int, int, int],
+) -> Dict[str, Tuple[int, int, int, int]]:
+    """Where each EPI is painted on a person: helmet on top, then glasses, gloves."""
+    x1, y1, x2, y2 = box
+    w, h = x2 - x1, y2 - y1
+    return {
+        "Capacete de seguranca": (x1 + w // 5, y1, x2 - w // 5, y1 + h // 8),
+        "Oculos de protecao": (x1 + w // 4, y1 + h // 6, x2 - w // 4, y1 + h // 4),
+        "Luvas de protecao": (x1, y1 + h // 2, x1 + w // 4, y1 + h // 2 + h // 8),
+    }
+
+
+def create_persons(
+    num_persons: int, width: int, height: int, seed: int = 0
+) -> List[SyntheticPerson]:
+    """
+    Places the persons on a grid, one per cell, so that they never overlap.
+    Every third person misses one EPI, which keeps the alert path busy.
+    """
+    rng = np.random.default_rng(seed)
+    cols = max(1, math.ceil(math.sqrt(num_persons)))
+    rows = max(1, math.ceil(num_persons / cols))
+    cell_w, cell_h = width // cols, height // rows
+    epi_names = list(EPI_COLORS)
+
+    persons: List[SyntheticPerson] = []
+    for i in range(num_persons):
+        col, row = i % cols, i // cols
+        cell = (col * cell_w, row * cell_h, (col + 1) * cell_w, (row + 1) * cell_h)
+        person_w = max(16, int(cell_w * 0.3))
+        person_h = max(32, int(cell_h * 0.7))
+        epis = list(epi_names)
+        if i % 3 == 2:
+            epis.remove(epi_names[i % len(epi_names)])
+        persons.append(
+            SyntheticPerson(
+                x=cell[0] + rng.uniform(0, cell_w - person_w),
+                y=cell[1] + rng.uniform(0, cell_h - person_h),
+                vx=rng.uniform(-4, 4),
+                vy=rng.uniform(-2, 2),
+                width=person_w,
+                height=person_h,
+                cell=cell,
+                epis=epis,
+            )
+        )
+    return persons
+
+
+def render_frame(
+    persons: List[SyntheticPerson], width: int, height: int
+) -> np.ndarray:
+    """Draws the persons and their EPIs on a flat background."""
+    frame = np.full((height, width, 3), BACKGROUND_COLOR, dtype=np.uint8)
+    for person in persons:
+        x1, y1, x2, y2 = person.box()
+        cv2.rectangle(frame, (x1, y1), (x2, y2), PERSON_COLOR, -1)
+        patches = _epi_patches((x1, y1, x2, y2))
+        for epi in person.epis:
+            px1, py1, px2, py2 = patches[epi]
+            cv2.rectangle(frame, (px1, py1), (px2, py2), EPI_COLORS[epi], -1)
+    return frame
+
+
+def generate_video(
+    path: Path,
+    num_persons: int,
+    num_frames: int,
+    width: int = 1280,
+    height: int = 720,
+    fps: int = 30,
+    seed: int = 0,
+) -> Path:
+    """
+    Writes a synthetic video of `num_persons` moving persons. The same seed
+    always produces the same video, so benchmark runs are comparable.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = cv2.VideoWriter(
+        str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+    )
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open video writer for {path}")
+
+    persons = create_persons(num_persons, width, height, seed)
+    try:
+        for _ in range(num_frames):
+            writer.write(render_frame(persons, width, height))
+            for person in persons:
+                person.step()
+    finally:
+        writer.release()
+    return path
@@ -0,0 +1,52 @@
+import json
+from pathlib import Path
+from typing import List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from epi_monitor.config.settings import SETTINGS
+
+
+class ZoneConfig(BaseModel):
+    """
+    A polygon, in pixels of the camera frame, where PPE is required. Persons
+    are in the zone when the bottom centre of their box (their feet) is.
+    """
+
+    name: str
+    polygon: List[Tuple[int, int]] = Field(min_length=3)
+    required_ppe: Optional[List[str]] = None  # Default: REQUIRED_PPE
+
+
+class CameraConfig(BaseModel):
+    """
+    Validates the settings of a single camera.
+    """
+
+    camera_id: str
+    source: str
+    epi_mode: Optional[Literal["crop", "full_frame"]] = None  # Default: EPI_MODE
+    # Without zones the whole frame is checked against REQUIRED_PPE
+    zones: List[ZoneConfig] = []
+
+
+def load_camera_configs() -> List[CameraConfig]:
+    """
+    Loads the list of cameras from the JSON file at CAMERAS_CONFIG_PATH, e.g.:
+        [{"camera_id": "CAM-01", "source": "rtsp://..."},
+         {"camera_id": "CAM-02", "source": "videos_test/02.mp4"}]
+    Falls back to the single camera defined by CAMERA_ID and VIDEO_SOURCE.
+    """
+    if SETTINGS.CAMERAS_CONFIG_PATH is None:
+        return [
+            CameraConfig(
+                camera_id=SETTINGS.CAMERA_ID, source=str(SETTINGS.VIDEO_SOURCE)
+            )
+        ]
+
+    raw_cameras = json.loads(Path(SETTINGS.CAMERAS_CONFIG_PATH).read_text("utf-8"))
+    cameras = [CameraConfig.model_validate(raw) for raw in raw_cameras]
+    camera_ids = [camera.camera_id for camera in cameras]
+    if len(set(camera_ids)) != len(camera_ids):
+        raise ValueError(f"Duplicate camera IDs in {SETTINGS.CAMERAS_CONFIG_PATH}")
+    return cameras
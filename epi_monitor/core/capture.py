@@ -0,0 +1,145 @@
+import logging
+import random
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from epi_monitor.utils.metrics import CAPTURE_RECONNECTS
+
+logger = logging.getLogger(__name__)
+
+
+class VideoSource:
+    """
+    A camera or video file behind the capture stage, with the interface of
+    cv2.VideoCapture (read, get, isOpened, release).
+    Live sources ask OpenCV to buffer a single frame, so a slow reader never
+    lags seconds behind the camera, and are reopened with exponential backoff
+    when the stream is lost. Video files are never reopened: the end of the
+    file is the end of the stream.
+    The capture thread reads and reconnects while the main thread may release
+    the source. The lock only guards swapping the underlying capture, never a
+    blocking read or open: a release during a read is left to the reader, which
+    closes the capture once its read returns. A released source never reopens.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        live: bool,
+        camera_id: str = "default",
+        reconnect_initial_s: float = 1.0,
+        reconnect_max_s: float = 30.0,
+        max_reconnect_attempts: int = 0,
+    ):
+        self.source = source
+        self.live = live
+        self.camera_id = camera_id
+        self.reconnect_initial_s = reconnect_initial_s
+        self.reconnect_max_s = max(reconnect_initial_s, reconnect_max_s)
+        self.max_reconnect_attempts = max_reconnect_attempts  # 0 retries forever
+        self.reconnects: int = 0
+        self._reconnects = CAPTURE_RECONNECTS.labels(camera_id)
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._lock = threading.Lock()
+        self._released = False
+        self._reading = False  # A read is in progress outside the lock
+
+    def open(self) -> bool:
+        """
+        Opens the source. Returns False when it cannot be opened or was
+        released.
+        """
+        with self._lock:
+            if self._released:
+                return False
+            self._close_capture()
+        source = int(self.source) if self.source.isdigit() else self.source
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        if self.live:
+            # Not every backend honours it; the capture stage reads continuously
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        with self._lock:
+            if self._released:
+                cap.release()
+                return False
+            self._close_capture()
+            self._cap = cap
+        return True
+
+    def isOpened(self) -> bool:
+        with self._lock:
+            return self._cap is not None and self._cap.isOpened()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        with self._lock:
+            cap = self._cap
+            if cap is None or self._released:
+                return False, None
+            self._reading = True
+        try:
+            return cap.read()
+        finally:
+            with self._lock:
+                self._reading = False
+                if self._released:
+                    self._close_capture()
+
+    def get(self, prop_id: int) -> float:
+        with self._lock:
+            return self._cap.get(prop_id) if self._cap is not None else 0.0
+
+    def release(self) -> None:
+        """
+        Releases the source for good, without waiting for a read in progress:
+        the reader then closes the capture. A reconnect in progress gives up.
+        """
+        with self._lock:
+            self._released = True
+            if not self._reading:
+                self._close_capture()
+
+    def _close_capture(self) -> None:
+        """Releases the underlying capture. The lock must be held."""
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def reconnect(self, stop_event: threading.Event) -> bool:
+        """
+        Reopens a lost live stream, waiting between attempts from
+        `reconnect_initial_s`, doubled up to `reconnect_max_s`, with jitter so
+        that cameras behind the same recorder do not retry in lockstep.
+        Returns False for files, when `stop_event` is set, when the source
+        was released or when `max_reconnect_attempts` is exhausted.
+        """
+        if not self.live:
+            return False
+        with self._lock:
+            self._close_capture()
+        delay = self.reconnect_initial_s
+        attempt = 0
+        while not self.max_reconnect_attempts or attempt < self.max_reconnect_attempts:
+            attempt += 1
+            wait = delay * random.uniform(0.8, 1.2)
+            logger.warning(
+                f"Stream lost for camera {self.camera_id}, reconnecting in "
+                f"{wait:.1f}s (attempt {attempt})."
+            )
+            if stop_event.wait(wait) or self._released:
+                return False
+            if self.open():
+                self.reconnects += 1
+                self._reconnects.inc()
+                logger.info(f"Camera {self.camera_id} reconnected.")
+                return True
+            delay = min(delay * 2, self.reconnect_max_s)
+        logger.error(
+            f"Could not reconnect camera {self.camera_id} after {attempt} attempts."
+        )
+        return False
@@ -0,0 +1,74 @@
+from typing import Any, Dict, Optional, Sequence
+
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.utils.metrics import EPI_BUCKET_DURATION, EPI_CROPS
+
+# YOLO input sizes must be multiples of the model stride
+MODEL_STRIDE: int = 32
+
+
+class CropBuckets:
+    """
+    Inference sizes for stage-2 person crops. Each crop is letterboxed to the
+    smallest bucket holding its longest side (the largest bucket for bigger
+    crops), so distant workers are not upscaled into a full-size forward pass.
+    Crops shorter than `min_height` are too small to evaluate reliably and are
+    not sent to the model at all. Keeps per-bucket counts and inference times.
+    """
+
+    def __init__(self, sizes: Sequence[int], min_height: int = 0):
+        if not sizes:
+            raise ValueError("At least one EPI image size bucket is required")
+        self.sizes = sorted(
+            {-(-size // MODEL_STRIDE) * MODEL_STRIDE for size in sizes}
+        )
+        self.min_height = min_height
+        self.too_small: int = 0
+        self.crops: Dict[int, int] = {size: 0 for size in self.sizes}
+        self.batches: Dict[int, int] = {size: 0 for size in self.sizes}
+        self.seconds: Dict[int, float] = {size: 0.0 for size in self.sizes}
+        self._crop_counters = {size: EPI_CROPS.labels(str(size)) for size in self.sizes}
+        self._too_small_counter = EPI_CROPS.labels("too_small")
+        self._durations = {
+            size: EPI_BUCKET_DURATION.labels(str(size)) for size in self.sizes
+        }
+
+    def select(self, height: int, width: int) -> Optional[int]:
+        """Returns the inference size of a crop, or None if it is too small."""
+        if height < self.min_height:
+            self.too_small += 1
+            self._too_small_counter.inc()
+            return None
+        longest = max(height, width)
+        size = next((size for size in self.sizes if size >= longest), self.sizes[-1])
+        self.crops[size] += 1
+        self._crop_counters[size].inc()
+        return size
+
+    def record(self, size: int, seconds: float) -> None:
+        """Records the duration of one inference batch of the bucket."""
+        self.batches[size] += 1
+        self.seconds[size] += seconds
+        self._durations[size].observe(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "too_small": self.too_small,
+            "buckets": {
+                str(size): {
+                    "crops": self.crops[size],
+                    "batches": self.batches[size],
+                    "mean_batch_ms": (
+                        self.seconds[size] / self.batches[size] * 1000.0
+                        if self.batches[size]
+                        else 0.0
+                    ),
+                }
+                for size in self.sizes
+            },
+        }
+
+
+def build_crop_buckets() -> CropBuckets:
+    """Returns the crop buckets configured in the settings."""
+    return CropBuckets(SETTINGS.EPI_IMG_SIZE_BUCKETS, SETTINGS.EPI_MIN_CROP_HEIGHT)
@@ -0,0 +1,54 @@
+from typing import Any, List, Tuple
+
+import numpy as np
+
+# One row per detection. Person rows carry their track ID, EPI rows NO_TRACK.
+DETECTION_DTYPE = np.dtype(
+    [
+        ("box", np.int32, (4,)),  # x1, y1, x2, y2 in frame coordinates
+        ("confidence", np.float32),
+        ("class_id", np.int32),
+        ("track_id", np.int32),
+    ]
+)
+NO_TRACK: int = -1
+
+# Structured array of DETECTION_DTYPE
+Detections = np.ndarray
+
+# Whether a person's compliance was checked. Only evaluated persons have
+# meaningful missing/present lists; the others have empty ones.
+STATUS_EVALUATED = "evaluated"
+STATUS_TOO_SMALL = "too_small"  # Crop too small (or empty) to evaluate
+STATUS_NO_ZONE = "no_zone"  # Outside every zone of the camera, never checked
+
+# (detections, missing EPIs, present EPIs, track ID, status); row 0 is the person
+TrackResult = Tuple[Detections, List[str], List[str], int, str]
+
+
+def empty_detections() -> Detections:
+    return np.empty(0, dtype=DETECTION_DTYPE)
+
+
+def detections_from_boxes(
+    boxes: Any,
+    origin: Tuple[int, int] = (0, 0),
+    scale: float = 1.0,
+    pad: Tuple[int, int] = (0, 0),
+) -> Detections:
+    """
+    Converts the boxes of a YOLO result with a single device-to-host transfer.
+    Box rows are [x1, y1, x2, y2, (track_id,) conf, cls]. `scale` and `pad`
+    undo a letterbox applied to a crop, and `origin` is the top-left corner of
+    the crop in the frame; the mapping is applied to all boxes at once.
+    """
+    data = boxes.cpu().numpy().data
+    pad_xyxy = np.array((*pad, *pad), dtype=np.float32)
+    origin_xyxy = np.array((*origin, *origin), dtype=np.float32)
+
+    detections = np.empty(len(data), dtype=DETECTION_DTYPE)
+    detections["box"] = (data[:, :4] - pad_xyxy) / scale + origin_xyxy
+    detections["confidence"] = data[:, -2]
+    detections["class_id"] = data[:, -1]
+    detections["track_id"] = data[:, 4] if data.shape[1] == 7 else NO_TRACK
+    return detections
@@ -1,19 +1,171 @@
+import logging
+import threading
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, List, Optional, Sequence, Union
 
 import numpy as np
-from ultralytics import YOLO
+
+from epi_monitor.utils.metrics import INFERENCE_DURATION
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx", "openvino")
+PRECISIONS = ("fp32", "fp16", "int8")
+# Side of the dummy frames of a warmup pass when the model input size is unset
+WARMUP_SIZE: int = 640
+
+Device = Union[int, str]
+
+
+def select_device(device: str = "auto") -> Device:
+    """
+    Resolves the inference device. "auto" picks the first GPU when CUDA is
+    available and the CPU otherwise; GPU indices may be given as "0", "1", ...
+    """
+    if device == "auto":
+        import torch
+
+        return 0 if torch.cuda.is_available() else "cpu"
+    return int(device) if device.isdigit() else device
+
+
+def resolve_model_path(model_path: Path, backend: str, precision: str) -> Path:
+    """
+    Returns the path of the model file for a backend and precision, following
+    the naming used by `epi_monitor.core.export`:
+        torch:    best.pt
+        onnx:     best.onnx, best_fp16.onnx, best_int8.onnx
+        openvino: best_openvino_model/, best_fp16_openvino_model/, ...
+    """
+    model_path = Path(model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Use one of {BACKENDS}")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Use one of {PRECISIONS}")
+    if backend == "torch":
+        return model_path
+
+    suffix = "" if precision == "fp32" else f"_{precision}"
+    if backend == "onnx":
+        return model_path.with_name(f"{model_path.stem}{suffix}.onnx")
+    return model_path.with_name(f"{model_path.stem}{suffix}_openvino_model")
 
 
 class Detector:
-    def __init__(self, model_path: Path):
+    def __init__(
+        self,
+        model_path: Path,
+        backend: str = "torch",
+        device: str = "auto",
+        precision: str = "fp32",
+        name: Optional[str] = None,
+    ):
         """
-        Initializes the detector with a YOLO model.
+        Initializes the detector with a YOLO model for the given backend.
+        Exported ONNX / OpenVINO models are looked up next to `model_path`.
+        `name` labels the inference latency metric (default: the model stem).
+        The model (and torch / ultralytics) is only loaded on first use, or by
+        an explicit `load` / `warmup`.
         """
-        self.model = YOLO(model_path)
+        if backend == "torch" and precision == "int8":
+            raise ValueError("int8 requires an exported onnx or openvino model.")
+        self.backend = backend
+        self.precision = precision
+        self.requested_device = device
+        self.model_path = resolve_model_path(model_path, backend, precision)
+        self.device: Optional[Device] = None  # Resolved when the model loads
+        self.half = False
+        self._model: Any = None
+        self._load_lock = threading.Lock()
+        self._latency = INFERENCE_DURATION.labels(name or Path(model_path).stem)
+        self.load_time_s: Optional[float] = None
+        self.warmup_time_s: Optional[float] = None
+
+    @property
+    def model(self) -> Any:
+        """The YOLO model, loaded on first access."""
+        if self._model is None:
+            self.load()
+        return self._model
+
+    def load(self) -> None:
+        """Imports ultralytics and loads the model. Safe to call concurrently."""
+        with self._load_lock:
+            if self._model is not None:
+                return
+            start = time.perf_counter()
+            from ultralytics import YOLO
+
+            self.device = select_device(self.requested_device)
+            if self.backend == "openvino" and self.device != "cpu":
+                logger.info("OpenVINO runs on the CPU. Ignoring the GPU device.")
+                self.device = "cpu"
+            # fp16 on torch is applied at inference time; exported models carry it
+            self.half = (
+                self.backend == "torch"
+                and self.precision == "fp16"
+                and self.device != "cpu"
+            )
+            logger.info(
+                f"Loading {self.model_path} ({self.backend}, {self.precision}) "
+                f"on device {self.device}"
+            )
+            self._model = YOLO(self.model_path, task="detect")
+            self.load_time_s = time.perf_counter() - start
+
+    def warmup(
+        self, sizes: Sequence[Optional[int]] = (None,), batch_size: int = 1
+    ) -> None:
+        """
+        Loads the model and runs one dummy inference per input size, so the
+        first real frames do not pay for lazy initialization (CUDA context,
+        kernel selection, runtime graph compilation). Not counted as latency.
+        """
+        model = self.model
+        start = time.perf_counter()
+        for size in sizes:
+            side = size or WARMUP_SIZE
+            frames = [np.zeros((side, side, 3), dtype=np.uint8)] * max(1, batch_size)
+            kwargs = {"imgsz": size} if size else {}
+            model(
+                frames,
+                conf=0.99,
+                device=self.device,
+                half=self.half,
+                verbose=False,
+                **kwargs,
+            )
+        self.warmup_time_s = time.perf_counter() - start
 
     def detect(self, frame: np.ndarray, conf: float) -> Any:
         """
         Performs object detection on a single frame with a given confidence threshold.
         """
-        return self.model(frame, conf=conf, device=0)
+        start = time.perf_counter()
+        results = self.model(
+            frame, conf=conf, device=self.device, half=self.half, verbose=False
+        )
+        self._latency.observe(time.perf_counter() - start)
+        return results
+
+    def detect_batch(
+        self, frames: List[np.ndarray], conf: float, imgsz: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Performs object detection on a batch of frames in a single forward pass.
+        Frames of different sizes are letterboxed to the model input size.
+        Returns one result per frame, in the same order.
+        """
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        start = time.perf_counter()
+        results = self.model(
+            frames,
+            conf=conf,
+            device=self.device,
+            half=self.half,
+            verbose=False,
+            **kwargs,
+        )
+        self._latency.observe(time.perf_counter() - start)
+        return results
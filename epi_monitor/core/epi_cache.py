@@ -0,0 +1,99 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from epi_monitor.core.detections import Detections
+from epi_monitor.utils.box_utils import box_area, box_iou
+
+
+@dataclass
+class CachedTrackResult:
+    """Last stage-2 result computed for a track."""
+
+    box: List[int]
+    epi_detections: Detections
+    missing_epis: List[str]
+    present_epis: List[str]
+    timestamp: float
+
+
+class EpiResultCache:
+    """
+    Per-track cache of EPI detections and compliance results.
+    A cached result is reused while it is younger than `ttl_s` and the person
+    box has not moved or changed size beyond the configured thresholds, so
+    stationary workers do not go through the EPI detector on every frame.
+    """
+
+    def __init__(self, ttl_s: float, min_iou: float, max_scale_change: float):
+        self.ttl_s = ttl_s
+        self.min_iou = min_iou
+        self.max_scale_change = max_scale_change
+        self._entries: Dict[int, CachedTrackResult] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(
+        self, track_id: int, box: List[int], now: Optional[float] = None
+    ) -> Optional[Tuple[Detections, List[str], List[str]]]:
+        """
+        Returns (epi_detections, missing, present) for the track if the cached
+        entry is still valid, with the EPI boxes shifted along with the person
+        box. Returns None on a miss (new track, expired, moved or rescaled).
+        """
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(track_id)
+        if entry is None or not self._is_valid(entry, box, now):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        dx, dy = box[0] - entry.box[0], box[1] - entry.box[1]
+        shifted = entry.epi_detections.copy()
+        shifted["box"] += (dx, dy, dx, dy)
+        return shifted, entry.missing_epis, entry.present_epis
+
+    def put(
+        self,
+        track_id: int,
+        box: List[int],
+        epi_detections: Detections,
+        missing_epis: List[str],
+        present_epis: List[str],
+        now: Optional[float] = None,
+    ) -> None:
+        """Stores a fresh stage-2 result for the track."""
+        self._entries[track_id] = CachedTrackResult(
+            box=list(box),
+            epi_detections=epi_detections,
+            missing_epis=missing_epis,
+            present_epis=present_epis,
+            timestamp=time.monotonic() if now is None else now,
+        )
+
+    def prune(self, active_track_ids: Iterable[int]) -> None:
+        """Drops the entries of tracks that are no longer being tracked."""
+        active = set(active_track_ids)
+        for track_id in [tid for tid in self._entries if tid not in active]:
+            del self._entries[track_id]
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the hit/miss counters and the current hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _is_valid(self, entry: CachedTrackResult, box: List[int], now: float) -> bool:
+        if now - entry.timestamp > self.ttl_s:
+            return False
+        if box_iou(entry.box, box) < self.min_iou:
+            return False
+        cached_area = box_area(entry.box)
+        if cached_area <= 0:
+            return False
+        scale_change = abs((box_area(box) / cached_area) ** 0.5 - 1.0)
+        return scale_change <= self.max_scale_change
@@ -1,4 +1,9 @@
-from typing import Any, Dict, List, Set, Tuple
+import logging
+from typing import Dict, List, Set, Tuple
+
+from epi_monitor.core.detections import Detections
+
+logger = logging.getLogger(__name__)
 
 
 class Evaluator:
@@ -7,13 +12,13 @@ class Evaluator:
         self.class_names: Dict[int, str] = class_names
 
     def check_compliance(
-        self, ppe_detections: List[Dict[str, Any]]
+        self, ppe_detections: Detections
     ) -> Tuple[List[str], List[str]]:
         """
         Checks compliance for a single person based on the EPIs detected on them.
         Returns a tuple containing (missing_ppe_names, worn_ppe_names).
         """
-        worn_ppe_ids = {det["class_id"] for det in ppe_detections}
+        worn_ppe_ids = set(ppe_detections["class_id"].tolist())
         missing_ppe_ids = self.required_ppe_ids - worn_ppe_ids
 
         # Convert IDs to names for logging and alerts
@@ -21,3 +26,16 @@ class Evaluator:
         missing_ppe_names = sorted([self.class_names[id] for id in missing_ppe_ids])
 
         return missing_ppe_names, worn_ppe_names
+
+
+def build_evaluator(required_ppe: List[str], class_names: Dict[int, str]) -> Evaluator:
+    """Builds an evaluator from EPI names, as named by the EPI model."""
+    unknown = set(required_ppe) - set(class_names.values())
+    if unknown:
+        logger.warning(f"Required EPIs unknown to the EPI model: {sorted(unknown)}")
+    return Evaluator(
+        required_ppe_ids=[
+            cid for cid, name in class_names.items() if name in required_ppe
+        ],
+        class_names=class_names,
+    )
@@ -0,0 +1,263 @@
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+
+from epi_monitor.core.detector import Detector, resolve_model_path, select_device
+from epi_monitor.utils.box_utils import box_iou
+from epi_monitor.utils.image_utils import letterbox
+
+logger = logging.getLogger(__name__)
+
+
+def sample_frames(source: str, count: int) -> List[np.ndarray]:
+    """Reads `count` frames spread evenly over a video file or live source."""
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open calibration source: {source}")
+
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, total // count) if total > 0 else 1
+    frames: List[np.ndarray] = []
+    frame_idx = 0
+    try:
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_idx % step == 0:
+                frames.append(frame)
+            frame_idx += 1
+    finally:
+        cap.release()
+    logger.info(f"Sampled {len(frames)} calibration frames from {source}")
+    return frames
+
+
+def person_crops(
+    frames: List[np.ndarray], person_model_path: Path, person_class_name: str
+) -> List[np.ndarray]:
+    """
+    Crops the persons found in the frames. The EPI model only ever sees person
+    crops, so it must be calibrated on crops rather than full frames.
+    """
+    detector = Detector(person_model_path)
+    person_class_id = next(
+        cid for cid, name in detector.model.names.items() if name == person_class_name
+    )
+    crops: List[np.ndarray] = []
+    for frame in frames:
+        for box in detector.detect(frame, conf=0.5)[0].boxes:
+            if int(box.cls) != person_class_id:
+                continue
+            x1, y1, x2, y2 = [int(i) for i in box.xyxy[0]]
+            crop = frame[y1:y2, x1:x2]
+            if crop.size:
+                crops.append(crop)
+    logger.info(f"Extracted {len(crops)} person crops for calibration")
+    return crops
+
+
+def _write_calibration_dataset(
+    images: List[np.ndarray], names: Dict[int, str], directory: Path
+) -> Path:
+    """Saves the images as a YOLO dataset and returns its data yaml."""
+    images_dir = directory / "images" / "val"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    for i, image in enumerate(images):
+        cv2.imwrite(str(images_dir / f"calib_{i:05d}.jpg"), image)
+
+    data_yaml = directory / "calibration.yaml"
+    data_yaml.write_text(
+        yaml.safe_dump(
+            {
+                "path": str(directory),
+                "train": "images/val",
+                "val": "images/val",
+                "names": dict(names),
+            }
+        )
+    )
+    return data_yaml
+
+
+class _OnnxCalibrationReader:
+    """Feeds letterboxed calibration images to onnxruntime's static quantizer."""
+
+    def __init__(self, images: List[np.ndarray], input_name: str, imgsz: int):
+        self._batches: Iterator[Dict[str, np.ndarray]] = (
+            {input_name: _to_input_tensor(image, imgsz)} for image in images
+        )
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        return next(self._batches, None)
+
+
+def _to_input_tensor(image: np.ndarray, imgsz: int) -> np.ndarray:
+    boxed, _, _ = letterbox(image, imgsz)
+    rgb = cv2.cvtColor(boxed, cv2.COLOR_BGR2RGB)
+    return np.ascontiguousarray(rgb.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def export_model(
+    model_path: Path,
+    backend: str,
+    precision: str,
+    imgsz: int,
+    calibration_images: Optional[List[np.ndarray]] = None,
+    device: str = "auto",
+) -> Path:
+    """
+    Exports a YOLO .pt model for the ONNX Runtime or OpenVINO backend and
+    returns the path expected by `Detector` for that backend and precision.
+    int8 models are calibrated on `calibration_images`. fp16 ONNX models are
+    exported on the GPU `device` (see `select_device`).
+    """
+    model_path = Path(model_path)
+    target = resolve_model_path(model_path, backend, precision)
+    if precision == "int8" and not calibration_images:
+        raise ValueError("int8 export requires calibration images.")
+
+    export_device: Any = "cpu"
+    if backend == "onnx" and precision == "fp16":
+        export_device = _export_gpu(device)
+
+    model = YOLO(model_path)
+    # Dynamic axes let the batched stage-2 path send several crops at once, at
+    # any of the EPI_IMG_SIZE_BUCKETS sizes
+    if backend == "openvino":
+        kwargs: Dict[str, Any] = {"half": precision == "fp16", "dynamic": True}
+        with tempfile.TemporaryDirectory() as tmp:
+            if precision == "int8":
+                kwargs["int8"] = True
+                kwargs["data"] = str(
+                    _write_calibration_dataset(
+                        calibration_images, model.names, Path(tmp)
+                    )
+                )
+            exported = Path(model.export(format="openvino", imgsz=imgsz, **kwargs))
+    elif backend == "onnx":
+        exported = Path(
+            model.export(
+                format="onnx",
+                imgsz=imgsz,
+                dynamic=True,
+                half=precision == "fp16",
+                device=export_device,
+            )
+        )
+        if precision == "int8":
+            exported = _quantize_onnx(exported, calibration_images, imgsz)
+    else:
+        raise ValueError(f"Nothing to export for backend '{backend}'.")
+
+    if exported.resolve() != target.resolve():
+        if target.is_dir():
+            shutil.rmtree(target)
+        elif target.exists():
+            target.unlink()
+        shutil.move(str(exported), str(target))
+    logger.info(f"Exported {model_path} -> {target}")
+    return target
+
+
+def _export_gpu(device: str) -> int:
+    """
+    Resolves the GPU an fp16 ONNX model is exported on: ultralytics only
+    exports half precision on CUDA. Raises ValueError without a usable GPU.
+    """
+    import torch
+
+    resolved = select_device(device)
+    if not isinstance(resolved, int) or not torch.cuda.is_available():
+        raise ValueError(
+            f"fp16 ONNX export needs a CUDA GPU, but INFERENCE_DEVICE is '{device}'"
+            f"{'' if torch.cuda.is_available() else ' and no GPU is available'}. "
+            "Export fp32 (or int8) instead, or run the export on a GPU machine."
+        )
+    if resolved >= torch.cuda.device_count():
+        raise ValueError(
+            f"fp16 ONNX export: GPU {resolved} does not exist, "
+            f"{torch.cuda.device_count()} available."
+        )
+    return resolved
+
+
+def _quantize_onnx(fp32_path: Path, images: List[np.ndarray], imgsz: int) -> Path:
+    import onnxruntime
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    session = onnxruntime.InferenceSession(
+        str(fp32_path), providers=["CPUExecutionProvider"]
+    )
+    input_name = session.get_inputs()[0].name
+    int8_path = fp32_path.with_name(f"{fp32_path.stem}_int8.onnx")
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        _OnnxCalibrationReader(images, input_name, imgsz),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    return int8_path
+
+
+def _as_rows(boxes: Any) -> List[Tuple[float, List[float], float]]:
+    """Returns (class, xyxy, confidence) rows for the boxes of a result."""
+    return list(zip(boxes.cls.tolist(), boxes.xyxy.tolist(), boxes.conf.tolist()))
+
+
+def compare_detectors(
+    reference: Detector,
+    candidate: Detector,
+    images: List[np.ndarray],
+    conf: float,
+    iou_threshold: float = 0.5,
+) -> Dict[str, float]:
+    """
+    Runs both detectors on the same images and matches their boxes per class.
+    Reports the match rate, mean IoU and the largest confidence difference,
+    which is what to look at before switching a camera to another backend.
+    """
+    matched = unmatched_ref = unmatched_cand = 0
+    ious: List[float] = []
+    conf_deltas: List[float] = []
+    for image in images:
+        ref = _as_rows(reference.detect(image, conf=conf)[0].boxes)
+        cand = _as_rows(candidate.detect(image, conf=conf)[0].boxes)
+        used = set()
+        for cls, box, score in ref:
+            best, best_iou = None, iou_threshold
+            for j, (cand_cls, cand_box, _) in enumerate(cand):
+                if j in used or cand_cls != cls:
+                    continue
+                iou = box_iou(box, cand_box)
+                if iou >= best_iou:
+                    best, best_iou = j, iou
+            if best is None:
+                unmatched_ref += 1
+                continue
+            used.add(best)
+            matched += 1
+            ious.append(best_iou)
+            conf_deltas.append(abs(score - cand[best][2]))
+        unmatched_cand += len(cand) - len(used)
+
+    total = matched + unmatched_ref + unmatched_cand
+    return {
+        "images": len(images),
+        "matched": matched,
+        "only_reference": unmatched_ref,
+        "only_candidate": unmatched_cand,
+        "match_rate": matched / total if total else 1.0,
+        "mean_iou": float(np.mean(ious)) if ious else 0.0,
+        "max_conf_delta": float(np.max(conf_deltas)) if conf_deltas else 0.0,
+    }
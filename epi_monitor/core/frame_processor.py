@@ -0,0 +1,293 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.detections import (
+    STATUS_NO_ZONE,
+    TrackResult,
+    detections_from_boxes,
+)
+from epi_monitor.core.crop_buckets import build_crop_buckets
+from epi_monitor.core.detector import Detector
+from epi_monitor.core.epi_cache import EpiResultCache
+from epi_monitor.core.evaluator import Evaluator, build_evaluator
+from epi_monitor.core.motion import BoxExtrapolator
+from epi_monitor.core.motion_gate import MotionGate
+from epi_monitor.core.pipeline import FramePacket, FrameResult
+from epi_monitor.core.processing import (
+    EPI_MODE_CROP,
+    EPI_MODE_FULL_FRAME,
+    EPI_MODES,
+    process_full_frame,
+    process_person_tracks,
+)
+from epi_monitor.core.tracking import PersonTracker
+from epi_monitor.core.zones import NO_ZONE, ZoneMap
+from epi_monitor.utils.timing import NULL_TIMER, NullTimer
+
+
+@dataclass
+class CameraState:
+    """
+    Per-camera state: tracker, motion model and EPI cache. Track IDs are only
+    unique within a camera, so none of this can be shared between cameras.
+    Full detection runs once every `frame_stride` processed frames; the frames
+    in between reuse the tracks, extrapolated with a constant-velocity model.
+    The cadence counts the frames that reached inference, not capture indices,
+    which skip whenever a live queue drops frames.
+    `epi_mode` selects per-crop or full-frame EPI detection (see processing.py);
+    the EPI cache only applies to the per-crop mode. With `zones`, only the
+    persons standing in a zone are checked, against the EPIs that zone requires.
+    With a `motion_gate`, keyframes of a static scene without tracks are skipped.
+    """
+
+    camera_id: str
+    tracker: PersonTracker
+    epi_cache: Optional[EpiResultCache] = None
+    frame_stride: int = 1
+    epi_mode: str = EPI_MODE_CROP
+    zones: Optional[ZoneMap] = None
+    motion_gate: Optional[MotionGate] = None
+    extrapolator: BoxExtrapolator = field(default_factory=BoxExtrapolator)
+    last_track_results: List[TrackResult] = field(default_factory=list)
+    frames_since_keyframe: int = 0  # Processed frames since the last keyframe
+
+
+class FrameProcessor:
+    """
+    Runs both detection stages for a set of cameras sharing the same models:
+    person detection (stage 1), batched across the cameras of a tick, then
+    per-camera tracking and EPI detection on every tracked person (stage 2).
+    Cameras in full-frame mode run the EPI detector on their whole keyframes
+    instead, batched across the cameras of a tick like stage 1.
+    """
+
+    def __init__(
+        self,
+        person_detector: Detector,
+        epi_detector: Detector,
+        evaluator: Evaluator,
+        person_class_id: int,
+        epi_class_names: Dict[int, str],
+        epi_model_person_class_id: int,
+        cameras: Dict[str, CameraState],
+        timer: NullTimer = NULL_TIMER,
+    ):
+        self.person_detector = person_detector
+        self.epi_detector = epi_detector
+        self.evaluator = evaluator
+        self.person_class_id = person_class_id
+        self.epi_class_names = epi_class_names
+        self.epi_model_person_class_id = epi_model_person_class_id
+        self.cameras = cameras
+        self.timer = timer
+        self.crop_buckets = build_crop_buckets()
+        for camera in cameras.values():
+            if camera.epi_mode not in EPI_MODES:
+                raise ValueError(
+                    f"Unknown EPI mode '{camera.epi_mode}' for {camera.camera_id}, "
+                    f"expected one of {EPI_MODES}"
+                )
+        # One evaluator per zone, in the order of the zones of each camera
+        self.zone_evaluators: Dict[str, List[Evaluator]] = {
+            camera_id: [
+                build_evaluator(
+                    (
+                        zone.required_ppe
+                        if zone.required_ppe is not None
+                        else SETTINGS.REQUIRED_PPE
+                    ),
+                    epi_class_names,
+                )
+                for zone in camera.zones.zones
+            ]
+            for camera_id, camera in cameras.items()
+            if camera.zones is not None
+        }
+
+    def process_batch(self, packets: List[FramePacket]) -> List[FrameResult]:
+        """
+        Processes one frame per camera. All keyframes of the tick go through a
+        single stage-1 call; the other frames are extrapolated, which yields no
+        tracks at all on the idle frames held back by the motion gate.
+        """
+        keyframes = [packet for packet in packets if self._is_keyframe(packet)]
+        person_results: List[Any] = []
+        if keyframes:
+            start = time.perf_counter()
+            person_results = self.person_detector.detect_batch(
+                [packet.frame for packet in keyframes],
+                conf=SETTINGS.PERSON_CONFIDENCE_THRESHOLD,
+            )
+            self.timer.record("person_detection", time.perf_counter() - start)
+        results_by_camera = {
+            packet.camera_id: result
+            for packet, result in zip(keyframes, person_results)
+        }
+        epi_results_by_camera = self._detect_full_frame_epis(keyframes)
+
+        frame_results: List[FrameResult] = []
+        for packet in packets:
+            camera = self.cameras[packet.camera_id]
+            person_result = results_by_camera.get(packet.camera_id)
+            if person_result is not None:
+                track_results = self._track_and_evaluate(
+                    camera,
+                    packet,
+                    person_result,
+                    epi_results_by_camera.get(packet.camera_id),
+                )
+            else:
+                # Skipped frame: move the last results along the motion model
+                track_results = camera.extrapolator.extrapolate_results(
+                    camera.last_track_results, packet.frame_idx
+                )
+            frame_results.append(
+                FrameResult(
+                    camera_id=packet.camera_id,
+                    frame_idx=packet.frame_idx,
+                    frame=packet.frame,
+                    captured_at=packet.captured_at,
+                    track_results=track_results,
+                    is_keyframe=person_result is not None,
+                )
+            )
+            if person_result is not None:
+                camera.frames_since_keyframe = 0
+            else:
+                camera.frames_since_keyframe += 1
+        return frame_results
+
+    def _is_keyframe(self, packet: FramePacket) -> bool:
+        camera = self.cameras[packet.camera_id]
+        if camera.frames_since_keyframe % camera.frame_stride != 0:
+            return False
+        if camera.motion_gate is None:
+            return True
+        start = time.perf_counter()
+        should_run = camera.motion_gate.should_run(
+            packet.frame, packet.captured_at, has_tracks=bool(camera.last_track_results)
+        )
+        self.timer.record("motion", time.perf_counter() - start)
+        return should_run
+
+    def _detect_full_frame_epis(self, keyframes: List[FramePacket]) -> Dict[str, Any]:
+        """Runs one EPI detection on the keyframes of full-frame cameras."""
+        packets = [
+            packet
+            for packet in keyframes
+            if self.cameras[packet.camera_id].epi_mode == EPI_MODE_FULL_FRAME
+        ]
+        if not packets:
+            return {}
+        start = time.perf_counter()
+        epi_results = self.epi_detector.detect_batch(
+            [packet.frame for packet in packets],
+            conf=SETTINGS.EPI_CONFIDENCE_THRESHOLD,
+            imgsz=SETTINGS.EPI_FULL_FRAME_IMG_SIZE,
+        )
+        self.timer.record("epi_inference", time.perf_counter() - start)
+        return {
+            packet.camera_id: result for packet, result in zip(packets, epi_results)
+        }
+
+    def _track_and_evaluate(
+        self,
+        camera: CameraState,
+        packet: FramePacket,
+        person_result: Any,
+        epi_result: Optional[Any] = None,
+    ) -> List[TrackResult]:
+        start = time.perf_counter()
+        tracked = camera.tracker.update(person_result)
+        self.timer.record("tracking", time.perf_counter() - start)
+
+        track_results: List[TrackResult] = []
+        if tracked.boxes.is_track:
+            persons = detections_from_boxes(tracked.boxes)
+            persons = persons[persons["class_id"] == self.person_class_id]
+            outside = persons[:0]
+            evaluators: Optional[List[Evaluator]] = None
+            if camera.zones is not None:
+                # Persons outside every zone are tracked but never checked
+                zone_ids = camera.zones.locate(persons, packet.frame.shape)
+                inside = zone_ids != NO_ZONE
+                outside, persons = persons[~inside], persons[inside]
+                zone_evaluators = self.zone_evaluators[camera.camera_id]
+                evaluators = [zone_evaluators[i] for i in zone_ids[inside].tolist()]
+
+            if epi_result is not None:
+                track_results = process_full_frame(
+                    persons,
+                    epi_result,
+                    self.evaluator,
+                    self.epi_model_person_class_id,
+                    timer=self.timer,
+                    evaluators=evaluators,
+                )
+            else:
+                track_results = process_person_tracks(
+                    persons,
+                    packet.frame,
+                    self.epi_detector,
+                    self.evaluator,
+                    self.epi_model_person_class_id,
+                    cache=camera.epi_cache,
+                    timer=self.timer,
+                    evaluators=evaluators,
+                    buckets=self.crop_buckets,
+                )
+            track_results.extend(
+                (outside[i : i + 1], [], [], track_id, STATUS_NO_ZONE)
+                for i, track_id in enumerate(outside["track_id"].tolist())
+            )
+
+        active_track_ids = [track_id for _, _, _, track_id, _ in track_results]
+        for detections, _, _, track_id, _ in track_results:
+            camera.extrapolator.update(
+                track_id, detections["box"][0].tolist(), packet.frame_idx
+            )
+        camera.extrapolator.prune(active_track_ids)
+        if camera.epi_cache is not None:
+            camera.epi_cache.prune(active_track_ids)
+        camera.last_track_results = track_results
+        return track_results
+
+
+def build_frame_processor(
+    person_detector: Detector,
+    epi_detector: Detector,
+    cameras: Dict[str, CameraState],
+    timer: NullTimer = NULL_TIMER,
+) -> FrameProcessor:
+    """
+    Resolves the class IDs of both models (the person class, the EPI model's
+    own person class and the EPIs of REQUIRED_PPE) and builds the frame
+    processor.
+    """
+    person_class_id: int = next(
+        cid
+        for cid, name in person_detector.model.names.items()
+        if name == SETTINGS.PERSON_CLASS_NAME
+    )
+    epi_class_names: Dict[int, str] = epi_detector.model.names
+    epi_model_person_class_id: Optional[int] = next(
+        (
+            cid
+            for cid, name in epi_class_names.items()
+            if name == SETTINGS.EPI_MODEL_IGNORE_CLASS_NAME
+        ),
+        None,
+    )
+    evaluator = build_evaluator(SETTINGS.REQUIRED_PPE, epi_class_names)
+    return FrameProcessor(
+        person_detector,
+        epi_detector,
+        evaluator,
+        person_class_id,
+        epi_class_names,
+        epi_model_person_class_id,
+        cameras,
+        timer=timer,
+    )
@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+from epi_monitor.core.detections import TrackResult
+
+
+@dataclass
+class TrackMotion:
+    """Last observed box of a track and its smoothed per-frame velocity."""
+
+    box: List[float]
+    frame_idx: int
+    velocity: List[float] = field(default_factory=lambda: [0.0, 0.0, 0.0, 0.0])
+
+
+class BoxExtrapolator:
+    """
+    Constant-velocity motion model used to move track boxes on frames where
+    detection is skipped. Velocities are per frame and smoothed with an
+    exponential moving average to damp detector jitter.
+    """
+
+    def __init__(self, smoothing: float = 0.5):
+        self.smoothing = smoothing
+        self._tracks: Dict[int, TrackMotion] = {}
+
+    def update(self, track_id: int, box: List[int], frame_idx: int) -> None:
+        """Registers a detected box for the track at the given frame index."""
+        motion = self._tracks.get(track_id)
+        if motion is None:
+            self._tracks[track_id] = TrackMotion(box=list(box), frame_idx=frame_idx)
+            return
+
+        elapsed = frame_idx - motion.frame_idx
+        if elapsed > 0:
+            motion.velocity = [
+                self.smoothing * (new - old) / elapsed
+                + (1.0 - self.smoothing) * velocity
+                for new, old, velocity in zip(box, motion.box, motion.velocity)
+            ]
+        motion.box = list(box)
+        motion.frame_idx = frame_idx
+
+    def predict(self, track_id: int, frame_idx: int) -> List[int]:
+        """Returns the extrapolated [x1, y1, x2, y2] box of the track."""
+        motion = self._tracks[track_id]
+        elapsed = frame_idx - motion.frame_idx
+        return [
+            int(coord + velocity * elapsed)
+            for coord, velocity in zip(motion.box, motion.velocity)
+        ]
+
+    def prune(self, active_track_ids: Iterable[int]) -> None:
+        """Forgets the tracks that are no longer being tracked."""
+        active = set(active_track_ids)
+        for track_id in [tid for tid in self._tracks if tid not in active]:
+            del self._tracks[track_id]
+
+    def extrapolate_results(
+        self, track_results: List[TrackResult], frame_idx: int
+    ) -> List[TrackResult]:
+        """
+        Moves the detections of the last processed frame to their extrapolated
+        positions. Each track's EPI boxes follow the offset of its person box,
+        and the compliance results are carried over unchanged.
+        """
+        extrapolated: List[TrackResult] = []
+        for detections, missing, present, track_id, status in track_results:
+            if track_id not in self._tracks:
+                extrapolated.append((detections, missing, present, track_id, status))
+                continue
+
+            motion = self._tracks[track_id]
+            predicted = self.predict(track_id, frame_idx)
+            dx1, dy1, dx2, dy2 = [
+                int(new - old) for new, old in zip(predicted, motion.box)
+            ]
+            moved = detections.copy()
+            is_person = moved["track_id"] == track_id
+            moved["box"][is_person] += (dx1, dy1, dx2, dy2)
+            # EPI boxes follow the center shift of the person box
+            cx, cy = (dx1 + dx2) // 2, (dy1 + dy2) // 2
+            moved["box"][~is_person] += (cx, cy, cx, cy)
+            extrapolated.append((moved, missing, present, track_id, status))
+        return extrapolated
@@ -0,0 +1,81 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.utils.metrics import FRAMES_IDLE
+
+
+class MotionGate:
+    """
+    Decides whether a frame is worth running the models on. Frames are
+    compared with the previous sampled frame on a small blurred grayscale copy,
+    which costs a fraction of a millisecond. While nothing moves and the
+    camera has no active track the models are skipped; any motion lets the
+    next frame through, and a keyframe is still forced every
+    `force_interval_s` seconds in case a still person was missed.
+    """
+
+    def __init__(
+        self,
+        width: int = 160,
+        pixel_threshold: int = 25,
+        min_changed_fraction: float = 0.002,
+        force_interval_s: float = 5.0,
+        camera_id: str = "default",
+    ):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.force_interval_s = force_interval_s
+        self._previous: Optional[np.ndarray] = None
+        self._last_run: Optional[float] = None
+        self.skipped: int = 0
+        self._idle_frames = FRAMES_IDLE.labels(camera_id)
+
+    def has_motion(self, frame: np.ndarray) -> bool:
+        """Compares the frame with the previous one. The first frame has motion."""
+        h, w = frame.shape[:2]
+        small = cv2.resize(
+            frame,
+            (self.width, max(1, round(h * self.width / w))),
+            interpolation=cv2.INTER_AREA,
+        )
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self._previous = self._previous, gray
+        if previous is None or previous.shape != gray.shape:
+            return True
+        changed = cv2.absdiff(gray, previous) > self.pixel_threshold
+        return np.count_nonzero(changed) >= self.min_changed_fraction * changed.size
+
+    def should_run(self, frame: np.ndarray, now: float, has_tracks: bool) -> bool:
+        """
+        Returns True when the models must run on this frame: something moved,
+        tracks are active or the forced keyframe is due.
+        """
+        motion = self.has_motion(frame)
+        if (
+            motion
+            or has_tracks
+            or self._last_run is None
+            or now - self._last_run >= self.force_interval_s
+        ):
+            self._last_run = now
+            return True
+        self.skipped += 1
+        self._idle_frames.inc()
+        return False
+
+
+def build_motion_gate(camera_id: str) -> Optional[MotionGate]:
+    """Returns a motion gate configured from the settings, None when disabled."""
+    if not SETTINGS.MOTION_GATE_ENABLED:
+        return None
+    return MotionGate(
+        width=SETTINGS.MOTION_GATE_WIDTH,
+        pixel_threshold=SETTINGS.MOTION_GATE_PIXEL_THRESHOLD,
+        min_changed_fraction=SETTINGS.MOTION_GATE_MIN_AREA,
+        force_interval_s=SETTINGS.MOTION_GATE_FORCE_KEYFRAME_S,
+        camera_id=camera_id,
+    )
@@ -0,0 +1,439 @@
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from epi_monitor.config.cameras import load_camera_configs
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.detections import Detections
+from epi_monitor.core.detector import Detector
+from epi_monitor.core.frame_processor import CameraState, build_frame_processor
+from epi_monitor.core.motion_gate import build_motion_gate
+from epi_monitor.core.pipeline import FramePacket
+from epi_monitor.core.tracking import PersonTracker
+from epi_monitor.core.zones import build_zone_map
+from epi_monitor.db.database import EventRow
+from epi_monitor.notification.notifications import NOTIFICATION_COOLDOWN_S
+from epi_monitor.notification.notifier import STATUS_SKIPPED
+from epi_monitor.utils.box_utils import box_iou
+from epi_monitor.utils.draw_utils import FrameOverlay
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_S: float = 60.0
+DEFAULT_OVERLAP_S: float = 2.0
+# Minimum mean IoU over the overlap for two tracks to be the same person
+TRACK_MATCH_MIN_IOU: float = 0.3
+
+Box = List[int]
+# frame index -> {track id: person box}, keyframes only
+BoxesByFrame = Dict[int, Dict[int, Box]]
+
+
+@dataclass
+class Segment:
+    """
+    A slice of the video processed by one worker. Frames from `warmup_start`
+    to `start` are read only to warm up the tracker; they belong to the
+    previous segment and are used to reconcile the track IDs of both.
+    """
+
+    index: int
+    warmup_start: int
+    start: int
+    end: int  # Exclusive
+
+
+@dataclass
+class CandidateEvent:
+    """A non-compliance found by a worker, with its segment-local track ID."""
+
+    frame_idx: int
+    track_id: int
+    missing_epis: List[str]
+    present_epis: List[str]
+    image_path: Optional[str] = None
+
+
+@dataclass
+class SegmentResult:
+    segment: Segment
+    frames: int
+    head_boxes: BoxesByFrame  # Warm-up frames, shared with the previous segment
+    tail_boxes: BoxesByFrame  # Last frames, shared with the next segment
+    candidates: List[CandidateEvent]
+
+
+def plan_segments(
+    total_frames: int, segment_frames: int, overlap_frames: int
+) -> List[Segment]:
+    """Splits the video into segments that each start `overlap_frames` early."""
+    segment_frames = max(1, segment_frames)
+    return [
+        Segment(
+            index=index,
+            warmup_start=max(0, start - overlap_frames),
+            start=start,
+            end=min(total_frames, start + segment_frames),
+        )
+        for index, start in enumerate(range(0, total_frames, segment_frames))
+    ]
+
+
+# --- Worker side ---
+# Models of the current worker process, loaded once by `_init_worker`
+_worker_detectors: Optional[Tuple[Detector, Detector]] = None
+
+
+def _init_worker(device: str, threads: int) -> None:
+    """
+    Loads the models once per process. Every worker gets its share of the
+    cores so that the processes do not fight over the same threads.
+    """
+    global _worker_detectors
+    import torch
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    _worker_detectors = (
+        Detector(
+            SETTINGS.MODEL_PERSON_PATH,
+            backend=SETTINGS.INFERENCE_BACKEND,
+            device=device,
+            precision=SETTINGS.INFERENCE_PRECISION,
+            name="person",
+        ),
+        Detector(
+            SETTINGS.EPI_DETECTOR_PATH,
+            backend=SETTINGS.INFERENCE_BACKEND,
+            device=device,
+            precision=SETTINGS.INFERENCE_PRECISION,
+            name="epi",
+        ),
+    )
+    for detector in _worker_detectors:
+        detector.load()
+
+
+def _save_snapshot(
+    frame: np.ndarray,
+    detections: Detections,
+    class_names: Dict[int, str],
+    directory: Path,
+    name: str,
+) -> Optional[str]:
+    path = directory / name
+    overlay = FrameOverlay(frame, detections, class_names)
+    if not cv2.imwrite(str(path), overlay.render()):
+        logger.error(f"Could not save event image to {path}")
+        return None
+    return str(path)
+
+
+def process_segment(
+    video_path: str,
+    segment: Segment,
+    overlap_frames: int,
+    camera_id: str,
+    snapshot_dir: Optional[str] = None,
+) -> SegmentResult:
+    """
+    Runs detection, tracking and evaluation on one segment, in a worker.
+    Frame indices are absolute, so skipped frames line up across segments.
+    """
+    person_detector, epi_detector = _worker_detectors
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, segment.warmup_start)
+
+    # The recording gets the EPI mode and zones of its camera, when listed
+    camera_config = next(
+        (c for c in load_camera_configs() if c.camera_id == camera_id), None
+    )
+    camera = CameraState(
+        camera_id=camera_id,
+        tracker=PersonTracker(frame_rate=int(round(fps))),
+        frame_stride=max(0, SETTINGS.SKIP_FRAMES) + 1,
+        epi_mode=(camera_config and camera_config.epi_mode) or SETTINGS.EPI_MODE,
+        zones=build_zone_map(camera_config.zones) if camera_config else None,
+        motion_gate=build_motion_gate(camera_id),
+    )
+    processor = build_frame_processor(
+        person_detector, epi_detector, {camera_id: camera}
+    )
+    cooldown_frames = NOTIFICATION_COOLDOWN_S * fps
+    tail_start = segment.end - overlap_frames
+
+    head_boxes: BoxesByFrame = {}
+    tail_boxes: BoxesByFrame = {}
+    candidates: List[CandidateEvent] = []
+    last_candidate: Dict[int, int] = {}
+    frames = 0
+    try:
+        for frame_idx in range(segment.warmup_start, segment.end):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames += 1
+            (result,) = processor.process_batch(
+                [FramePacket(camera_id, frame_idx, frame, frame_idx / fps)]
+            )
+            # Extrapolated frames were not analysed, nothing to report on them
+            if not result.is_keyframe:
+                continue
+
+            boxes = {
+                track_id: detections["box"][0].tolist()
+                for detections, _, _, track_id, _ in result.track_results
+            }
+            if frame_idx < segment.start:
+                head_boxes[frame_idx] = boxes
+                continue
+            if frame_idx >= tail_start:
+                tail_boxes[frame_idx] = boxes
+
+            for _, missing, present, track_id, _ in result.track_results:
+                if not missing:
+                    continue
+                last = last_candidate.get(track_id)
+                if last is not None and frame_idx - last <= cooldown_frames:
+                    continue
+                last_candidate[track_id] = frame_idx
+                image_path = None
+                if snapshot_dir:
+                    image_path = _save_snapshot(
+                        frame,
+                        np.concatenate([d for d, *_ in result.track_results]),
+                        processor.epi_class_names,
+                        Path(snapshot_dir),
+                        f"{camera_id}_{frame_idx:08d}_{segment.index}_{track_id}.jpg",
+                    )
+                candidates.append(
+                    CandidateEvent(frame_idx, track_id, missing, present, image_path)
+                )
+    finally:
+        cap.release()
+    return SegmentResult(segment, frames, head_boxes, tail_boxes, candidates)
+
+
+# --- Reconciliation ---
+def _track_ids(boxes_by_frame: BoxesByFrame) -> Set[int]:
+    return {track_id for boxes in boxes_by_frame.values() for track_id in boxes}
+
+
+def match_tracks(
+    reference: BoxesByFrame, candidate: BoxesByFrame, min_iou: float
+) -> Dict[int, int]:
+    """
+    Matches the tracks of two runs over the same frames. Two tracks score
+    their mean IoU over the frames where either of them exists, and the
+    assignment maximizing the total score is kept.
+    Returns {candidate track ID: reference track ID}.
+    """
+    ref_ids = sorted(_track_ids(reference))
+    cand_ids = sorted(_track_ids(candidate))
+    if not ref_ids or not cand_ids:
+        return {}
+
+    iou_sum = np.zeros((len(cand_ids), len(ref_ids)))
+    frames_seen = np.zeros((len(cand_ids), len(ref_ids)))
+    for frame_idx in set(reference) | set(candidate):
+        ref_boxes = reference.get(frame_idx, {})
+        cand_boxes = candidate.get(frame_idx, {})
+        for i, cand_id in enumerate(cand_ids):
+            for j, ref_id in enumerate(ref_ids):
+                in_cand, in_ref = cand_id in cand_boxes, ref_id in ref_boxes
+                if in_cand or in_ref:
+                    frames_seen[i, j] += 1
+                if in_cand and in_ref:
+                    iou_sum[i, j] += box_iou(cand_boxes[cand_id], ref_boxes[ref_id])
+
+    scores = np.divide(
+        iou_sum, frames_seen, out=np.zeros_like(iou_sum), where=frames_seen > 0
+    )
+    rows, cols = linear_sum_assignment(scores, maximize=True)
+    return {
+        cand_ids[i]: ref_ids[j] for i, j in zip(rows, cols) if scores[i, j] >= min_iou
+    }
+
+
+def reconcile_tracks(
+    results: List[SegmentResult], min_iou: float = TRACK_MATCH_MIN_IOU
+) -> List[Dict[int, int]]:
+    """
+    Maps the local track IDs of every segment (in order) to global IDs.
+    A track that continues from the previous segment keeps its global ID;
+    every other track gets a new one.
+    """
+    mappings: List[Dict[int, int]] = []
+    next_id = 1
+    previous_tail: BoxesByFrame = {}
+    for result in results:
+        mapping = match_tracks(previous_tail, result.head_boxes, min_iou)
+        local_ids = (
+            _track_ids(result.head_boxes)
+            | _track_ids(result.tail_boxes)
+            | {candidate.track_id for candidate in result.candidates}
+        )
+        for local_id in sorted(local_ids - set(mapping)):
+            mapping[local_id] = next_id
+            next_id += 1
+        mappings.append(mapping)
+        previous_tail = {
+            frame_idx: {mapping[tid]: box for tid, box in boxes.items()}
+            for frame_idx, boxes in result.tail_boxes.items()
+        }
+    return mappings
+
+
+def build_events(
+    results: List[SegmentResult],
+    mappings: List[Dict[int, int]],
+    fps: float,
+    video_start: datetime.datetime,
+    camera_id: str,
+) -> List[EventRow]:
+    """
+    Turns the candidates into event rows with global track IDs, applying the
+    notification cooldown across segments so that a person crossing a
+    boundary is not reported twice. Timestamps follow the video, not the clock.
+    """
+    candidates = sorted(
+        (
+            (mapping[candidate.track_id], candidate)
+            for result, mapping in zip(results, mappings)
+            for candidate in result.candidates
+        ),
+        key=lambda item: (item[0], item[1].frame_idx),
+    )
+    cooldown_frames = NOTIFICATION_COOLDOWN_S * fps
+    last_kept: Dict[int, int] = {}
+    events: List[EventRow] = []
+    for track_id, candidate in candidates:
+        last = last_kept.get(track_id)
+        if last is not None and candidate.frame_idx - last <= cooldown_frames:
+            if candidate.image_path:
+                Path(candidate.image_path).unlink(missing_ok=True)
+            continue
+        last_kept[track_id] = candidate.frame_idx
+        offset_s = candidate.frame_idx / fps
+        events.append(
+            {
+                "track_id": track_id,
+                "present_epis": candidate.present_epis,
+                "missing_epis": candidate.missing_epis,
+                "image_path": candidate.image_path,
+                "notification_status": STATUS_SKIPPED,
+                "camera_id": camera_id,
+                "event_timestamp": (
+                    video_start + datetime.timedelta(seconds=offset_s)
+                ).isoformat(),
+                "video_offset_s": round(offset_s, 3),
+            }
+        )
+    events.sort(key=lambda event: event["video_offset_s"])
+    return events
+
+
+def guess_video_start(video_path: Path, duration_s: float) -> datetime.datetime:
+    """Recorders write the file until the end: start = modification time - duration."""
+    modified = datetime.datetime.fromtimestamp(
+        video_path.stat().st_mtime, tz=datetime.timezone.utc
+    )
+    return modified - datetime.timedelta(seconds=duration_s)
+
+
+def run_offline(
+    video_path: Path,
+    camera_id: str,
+    workers: int,
+    segment_s: float = DEFAULT_SEGMENT_S,
+    overlap_s: float = DEFAULT_OVERLAP_S,
+    device: str = "cpu",
+    video_start: Optional[datetime.datetime] = None,
+    snapshot_dir: Optional[Path] = None,
+) -> List[EventRow]:
+    """
+    Audits a recorded video: segments are processed in parallel by a pool of
+    processes, their track IDs reconciled, and the events returned in video order.
+    """
+    video_path = Path(video_path)
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    if total_frames <= 0:
+        raise ValueError(f"Unknown frame count for {video_path}; remux the file.")
+
+    duration_s = total_frames / fps
+    if video_start is None:
+        video_start = guess_video_start(video_path, duration_s)
+        logger.info(f"Assuming the video started at {video_start.isoformat()}")
+    elif video_start.tzinfo is None:
+        video_start = video_start.astimezone()  # Naive times are local times
+    if snapshot_dir:
+        Path(snapshot_dir).mkdir(parents=True, exist_ok=True)
+
+    overlap_frames = int(round(overlap_s * fps))
+    segments = plan_segments(total_frames, int(round(segment_s * fps)), overlap_frames)
+    workers = max(1, min(workers, len(segments)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(
+        f"Processing {duration_s:.0f}s of video in {len(segments)} segments "
+        f"with {workers} workers ({threads} threads each)"
+    )
+
+    start = time.perf_counter()
+    results: List[SegmentResult] = []
+    # spawn: forked workers would inherit torch/OpenCV thread pools in a bad state
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(device, threads),
+    ) as pool:
+        futures = [
+            pool.submit(
+                process_segment,
+                str(video_path),
+                segment,
+                overlap_frames,
+                camera_id,
+                str(snapshot_dir) if snapshot_dir else None,
+            )
+            for segment in segments
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+            logger.info(f"Segments done: {len(results)}/{len(segments)}")
+
+    results.sort(key=lambda result: result.segment.index)
+    mappings = reconcile_tracks(results)
+    events = build_events(results, mappings, fps, video_start, camera_id)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Processed {sum(r.frames for r in results)} frames in {elapsed:.1f}s "
+        f"({duration_s / elapsed:.1f}x real time), {len(events)} events."
+    )
+    return events
+
+
+def write_events_jsonl(events: List[EventRow], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
@@ -0,0 +1,171 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from epi_monitor.core.detections import STATUS_EVALUATED, empty_detections
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.pipeline import FrameResult
+from epi_monitor.core.track_state import TrackStateStore
+from epi_monitor.db.rollups import record_compliance
+from epi_monitor.notification.dispatcher import NotificationDispatcher
+from epi_monitor.notification.notifications import (
+    NOTIFICATION_COOLDOWN_S,
+    handle_notifications,
+)
+from epi_monitor.utils.clip_recorder import buffer_frame
+from epi_monitor.utils.draw_utils import FrameOverlay, draw_compliance_status
+from epi_monitor.utils.metrics import (
+    ACTIVE_TRACKS,
+    FRAME_LATENCY,
+    FRAMES_PROCESSED,
+    FrameRateMeter,
+)
+from epi_monitor.utils.timing import NULL_TIMER, NullTimer
+
+logger = logging.getLogger(__name__)
+
+
+class OutputStage:
+    """
+    Consumes analysed frames: raises alerts for non-compliant tracks, then
+    draws, records and displays the frame when anyone needs the overlay.
+    Runs on the main thread because OpenCV windows must stay on it.
+    """
+
+    def __init__(
+        self,
+        dispatcher: NotificationDispatcher,
+        camera_ids: List[str],
+        class_names: Dict[int, str],
+        video_writers: Optional[Dict[str, cv2.VideoWriter]] = None,
+        record_sizes: Optional[Dict[str, Tuple[int, int]]] = None,
+        headless: bool = False,
+        display_size: Tuple[int, int] = (800, 600),
+        timer: NullTimer = NULL_TIMER,
+    ):
+        self.dispatcher = dispatcher
+        self.class_names = class_names
+        self.video_writers = video_writers or {}
+        self.record_sizes = record_sizes or {}
+        self.headless = headless
+        self.display_size = display_size
+        self.timer = timer
+        # Forgetting a track before its cooldown ends would let it alert again
+        self.track_states: Dict[str, TrackStateStore] = {
+            camera_id: TrackStateStore(
+                ttl_s=max(SETTINGS.TRACK_STATE_TTL_S, NOTIFICATION_COOLDOWN_S),
+                max_tracks=SETTINGS.TRACK_STATE_MAX_TRACKS,
+                camera_id=camera_id,
+            )
+            for camera_id in camera_ids
+        }
+        # Metric children are bound once per camera, nothing is allocated per frame
+        self._frames = {c: FRAMES_PROCESSED.labels(c) for c in camera_ids}
+        self._active_tracks = {c: ACTIVE_TRACKS.labels(c) for c in camera_ids}
+        self._latency = {c: FRAME_LATENCY.labels(c) for c in camera_ids}
+        self._fps = {c: FrameRateMeter(c) for c in camera_ids}
+
+    def handle(self, result: FrameResult) -> bool:
+        """Processes one frame result. Returns False when the user asked to quit."""
+        keep_running = self._output(result)
+
+        camera_id = result.camera_id
+        self._frames[camera_id].inc()
+        self._active_tracks[camera_id].set(len(result.track_results))
+        self._latency[camera_id].observe(time.time() - result.captured_at)
+        self._fps[camera_id].tick()
+        return keep_running
+
+    def _output(self, result: FrameResult) -> bool:
+        track_states = self.track_states[result.camera_id]
+        now = time.time()
+        for _, missing, present, track_id, status in result.track_results:
+            # Unevaluated persons have no compliance result to remember
+            if result.is_keyframe and status == STATUS_EVALUATED:
+                track_states.observe(track_id, result.frame_idx, missing, present, now)
+            else:
+                track_states.observe(track_id, result.frame_idx, now=now)
+        track_states.evict_expired(now)
+        if result.is_keyframe:
+            record_compliance(
+                result.camera_id, result.captured_at, result.track_results
+            )
+
+        # Buffered before any drawing, the clips show the raw footage
+        start = time.perf_counter()
+        buffer_frame(result.camera_id, result.frame, result.captured_at)
+        self.timer.record("clip", time.perf_counter() - start)
+
+        non_compliance_events = []
+        for detections, missing, present, track_id, _ in result.track_results:
+            # Alerts are only raised on frames that were actually analysed
+            if missing and result.is_keyframe:
+                # Copied now, the overlay later draws on the frame in place
+                x1, y1, x2, y2 = detections["box"][0].tolist()
+                non_compliance_events.append(
+                    {
+                        "track_id": track_id,
+                        "missing": missing,
+                        "present": present,
+                        "person_crop": result.frame[y1:y2, x1:x2].copy(),
+                    }
+                )
+
+        # One detection array for the whole frame
+        all_detections = (
+            np.concatenate([detections for detections, *_ in result.track_results])
+            if result.track_results
+            else empty_detections()
+        )
+        unevaluated = {
+            track_id: status
+            for _, _, _, track_id, status in result.track_results
+            if status != STATUS_EVALUATED
+        }
+        overlay = FrameOverlay(
+            result.frame, all_detections, self.class_names, unevaluated
+        )
+        start = time.perf_counter()
+        all_display_alerts: List[str] = []
+        for event in non_compliance_events:
+            display_alerts = handle_notifications(
+                overlay,
+                event["missing"],
+                event["present"],
+                event["track_id"],
+                track_states,
+                self.dispatcher,
+                camera_id=result.camera_id,
+                person_crop=event["person_crop"],
+            )
+            all_display_alerts.extend(display_alerts)
+        self.timer.record("notify", time.perf_counter() - start)
+
+        video_writer = self.video_writers.get(result.camera_id)
+        if self.headless and video_writer is None:
+            return True
+
+        start = time.perf_counter()
+        final_frame = draw_compliance_status(overlay.render(), all_display_alerts)
+        self.timer.record("draw", time.perf_counter() - start)
+
+        if video_writer is not None:
+            record_size = self.record_sizes[result.camera_id]
+            video_writer.write(
+                final_frame
+                if final_frame.shape[1::-1] == record_size
+                else cv2.resize(final_frame, record_size)
+            )
+
+        if not self.headless:
+            cv2.imshow(
+                f"EPI Monitor - {result.camera_id}",
+                cv2.resize(final_frame, self.display_size),
+            )
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                logger.info("Quit key pressed. Finalizing video recording.")
+                return False
+        return True
@@ -0,0 +1,320 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from epi_monitor.core.capture import VideoSource
+from epi_monitor.core.detections import TrackResult
+from epi_monitor.utils.metrics import FRAMES_STALE
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream as it travels through the queues
+END_OF_STREAM = object()
+
+LIVE_SOURCE_PREFIXES: Tuple[str, ...] = ("rtsp://", "rtmp://", "http://", "https://")
+
+
+@dataclass
+class FramePacket:
+    """
+    A captured frame on its way to the inference stage. `frame_idx` is the
+    sequence number of the frame in its camera's stream, so gaps show which
+    frames were dropped; `captured_at` is the wall-clock time it was grabbed.
+    """
+
+    camera_id: str
+    frame_idx: int
+    frame: np.ndarray
+    captured_at: float
+
+
+@dataclass
+class FrameResult:
+    """The analysed frame on its way to the output stage."""
+
+    camera_id: str
+    frame_idx: int
+    frame: np.ndarray
+    captured_at: float
+    track_results: List[TrackResult]
+    is_keyframe: bool
+
+
+def is_live_source(source: str) -> bool:
+    """Returns True for webcams and network streams, False for video files."""
+    return source.isdigit() or source.lower().startswith(LIVE_SOURCE_PREFIXES)
+
+
+class FrameQueue:
+    """
+    Bounded queue between two pipeline stages.
+    With `drop_oldest` the producer never blocks: when the queue is full the
+    oldest item is discarded, which keeps latency steady on live sources.
+    Otherwise the producer blocks until there is room, so no frame is lost.
+    Every enqueued item sets `ready`, when given, so that a consumer of several
+    queues can sleep on one event instead of polling each queue in turn.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        drop_oldest: bool,
+        ready: Optional[threading.Event] = None,
+    ):
+        self.name = name
+        self.drop_oldest = drop_oldest
+        self.ready = ready
+        self.dropped: int = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+
+    def put(self, item: Any, stop_event: threading.Event) -> None:
+        """Enqueues an item, honoring the queue policy and the stop signal."""
+        if self.drop_oldest:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        else:
+            while True:
+                if stop_event.is_set():
+                    return
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+        if self.ready is not None:
+            self.ready.set()
+
+    def get(self, timeout: float) -> Any:
+        """Dequeues an item. Raises queue.Empty after `timeout` seconds."""
+        return self._queue.get(timeout=timeout)
+
+    def get_nowait(self) -> Any:
+        """Dequeues an item without waiting. Raises queue.Empty if there is none."""
+        return self._queue.get_nowait()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class CaptureStage(threading.Thread):
+    """
+    Reads frames from one camera and feeds the inference stage, continuously,
+    so that a live source is always drained at its own pace. A lost live
+    stream is reopened; a video file ends the stream.
+    """
+
+    def __init__(
+        self,
+        camera_id: str,
+        cap: VideoSource,
+        output: FrameQueue,
+        stop_event: threading.Event,
+    ):
+        super().__init__(name=f"capture-{camera_id}", daemon=True)
+        self.camera_id = camera_id
+        self.cap = cap
+        self.output = output
+        self.stop_event = stop_event
+
+    def run(self) -> None:
+        frame_idx = 0
+        try:
+            while not self.stop_event.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    if self.cap.reconnect(self.stop_event):
+                        continue
+                    logger.info(f"End of video stream for camera {self.camera_id}.")
+                    break
+                self.output.put(
+                    FramePacket(self.camera_id, frame_idx, frame, time.time()),
+                    self.stop_event,
+                )
+                frame_idx += 1
+        except Exception as e:
+            logger.error(f"Capture stage failed for camera {self.camera_id}: {e}")
+        finally:
+            self.output.put(END_OF_STREAM, self.stop_event)
+
+
+class InferenceStage(threading.Thread):
+    """
+    Runs the detection models on captured frames. Each tick collects at most
+    one frame per camera so that all cameras can share a single batched call.
+    When every queue is empty the stage sleeps on `frames_ready`, which the
+    capture queues set, then takes what is waiting in all of them at once;
+    `idle_timeout_s` only bounds how late a stop is noticed.
+    Frames of the cameras in `stale_after_s` older than their limit when
+    picked up are counted as stale.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[FramePacket]], List[FrameResult]],
+        sources: Dict[str, FrameQueue],
+        output: FrameQueue,
+        stop_event: threading.Event,
+        frames_ready: threading.Event,
+        idle_timeout_s: float = 0.5,
+        stale_after_s: Optional[Dict[str, float]] = None,
+    ):
+        super().__init__(name="inference", daemon=True)
+        self.process_batch = process_batch
+        self.sources = sources
+        self.output = output
+        self.stop_event = stop_event
+        self.frames_ready = frames_ready
+        self.idle_timeout_s = idle_timeout_s
+        self.stale_after_s = stale_after_s or {}
+        self.stale: Dict[str, int] = {camera_id: 0 for camera_id in sources}
+        self._stale_frames = {c: FRAMES_STALE.labels(c) for c in self.stale_after_s}
+
+    def run(self) -> None:
+        active = dict(self.sources)
+        packets: List[FramePacket] = []
+        try:
+            while active and not self.stop_event.is_set():
+                # A queue may still hold frames after a tick that found some
+                if not packets:
+                    self.frames_ready.wait(timeout=self.idle_timeout_s)
+                # Cleared before draining: a frame enqueued from now on sets it
+                self.frames_ready.clear()
+                packets = []
+                for camera_id, source in list(active.items()):
+                    try:
+                        packet = source.get_nowait()
+                    except queue.Empty:
+                        continue
+                    if packet is END_OF_STREAM:
+                        del active[camera_id]
+                        continue
+                    stale_after_s = self.stale_after_s.get(camera_id)
+                    if (
+                        stale_after_s is not None
+                        and time.time() - packet.captured_at > stale_after_s
+                    ):
+                        self.stale[camera_id] += 1
+                        self._stale_frames[camera_id].inc()
+                    packets.append(packet)
+
+                if not packets:
+                    continue
+                for result in self.process_batch(packets):
+                    self.output.put(result, self.stop_event)
+        except Exception as e:
+            logger.error(f"Inference stage failed: {e}")
+        finally:
+            self.output.put(END_OF_STREAM, self.stop_event)
+
+
+class Pipeline:
+    """
+    Capture -> inference -> output pipeline connected by bounded queues.
+    Every camera has its own capture thread and queue; a single inference
+    thread serves all cameras. The output stage is consumed on the calling
+    thread (OpenCV windows must stay on it).
+    Live cameras hand over only their freshest frames: their queue holds
+    `live_queue_size` frames and drops the oldest. Video files are processed
+    frame by frame, deterministically: their queue blocks and never drops.
+    """
+
+    def __init__(
+        self,
+        captures: Dict[str, VideoSource],
+        process_batch: Callable[[List[FramePacket]], List[FrameResult]],
+        capture_queue_size: int,
+        result_queue_size: int,
+        live_queue_size: int = 1,
+        stale_after_s: float = 1.0,
+    ):
+        self.stop_event = threading.Event()
+        # Set by every capture queue, the inference stage sleeps on it
+        self.frames_ready = threading.Event()
+        self.capture_queues = {
+            camera_id: FrameQueue(
+                f"capture-{camera_id}",
+                live_queue_size if cap.live else capture_queue_size,
+                drop_oldest=cap.live,
+                ready=self.frames_ready,
+            )
+            for camera_id, cap in captures.items()
+        }
+        # Results always block so that analysed frames (and alerts) are never lost
+        self.result_queue = FrameQueue(
+            "results", result_queue_size * len(captures), False
+        )
+        self.capture_stages = [
+            CaptureStage(
+                camera_id, cap, self.capture_queues[camera_id], self.stop_event
+            )
+            for camera_id, cap in captures.items()
+        ]
+        self.inference_stage = InferenceStage(
+            process_batch,
+            self.capture_queues,
+            self.result_queue,
+            self.stop_event,
+            self.frames_ready,
+            stale_after_s={
+                camera_id: stale_after_s
+                for camera_id, cap in captures.items()
+                if cap.live
+            },
+        )
+
+    def start(self) -> None:
+        for stage in self.capture_stages:
+            stage.start()
+        self.inference_stage.start()
+
+    def get_result(self, timeout: float = 0.1) -> Any:
+        """
+        Returns the next FrameResult, END_OF_STREAM, or None if nothing was
+        ready within `timeout`.
+        """
+        try:
+            return self.result_queue.get(timeout=timeout)
+        except queue.Empty:
+            if not self.inference_stage.is_alive() and self.result_queue.qsize() == 0:
+                return END_OF_STREAM
+            return None
+
+    def stop(self) -> None:
+        """Signals the stages to stop and waits for them to finish."""
+        self.stop_event.set()
+        self.frames_ready.set()  # Wakes the inference stage up
+        for stage in self.capture_stages:
+            stage.join(timeout=5)
+        self.inference_stage.join(timeout=5)
+
+    def capture_stats(self) -> Dict[str, Dict[str, int]]:
+        """Returns the frames dropped, stale and reconnects of every camera."""
+        return {
+            stage.camera_id: {
+                "dropped": self.capture_queues[stage.camera_id].dropped,
+                "stale": self.inference_stage.stale[stage.camera_id],
+                "reconnects": stage.cap.reconnects,
+            }
+            for stage in self.capture_stages
+        }
+
+    def queue_depths(self) -> Dict[str, Dict[str, int]]:
+        """Returns the current depth and drop count of every stage queue."""
+        return {
+            q.name: {"depth": q.qsize(), "dropped": q.dropped}
+            for q in (*self.capture_queues.values(), self.result_queue)
+        }
@@ -1,68 +1,257 @@
-from typing import Any, Dict, List, Tuple
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
-from ultralytics.engine.results import Boxes
+from scipy.optimize import linear_sum_assignment
 
 from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.detections import (
+    STATUS_EVALUATED,
+    STATUS_TOO_SMALL,
+    Detections,
+    TrackResult,
+    detections_from_boxes,
+    empty_detections,
+)
+from epi_monitor.core.crop_buckets import CropBuckets, build_crop_buckets
 from epi_monitor.core.detector import Detector
+from epi_monitor.core.epi_cache import EpiResultCache
 from epi_monitor.core.evaluator import Evaluator
+from epi_monitor.utils.box_utils import box_areas, box_intersection_matrix
+from epi_monitor.utils.image_utils import letterbox
+from epi_monitor.utils.timing import NULL_TIMER, NullTimer
 
-DetectionDict = Dict[str, Any]
+# How stage 2 finds the EPIs of the tracked persons
+EPI_MODE_CROP = "crop"  # One EPI detection per person crop
+EPI_MODE_FULL_FRAME = "full_frame"  # One EPI detection per frame, then assignment
+EPI_MODES = (EPI_MODE_CROP, EPI_MODE_FULL_FRAME)
 
+# (result index, letterboxed crop, scale, pad, person box)
+PendingCrop = Tuple[int, np.ndarray, float, Tuple[int, int], List[int]]
 
-def process_person_track(
-    box: Boxes,
+
+def _extract_epi_detections(
+    epi_res: Any,
+    origin: Tuple[int, int],
+    epi_model_person_class_id: Optional[int],
+    scale: float = 1.0,
+    pad: Tuple[int, int] = (0, 0),
+) -> Detections:
+    """
+    Converts the EPI boxes of one result into frame coordinates, dropping the
+    EPI model's own person class. `scale` and `pad` undo a letterbox applied to
+    the crop, and `origin` is the top-left corner of the crop in the frame.
+    """
+    epi_detections = detections_from_boxes(epi_res.boxes, origin, scale, pad)
+    return epi_detections[epi_detections["class_id"] != epi_model_person_class_id]
+
+
+def process_person_tracks(
+    persons: Detections,
     frame: np.ndarray,
     epi_detector: Detector,
     evaluator: Evaluator,
-    epi_class_names: Dict[int, str],
-    epi_model_person_class_id: int,
-) -> Tuple[List[DetectionDict], List[str], List[str], int]:
+    epi_model_person_class_id: Optional[int],
+    max_batch_size: Optional[int] = None,
+    cache: Optional[EpiResultCache] = None,
+    timer: NullTimer = NULL_TIMER,
+    evaluators: Optional[Sequence[Evaluator]] = None,
+    buckets: Optional[CropBuckets] = None,
+) -> List[TrackResult]:
     """
-    Processes a single tracked person to detect EPIs and check compliance.
-    Returns:
-        - List of all detections (person + EPIs).
-        - List of missing EPI names.
-        - List of worn EPI names.
-        - The track ID.
+    Runs stage 2 on the tracked persons of a frame.
+    Letterboxes every person crop of the frame to the input size of its bucket
+    and runs the EPI detector once per batch of at most `max_batch_size` crops
+    of the same size, then maps the detections back to absolute frame
+    coordinates for each track. Persons too small to evaluate are returned
+    without EPIs, flagged STATUS_TOO_SMALL, and never raise an alert.
+    When a `cache` is given, tracks with a valid cached result skip stage 2.
+    `evaluators` optionally holds one evaluator per person (e.g. the rules of
+    the zone it stands in), replacing `evaluator`.
+    Returns one (detections, missing, present, track_id, status) tuple per
+    person, in order.
     """
-    track_id = int(box.id.item())
-    x1, y1, x2, y2 = [int(i) for i in box.xyxy[0]]
-    detections_to_draw = []
-
-    person_detection: DetectionDict = {
-        "name": "Pessoa",
-        "box": [x1, y1, x2, y2],
-        "confidence": box.conf.item(),
-        "class_id": int(box.cls.item()),
-        "track_id": track_id,
-    }
-    detections_to_draw.append(person_detection)
-
-    person_crop: np.ndarray = frame[y1:y2, x1:x2]
-    if person_crop.size == 0:
-        return detections_to_draw, [], [], track_id
-
-    # --- STAGE 2: DETECT EPIs ON THE CROPPED PERSON ---
-    epi_results = epi_detector.detect(
-        person_crop, conf=SETTINGS.EPI_CONFIDENCE_THRESHOLD
-    )
-    epi_detections_on_person: List[DetectionDict] = []
-    for epi_res in epi_results:
-        for epi_box in epi_res.boxes:
-            class_id: int = int(epi_box.cls)
-            if class_id == epi_model_person_class_id:
+    max_batch_size = max(1, max_batch_size or SETTINGS.EPI_MAX_BATCH_SIZE)
+    if buckets is None:
+        buckets = build_crop_buckets()
+
+    results: List[TrackResult] = []
+    # Input size -> crops waiting for stage 2
+    pending: Dict[int, List[PendingCrop]] = {}
+
+    start = time.perf_counter()
+    for i, (box, track_id) in enumerate(
+        zip(persons["box"].tolist(), persons["track_id"].tolist())
+    ):
+        person = persons[i : i + 1]
+        if cache is not None:
+            cached = cache.get(track_id, box)
+            if cached is not None:
+                epi_detections, missing_epis, present_epis = cached
+                if evaluators is not None:
+                    # The person may have changed zones since it was cached
+                    missing_epis, present_epis = evaluators[i].check_compliance(
+                        epi_detections
+                    )
+                results.append(
+                    (
+                        np.concatenate((person, epi_detections)),
+                        missing_epis,
+                        present_epis,
+                        track_id,
+                        STATUS_EVALUATED,
+                    )
+                )
                 continue
 
-            ex1_rel, ey1_rel, ex2_rel, ey2_rel = [int(i) for i in epi_box.xyxy[0]]
-            epi_detection: DetectionDict = {
-                "name": epi_class_names[class_id],
-                "box": [ex1_rel + x1, ey1_rel + y1, ex2_rel + x1, ey2_rel + y1],
-                "confidence": epi_box.conf.item(),
-                "class_id": class_id,
-            }
-            detections_to_draw.append(epi_detection)
-            epi_detections_on_person.append(epi_detection)
-
-    missing_epis, present_epis = evaluator.check_compliance(epi_detections_on_person)
-    return detections_to_draw, missing_epis, present_epis, track_id
+        # Replaced by the evaluated result once the crop has been through stage 2
+        results.append((person, [], [], track_id, STATUS_TOO_SMALL))
+
+        x1, y1, x2, y2 = box
+        person_crop: np.ndarray = frame[y1:y2, x1:x2]
+        if person_crop.size == 0:
+            continue
+        img_size = buckets.select(*person_crop.shape[:2])
+        if img_size is None:
+            continue
+        crop, scale, pad = letterbox(person_crop, img_size)
+        pending.setdefault(img_size, []).append(
+            (len(results) - 1, crop, scale, pad, box)
+        )
+    timer.record("crop", time.perf_counter() - start)
+
+    # --- STAGE 2: DETECT EPIs ON ALL CROPPED PERSONS, ONE CALL PER BATCH ---
+    batches = [
+        (img_size, crops[batch_start : batch_start + max_batch_size])
+        for img_size, crops in sorted(pending.items())
+        for batch_start in range(0, len(crops), max_batch_size)
+    ]
+    for img_size, batch in batches:
+        start = time.perf_counter()
+        epi_results = epi_detector.detect_batch(
+            [crop for _, crop, _, _, _ in batch],
+            conf=SETTINGS.EPI_CONFIDENCE_THRESHOLD,
+            imgsz=img_size,
+        )
+        elapsed = time.perf_counter() - start
+        timer.record("epi_inference", elapsed)
+        buckets.record(img_size, elapsed)
+
+        start = time.perf_counter()
+        for (index, _, scale, pad, person_box), epi_res in zip(batch, epi_results):
+            person, _, _, track_id, _ = results[index]
+            epi_detections = _extract_epi_detections(
+                epi_res,
+                (person_box[0], person_box[1]),
+                epi_model_person_class_id,
+                scale=scale,
+                pad=pad,
+            )
+            person_evaluator = evaluator if evaluators is None else evaluators[index]
+            missing_epis, present_epis = person_evaluator.check_compliance(
+                epi_detections
+            )
+            if cache is not None:
+                cache.put(
+                    track_id, person_box, epi_detections, missing_epis, present_epis
+                )
+            results[index] = (
+                np.concatenate((person, epi_detections)),
+                missing_epis,
+                present_epis,
+                track_id,
+                STATUS_EVALUATED,
+            )
+        timer.record("evaluation", time.perf_counter() - start)
+
+    return results
+
+
+def assign_epis_to_persons(
+    persons: Detections, epi_detections: Detections, min_containment: float
+) -> List[Detections]:
+    """
+    Assigns the EPIs detected on a full frame to the persons wearing them.
+    A pair is scored by the fraction of the EPI box lying inside the person box
+    (containment), plus their IoU to prefer the tightest person box when several
+    contain the EPI. Each class is assigned separately and one-to-one, so every
+    person gets at most one EPI of each class and every EPI at most one person.
+    Pairs whose containment is below `min_containment` are left unassigned.
+    Returns the EPI detections of each person, in the order of `persons`.
+    """
+    if len(persons) == 0 or len(epi_detections) == 0:
+        return [empty_detections() for _ in range(len(persons))]
+
+    person_boxes = persons["box"].astype(np.float32)
+    epi_boxes = epi_detections["box"].astype(np.float32)
+    intersection = box_intersection_matrix(person_boxes, epi_boxes)
+    person_areas = box_areas(person_boxes)[:, None]
+    epi_areas = box_areas(epi_boxes)[None, :]
+    containment = np.divide(
+        intersection,
+        epi_areas,
+        out=np.zeros_like(intersection),
+        where=epi_areas > 0,
+    )
+    union = person_areas + epi_areas - intersection
+    iou = np.divide(
+        intersection, union, out=np.zeros_like(intersection), where=union > 0
+    )
+    scores = containment + iou
+
+    assigned: List[List[int]] = [[] for _ in range(len(persons))]
+    class_ids = epi_detections["class_id"]
+    for class_id in np.unique(class_ids):
+        columns = np.flatnonzero(class_ids == class_id)
+        rows, matched = linear_sum_assignment(scores[:, columns], maximize=True)
+        epi_indices = columns[matched]
+        keep = containment[rows, epi_indices] >= min_containment
+        for row, epi_index in zip(rows[keep].tolist(), epi_indices[keep].tolist()):
+            assigned[row].append(epi_index)
+    return [epi_detections[sorted(indices)] for indices in assigned]
+
+
+def process_full_frame(
+    persons: Detections,
+    epi_res: Any,
+    evaluator: Evaluator,
+    epi_model_person_class_id: Optional[int],
+    min_containment: Optional[float] = None,
+    timer: NullTimer = NULL_TIMER,
+    evaluators: Optional[Sequence[Evaluator]] = None,
+) -> List[TrackResult]:
+    """
+    Full-frame counterpart of `process_person_tracks`: `epi_res` is the result
+    of a single EPI detection on the whole frame, whose boxes are distributed
+    among the tracked persons before checking their compliance. The cost of
+    stage 2 no longer grows with the number of persons in the frame.
+    `evaluators` optionally holds one evaluator per person, replacing `evaluator`.
+    Returns one (detections, missing, present, track_id, status) tuple per
+    person, in order.
+    """
+    if min_containment is None:
+        min_containment = SETTINGS.EPI_FULL_FRAME_MIN_CONTAINMENT
+
+    start = time.perf_counter()
+    epi_detections = _extract_epi_detections(
+        epi_res, (0, 0), epi_model_person_class_id
+    )
+    epis_by_person = assign_epis_to_persons(persons, epi_detections, min_containment)
+
+    results: List[TrackResult] = []
+    for i, (person_epis, track_id) in enumerate(
+        zip(epis_by_person, persons["track_id"].tolist())
+    ):
+        person_evaluator = evaluator if evaluators is None else evaluators[i]
+        missing_epis, present_epis = person_evaluator.check_compliance(person_epis)
+        results.append(
+            (
+                np.concatenate((persons[i : i + 1], person_epis)),
+                missing_epis,
+                present_epis,
+                track_id,
+                STATUS_EVALUATED,
+            )
+        )
+    timer.record("evaluation", time.perf_counter() - start)
+    return results
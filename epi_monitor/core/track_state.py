@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from epi_monitor.utils.metrics import TRACK_STATE_EVICTIONS, TRACK_STATES
+
+
+@dataclass
+class TrackState:
+    """What is remembered about a track between frames."""
+
+    last_seen_frame: int
+    last_seen_at: float
+    last_notified_at: Optional[float] = None
+    missing_epis: List[str] = field(default_factory=list)
+    present_epis: List[str] = field(default_factory=list)
+
+
+class TrackStateStore:
+    """
+    Bounded per-camera store of track state: last notification time, last
+    compliance result and last-seen frame. The tracker never reuses IDs, so
+    entries of tracks that have left the scene are evicted once unseen for
+    `ttl_s`, and the least recently seen ones go first whenever more than
+    `max_tracks` are held. Tracks are kept in last-seen order, which makes
+    both evictions O(1) per evicted track.
+    """
+
+    def __init__(
+        self, ttl_s: float, max_tracks: int, camera_id: Optional[str] = None
+    ):
+        self.ttl_s = ttl_s
+        self.max_tracks = max(1, max_tracks)
+        self._states: "OrderedDict[int, TrackState]" = OrderedDict()
+        self.evictions: Dict[str, int] = {"ttl": 0, "capacity": 0}
+        label = camera_id or "default"
+        self._size_gauge = TRACK_STATES.labels(label)
+        self._evicted = {
+            reason: TRACK_STATE_EVICTIONS.labels(label, reason)
+            for reason in self.evictions
+        }
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, track_id: int) -> bool:
+        return track_id in self._states
+
+    def get(self, track_id: int) -> Optional[TrackState]:
+        return self._states.get(track_id)
+
+    def observe(
+        self,
+        track_id: int,
+        frame_idx: int,
+        missing_epis: Optional[List[str]] = None,
+        present_epis: Optional[List[str]] = None,
+        now: Optional[float] = None,
+    ) -> TrackState:
+        """
+        Records that the track was seen on `frame_idx`, with its compliance
+        result when given, and marks it as the most recently seen.
+        """
+        now = time.time() if now is None else now
+        state = self._states.get(track_id)
+        if state is None:
+            state = TrackState(last_seen_frame=frame_idx, last_seen_at=now)
+            self._states[track_id] = state
+        else:
+            state.last_seen_frame = frame_idx
+            state.last_seen_at = now
+            self._states.move_to_end(track_id)
+        if missing_epis is not None:
+            state.missing_epis = missing_epis
+        if present_epis is not None:
+            state.present_epis = present_epis
+
+        while len(self._states) > self.max_tracks:
+            self._states.popitem(last=False)
+            self._count_eviction("capacity")
+        return state
+
+    def last_notified(self, track_id: int) -> Optional[float]:
+        state = self._states.get(track_id)
+        return state.last_notified_at if state is not None else None
+
+    def mark_notified(self, track_id: int, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        state = self._states.get(track_id)
+        if state is None:
+            state = self.observe(track_id, -1, now=now)
+        state.last_notified_at = now
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Drops the tracks unseen for longer than `ttl_s`. Returns how many."""
+        now = time.time() if now is None else now
+        evicted = 0
+        while self._states:
+            track_id, state = next(iter(self._states.items()))
+            if now - state.last_seen_at <= self.ttl_s:
+                break
+            del self._states[track_id]
+            evicted += 1
+        if evicted:
+            self._count_eviction("ttl", evicted)
+        self._size_gauge.set(len(self._states))
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._states), **self.evictions}
+
+    def _count_eviction(self, reason: str, count: int = 1) -> None:
+        self.evictions[reason] += count
+        self._evicted[reason].inc(count)
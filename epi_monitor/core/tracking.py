@@ -0,0 +1,41 @@
+from typing import Any
+
+DEFAULT_TRACKER_CONFIG: str = "botsort.yaml"
+
+
+class PersonTracker:
+    """
+    A BoT-SORT tracker bound to a single camera.
+    Detection runs separately (possibly batched with other cameras), and the
+    per-frame results are fed here to assign persistent track IDs, mirroring
+    what `YOLO.track(persist=True)` does internally for a single stream.
+    ultralytics and torch are imported on construction, not with the module.
+    """
+
+    def __init__(
+        self, tracker_config: str = DEFAULT_TRACKER_CONFIG, frame_rate: int = 30
+    ):
+        from ultralytics.trackers.bot_sort import BOTSORT
+        from ultralytics.utils import IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_config)))
+        self.tracker = BOTSORT(args=cfg, frame_rate=frame_rate or 30)
+
+    def update(self, result: Any) -> Any:
+        """
+        Updates the tracker with a detection result and returns the result
+        restricted to the tracked boxes, with track IDs attached.
+        When nothing is tracked the result is returned unchanged (boxes.id is None).
+        """
+        det = result.boxes.cpu().numpy()
+        tracks = self.tracker.update(det, result.orig_img)
+        if len(tracks) == 0:
+            return result
+
+        import torch
+
+        idx = tracks[:, -1].astype(int)
+        tracked = result[idx]
+        tracked.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return tracked
@@ -0,0 +1,53 @@
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from epi_monitor.config.cameras import ZoneConfig
+from epi_monitor.core.detections import Detections
+
+# Zone index of persons standing outside every zone
+NO_ZONE: int = -1
+
+
+class ZoneMap:
+    """
+    The zones of one camera, rasterized once into a mask the size of the frame
+    where every pixel holds its zone index plus one (0 outside every zone).
+    Locating a person is then a single lookup, whatever the number of zones
+    or polygon vertices. Where zones overlap, the first listed one wins.
+    """
+
+    def __init__(self, zones: List[ZoneConfig]):
+        if len(zones) > 255:
+            raise ValueError("At most 255 zones are supported per camera")
+        self.zones = zones
+        self._mask: Optional[np.ndarray] = None
+
+    def mask(self, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """Returns the zone mask for frames of this shape, built on first use."""
+        height, width = frame_shape[:2]
+        if self._mask is None or self._mask.shape != (height, width):
+            mask = np.zeros((height, width), dtype=np.uint8)
+            for index in range(len(self.zones) - 1, -1, -1):
+                polygon = np.array(self.zones[index].polygon, dtype=np.int32)
+                cv2.fillPoly(mask, [polygon], index + 1)
+            self._mask = mask
+        return self._mask
+
+    def locate(self, persons: Detections, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Returns the zone index of every person, from the bottom centre of its
+        box, or NO_ZONE.
+        """
+        mask = self.mask(frame_shape)
+        height, width = mask.shape
+        boxes = persons["box"]
+        xs = np.clip((boxes[:, 0] + boxes[:, 2]) // 2, 0, width - 1)
+        ys = np.clip(boxes[:, 3] - 1, 0, height - 1)
+        return mask[ys, xs].astype(np.int32) - 1
+
+
+def build_zone_map(zones: List[ZoneConfig]) -> Optional[ZoneMap]:
+    """Returns the zone map of a camera, or None when it has no zones."""
+    return ZoneMap(zones) if zones else None
@@ -1,23 +1,52 @@
+import datetime
 import logging
+import time
 from contextlib import contextmanager
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import psycopg2
 from psycopg2 import pool
+from psycopg2.extras import execute_values
 
 from epi_monitor.config.settings import SETTINGS
+from epi_monitor.utils.metrics import (
+    DB_ROWS_WRITTEN,
+    DB_WRITE_DURATION,
+    DB_WRITE_FAILURES,
+)
 
 logger = logging.getLogger(__name__)
 
 # Global connection pool, initialized once at startup
 db_pool = None
 
+# Columns written for every event, in insert order
+EVENT_COLUMNS = (
+    "track_id",
+    "present_epis",
+    "missing_epis",
+    "image_path",
+    "notification_status",
+    "camera_id",
+    "event_timestamp",
+    "clip_path",
+)
+EventRow = Dict[str, Any]
+
+# Indexes behind the event history queries (see queries.py)
+EVENT_INDEXES = {
+    "idx_events_camera_time": "events (camera_id, event_timestamp DESC, id DESC)",
+    "idx_events_time": "events (event_timestamp DESC, id DESC)",
+    "idx_events_missing_epis": "events USING GIN (missing_epis)",
+}
+
 
 def initialize_db_pool():
     """Initializes the PostgreSQL connection pool."""
     global db_pool
     try:
-        db_pool = psycopg2.pool.SimpleConnectionPool(
+        # Thread-safe: events are also written from the notification thread
+        db_pool = psycopg2.pool.ThreadedConnectionPool(
             minconn=1, maxconn=5, dsn=SETTINGS.DATABASE_URL
         )
         logger.info("Database connection pool initialized successfully.")
@@ -44,12 +73,17 @@ def get_db_connection():
         raise ConnectionError("Database pool is not initialized or connection failed.")
 
     conn = None
+    broken = False
     try:
         conn = db_pool.getconn()
         yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # Do not hand a dead connection to the next caller
+        broken = True
+        raise
     finally:
         if conn:
-            db_pool.putconn(conn)
+            db_pool.putconn(conn, close=broken)
 
 
 def create_events_table():
@@ -67,14 +101,165 @@ def create_events_table():
                         event_timestamp TIMESTAMP WITH TIME ZONE DEFAULT (NOW() AT TIME ZONE 'UTC'),
                         image_path VARCHAR(255),
                         notification_status VARCHAR(20),
-                        camera_id VARCHAR(50)
+                        camera_id VARCHAR(50),
+                        clip_path VARCHAR(255)
                     );
                     """
                 )
+                # Tables created before event clips existed
+                cur.execute(
+                    "ALTER TABLE events "
+                    "ADD COLUMN IF NOT EXISTS clip_path VARCHAR(255);"
+                )
                 conn.commit()
                 logger.info("Table 'events' is ready.")
     except (psycopg2.Error, ConnectionError) as e:
         logger.error(f"Error creating table: {e}")
+        return
+    ensure_event_indexes()
+
+
+def ensure_event_indexes():
+    """
+    Creates the missing indexes of the events table. They are built
+    concurrently, so the first build on a large table does not block inserts.
+    """
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT indexname FROM pg_indexes "
+                    "WHERE schemaname = current_schema() AND tablename = 'events';"
+                )
+                existing = {row[0] for row in cur.fetchall()}
+            missing = [name for name in EVENT_INDEXES if name not in existing]
+            if not missing:
+                return
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    for name in missing:
+                        logger.info(f"Building index {name}, this may take a while.")
+                        cur.execute(
+                            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                            f"ON {EVENT_INDEXES[name]};"
+                        )
+            finally:
+                conn.autocommit = False
+            logger.info(f"Created indexes: {', '.join(missing)}")
+    except (psycopg2.Error, ConnectionError) as e:
+        logger.error(f"Error creating indexes: {e}")
+
+
+def create_rollup_tables():
+    """
+    Creates the per-minute compliance rollup tables if they don't exist.
+    Unlike create_events_table, errors are raised so the caller can retry.
+    """
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS compliance_rollups (
+                        camera_id VARCHAR(50) NOT NULL,
+                        bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+                        person_frames INTEGER NOT NULL DEFAULT 0,
+                        compliant_frames INTEGER NOT NULL DEFAULT 0,
+                        persons_seen INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (camera_id, bucket_start)
+                    );
+                    CREATE TABLE IF NOT EXISTS violation_rollups (
+                        camera_id VARCHAR(50) NOT NULL,
+                        bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+                        missing_epi VARCHAR(100) NOT NULL,
+                        person_frames INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (camera_id, bucket_start, missing_epi)
+                    );
+                    """
+                )
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+    logger.info("Tables 'compliance_rollups' and 'violation_rollups' are ready.")
+
+
+def upsert_rollups(compliance_rows: List[tuple], violation_rows: List[tuple]):
+    """
+    Adds rollup counts in one transaction. The frame counts of a bucket that
+    already exists are summed into it, so a bucket may be flushed several times.
+    persons_seen is a distinct count and cannot be summed: the larger of the
+    two values is kept, a lower bound when a minute was split across flushes
+    (e.g. by a restart). Errors are raised.
+        compliance_rows: (camera_id, bucket_start, person_frames,
+            compliant_frames, persons_seen)
+        violation_rows: (camera_id, bucket_start, missing_epi, person_frames)
+    """
+    compliance_sql = """
+        INSERT INTO compliance_rollups (
+            camera_id, bucket_start, person_frames, compliant_frames, persons_seen
+        ) VALUES %s
+        ON CONFLICT (camera_id, bucket_start) DO UPDATE SET
+            person_frames = compliance_rollups.person_frames + EXCLUDED.person_frames,
+            compliant_frames =
+                compliance_rollups.compliant_frames + EXCLUDED.compliant_frames,
+            persons_seen = GREATEST(
+                compliance_rollups.persons_seen, EXCLUDED.persons_seen
+            );
+    """
+    violation_sql = """
+        INSERT INTO violation_rollups (
+            camera_id, bucket_start, missing_epi, person_frames
+        ) VALUES %s
+        ON CONFLICT (camera_id, bucket_start, missing_epi) DO UPDATE SET
+            person_frames = violation_rollups.person_frames + EXCLUDED.person_frames;
+    """
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                if compliance_rows:
+                    execute_values(
+                        cur,
+                        compliance_sql,
+                        compliance_rows,
+                        page_size=len(compliance_rows),
+                    )
+                if violation_rows:
+                    execute_values(
+                        cur,
+                        violation_sql,
+                        violation_rows,
+                        page_size=len(violation_rows),
+                    )
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+
+
+def clear_event_image_paths(image_paths: List[str]) -> int:
+    """
+    Clears the image_path of the events whose snapshot was deleted, in one
+    statement. Returns the number of rows updated. Errors are raised.
+    """
+    if not image_paths:
+        return 0
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE events SET image_path = NULL "
+                    "WHERE image_path = ANY(%s);",
+                    (image_paths,),
+                )
+                updated = cur.rowcount
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+    return updated
 
 
 def insert_event(
@@ -84,15 +269,18 @@ def insert_event(
     image_path: str,
     notification_status: str,
     camera_id: str,
+    clip_path: Optional[str] = None,
+    event_timestamp: Optional[datetime.datetime] = None,
 ):
     """
     Inserts a non-compliance event into the database using parameterized queries
-    to prevent SQL injection.
+    to prevent SQL injection. `event_timestamp` defaults to now.
     """
     sql = """
-        INSERT INTO events (track_id, present_epis, missing_epis, image_path, notification_status, camera_id)
-        VALUES (%s, %s, %s, %s, %s, %s);
+        INSERT INTO events (track_id, present_epis, missing_epis, image_path, notification_status, camera_id, clip_path, event_timestamp)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
     """
+    start = time.perf_counter()
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
@@ -105,9 +293,42 @@ def insert_event(
                         image_path,
                         notification_status,
                         camera_id,
+                        clip_path,
+                        event_timestamp
+                        or datetime.datetime.now(datetime.timezone.utc),
                     ),
                 )
                 conn.commit()
                 logger.info(f"Successfully inserted event for track ID {track_id}.")
+        DB_ROWS_WRITTEN.labels().inc()
     except (psycopg2.Error, ConnectionError) as e:
-        logger.error(f"Database insert failed for track ID {track_id}: {e}")
\ No newline at end of file
+        DB_WRITE_FAILURES.labels().inc()
+        logger.error(f"Database insert failed for track ID {track_id}: {e}")
+    DB_WRITE_DURATION.labels().observe(time.perf_counter() - start)
+
+
+def insert_events(events: List[EventRow]):
+    """
+    Inserts a batch of events with a single multi-row INSERT in one transaction.
+    Unlike insert_event, errors are raised so the caller can keep the rows.
+    """
+    if not events:
+        return
+    sql = f"INSERT INTO events ({', '.join(EVENT_COLUMNS)}) VALUES %s;"
+    rows = [tuple(event.get(column) for column in EVENT_COLUMNS) for event in events]
+    start = time.perf_counter()
+    try:
+        with get_db_connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    execute_values(cur, sql, rows, page_size=len(rows))
+                conn.commit()
+            except psycopg2.Error:
+                conn.rollback()
+                raise
+    except (psycopg2.Error, ConnectionError):
+        DB_WRITE_FAILURES.labels().inc()
+        raise
+    finally:
+        DB_WRITE_DURATION.labels().observe(time.perf_counter() - start)
+    DB_ROWS_WRITTEN.labels().inc(len(rows))
@@ -0,0 +1,285 @@
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import psycopg2
+
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.db import database
+from epi_monitor.db.database import EventRow, insert_events
+
+logger = logging.getLogger(__name__)
+
+# Global writer, started once at startup
+event_writer = None
+
+
+class EventWriter:
+    """
+    Writes events to the database from a background thread.
+    Rows are buffered and inserted in batches, whenever `batch_size` rows are
+    waiting or `flush_interval_s` has elapsed. When the database cannot be
+    reached, rows are appended to a JSONL journal on disk and replayed, in
+    order, as soon as the database is back.
+    """
+
+    def __init__(
+        self,
+        journal_path: Path,
+        batch_size: int = 50,
+        flush_interval_s: float = 2.0,
+        max_queue_size: int = 1000,
+        retry_interval_s: float = 10.0,
+    ):
+        self.journal_path = Path(journal_path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.retry_interval_s = retry_interval_s
+        self._queue: "queue.Queue[EventRow]" = queue.Queue(
+            maxsize=max(1, max_queue_size)
+        )
+        self._journal_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="event-writer", daemon=True
+        )
+        self._next_retry_time = 0.0
+
+        # --- Back-pressure metrics ---
+        self.written: int = 0
+        self.journaled: int = 0
+        self.replayed: int = 0
+        self.spilled: int = 0  # Rows journaled directly because the queue was full
+        self.failed_flushes: int = 0
+
+    def start(self) -> None:
+        self._recover_interrupted_replay()
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flushes the buffered rows and stops the writer thread."""
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+        # Anything the thread could not write in time is kept on disk
+        leftover = self._drain(self._queue.qsize())
+        if leftover:
+            self._append_to_journal(leftover)
+
+    def submit(self, event: EventRow) -> None:
+        """
+        Queues an event without blocking. Events without a timestamp are
+        stamped now, so delayed or replayed rows keep the time they happened.
+        """
+        event.setdefault(
+            "event_timestamp", datetime.datetime.now(datetime.timezone.utc).isoformat()
+        )
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.spilled += 1
+            self._append_to_journal([event])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "journaled": self.journaled,
+            "replayed": self.replayed,
+            "spilled": self.spilled,
+            "failed_flushes": self.failed_flushes,
+            "journal_pending": int(self._journal_has_rows()),
+        }
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch or self._journal_has_rows():
+                self._flush(batch)
+        self._flush(self._drain(self._queue.qsize()))
+
+    def _collect_batch(self) -> List[EventRow]:
+        batch: List[EventRow] = []
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size and not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.5)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _drain(self, max_rows: int) -> List[EventRow]:
+        rows: List[EventRow] = []
+        for _ in range(max_rows):
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _flush(self, batch: List[EventRow]) -> None:
+        if time.monotonic() < self._next_retry_time or not self._ensure_database():
+            self._append_to_journal(batch)
+            return
+        try:
+            # Journaled rows are older, replay them first to keep the order
+            self._replay_journal()
+            insert_events(batch)
+            self.written += len(batch)
+        except (psycopg2.Error, ConnectionError) as e:
+            self.failed_flushes += 1
+            self._next_retry_time = time.monotonic() + self.retry_interval_s
+            logger.error(f"Event insert failed, journaling {len(batch)} rows: {e}")
+            self._append_to_journal(batch)
+
+    def _ensure_database(self) -> bool:
+        """Re-creates the connection pool if the database was down at startup."""
+        if database.db_pool is None:
+            database.initialize_db_pool()
+            if database.db_pool is None:
+                self._next_retry_time = time.monotonic() + self.retry_interval_s
+                return False
+            database.create_events_table()
+        return True
+
+    def _replay_journal(self) -> None:
+        """Inserts the journaled rows and removes the journal once they are in."""
+        with self._journal_lock:
+            if not self._journal_has_rows():
+                return
+            replay_path = self.journal_path.with_suffix(".replaying")
+            os.replace(self.journal_path, replay_path)
+
+        rows: List[EventRow] = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+        inserted = 0
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start : start + self.batch_size]
+                insert_events(chunk)
+                inserted += len(chunk)
+                self.replayed += len(chunk)
+        except Exception:
+            # Put back what was not inserted, ahead of anything journaled since
+            self._prepend_to_journal(rows[inserted:])
+            replay_path.unlink(missing_ok=True)
+            raise
+        replay_path.unlink(missing_ok=True)
+        logger.info(f"Replayed {len(rows)} journaled events.")
+
+    def _recover_interrupted_replay(self) -> None:
+        """Restores a journal left half-replayed by a crash."""
+        replay_path = self.journal_path.with_suffix(".replaying")
+        if not replay_path.is_file():
+            return
+        with open(replay_path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        self._prepend_to_journal(rows)
+        replay_path.unlink()
+        logger.warning(f"Recovered {len(rows)} events from an interrupted replay.")
+
+    def _append_to_journal(self, rows: List[EventRow]) -> None:
+        if not rows:
+            return
+        with self._journal_lock:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.journaled += len(rows)
+
+    def _prepend_to_journal(self, rows: List[EventRow]) -> None:
+        with self._journal_lock:
+            existing = (
+                self.journal_path.read_text(encoding="utf-8")
+                if self.journal_path.is_file()
+                else ""
+            )
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(row) + "\n" for row in rows)
+                f.write(existing)
+
+    def _journal_has_rows(self) -> bool:
+        return self.journal_path.is_file() and self.journal_path.stat().st_size > 0
+
+
+def start_event_writer() -> None:
+    """Starts the global background event writer."""
+    global event_writer
+    event_writer = EventWriter(
+        journal_path=SETTINGS.EVENT_JOURNAL_PATH,
+        batch_size=SETTINGS.EVENT_BATCH_SIZE,
+        flush_interval_s=SETTINGS.EVENT_FLUSH_INTERVAL_S,
+        max_queue_size=SETTINGS.EVENT_QUEUE_SIZE,
+        retry_interval_s=SETTINGS.DB_RETRY_INTERVAL_S,
+    )
+    event_writer.start()
+    logger.info("Event writer started.")
+
+
+def stop_event_writer() -> None:
+    """Flushes pending events and stops the global event writer."""
+    global event_writer
+    if event_writer:
+        event_writer.stop()
+        logger.info(f"Event writer stopped: {event_writer.stats()}")
+        event_writer = None
+
+
+def queue_event(
+    track_id: int,
+    present_epis: List[str],
+    missing_epis: List[str],
+    image_path: Optional[str],
+    notification_status: str,
+    camera_id: str,
+    clip_path: Optional[str] = None,
+    event_time: Optional[float] = None,
+) -> None:
+    """
+    Queues a non-compliance event for the background writer. Falls back to a
+    direct insert when the writer is not running.
+    `event_time` is the Unix time the violation was detected; events are often
+    queued later, once their notification completed. Defaults to now.
+    """
+    timestamp = datetime.datetime.fromtimestamp(
+        time.time() if event_time is None else event_time, datetime.timezone.utc
+    )
+    if event_writer is None:
+        database.insert_event(
+            track_id,
+            present_epis,
+            missing_epis,
+            image_path,
+            notification_status,
+            camera_id,
+            clip_path,
+            event_timestamp=timestamp,
+        )
+        return
+    event_writer.submit(
+        {
+            "track_id": track_id,
+            "present_epis": present_epis,
+            "missing_epis": missing_epis,
+            "image_path": image_path,
+            "notification_status": notification_status,
+            "camera_id": camera_id,
+            "clip_path": clip_path,
+            "event_timestamp": timestamp.isoformat(),
+        }
+    )
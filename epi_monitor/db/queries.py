@@ -0,0 +1,144 @@
+import base64
+import datetime
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+import psycopg2
+
+from epi_monitor.db.database import EventRow, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Columns returned by the event history queries
+QUERY_COLUMNS = (
+    "id",
+    "event_timestamp",
+    "camera_id",
+    "track_id",
+    "present_epis",
+    "missing_epis",
+    "notification_status",
+    "image_path",
+    "clip_path",
+)
+DEFAULT_PAGE_SIZE: int = 100
+MAX_PAGE_SIZE: int = 1000
+
+
+@dataclass
+class EventPage:
+    """One page of events, newest first, and the cursor of the next page."""
+
+    events: List[EventRow]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(event_timestamp: datetime.datetime, event_id: int) -> str:
+    """Opaque cursor pointing after the (timestamp, id) of the last event."""
+    raw = json.dumps([event_timestamp.isoformat(), event_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        timestamp, event_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.datetime.fromisoformat(timestamp), int(event_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def build_event_query(
+    camera_id: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    missing_epis: Optional[Sequence[str]] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[str, List[Any]]:
+    """
+    Returns the SQL and parameters of a page of events, newest first.
+    Pages are keyset-paginated on (event_timestamp, id). The cursor becomes a
+    row comparison that the (camera_id, event_timestamp, id) and
+    (event_timestamp, id) indexes can seek to directly, so a deep page costs
+    the same as the first one.
+    `missing_epis` keeps events missing all the given EPIs, through the GIN
+    index on missing_epis.
+    """
+    conditions: List[str] = []
+    params: List[Any] = []
+    if camera_id is not None:
+        conditions.append("camera_id = %s")
+        params.append(camera_id)
+    if since is not None:
+        conditions.append("event_timestamp >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append("event_timestamp < %s")
+        params.append(until)
+    if missing_epis:
+        conditions.append("missing_epis @> %s::text[]")
+        params.append(list(missing_epis))
+    if cursor is not None:
+        conditions.append("(event_timestamp, id) < (%s, %s)")
+        params.extend(decode_cursor(cursor))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = (
+        f"SELECT {', '.join(QUERY_COLUMNS)} FROM events {where} "
+        "ORDER BY event_timestamp DESC, id DESC LIMIT %s;"
+    )
+    # One extra row tells whether there is a next page
+    params.append(limit + 1)
+    return sql, params
+
+
+def query_events(
+    camera_id: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    missing_epis: Optional[Sequence[str]] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> EventPage:
+    """
+    Returns a page of events matching every given filter, newest first, in a
+    read-only transaction. Pass `next_cursor` back to get the following page.
+    Raises ValueError for an invalid cursor and psycopg2.Error or
+    ConnectionError when the database cannot answer.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    sql, params = build_event_query(
+        camera_id, since, until, missing_epis, cursor, limit
+    )
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION READ ONLY;")
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+        finally:
+            conn.rollback()
+
+    events = [dict(zip(QUERY_COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = events[-1]
+        next_cursor = encode_cursor(last["event_timestamp"], last["id"])
+    return EventPage(events=events, next_cursor=next_cursor)
+
+
+def explain_event_query(**filters: Any) -> str:
+    """Returns the query plan of `query_events` for the filters, for tuning."""
+    sql, params = build_event_query(**filters)
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"EXPLAIN {sql}", params)
+                return "\n".join(row[0] for row in cur.fetchall())
+        except psycopg2.Error:
+            logger.exception("Could not explain the event query")
+            raise
+        finally:
+            conn.rollback()
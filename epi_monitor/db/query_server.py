@@ -0,0 +1,112 @@
+import datetime
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import psycopg2
+
+from epi_monitor.db.queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, query_events
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    """Parses an ISO 8601 timestamp; naive ones are taken as UTC."""
+    timestamp = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return timestamp
+
+
+def parse_event_filters(query: Dict[str, List[str]]) -> Dict[str, Any]:
+    """
+    Converts the query string of GET /events into `query_events` arguments:
+    camera_id, since, until (ISO 8601), missing (repeatable or comma-separated),
+    limit and cursor. Raises ValueError for invalid values.
+    """
+    filters: Dict[str, Any] = {}
+    if "camera_id" in query:
+        filters["camera_id"] = query["camera_id"][0]
+    for name in ("since", "until"):
+        if name in query:
+            filters[name] = _parse_time(query[name][0])
+    missing = [
+        epi.strip()
+        for value in query.get("missing", [])
+        for epi in value.split(",")
+        if epi.strip()
+    ]
+    if missing:
+        filters["missing_epis"] = missing
+    limit = int(query.get("limit", [DEFAULT_PAGE_SIZE])[0])
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    filters["limit"] = limit
+    if "cursor" in query:
+        filters["cursor"] = query["cursor"][0]
+    return filters
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class EventQueryServer:
+    """
+    Serves the event history as JSON on GET /events from a background thread.
+    Read-only: every request runs one keyset-paginated query in a read-only
+    transaction. Meant for local tools, so it binds to localhost by default.
+    """
+
+    def __init__(self, host: str, port: int):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                if url.path != "/events":
+                    self.send_error(404)
+                    return
+                try:
+                    filters = parse_event_filters(parse_qs(url.query))
+                    page = query_events(**filters)
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                except (psycopg2.Error, ConnectionError) as e:
+                    logger.error(f"Event query failed: {e}")
+                    self._send_json(503, {"error": "database unavailable"})
+                    return
+                self._send_json(
+                    200, {"events": page.events, "next_cursor": page.next_cursor}
+                )
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload, default=_to_json).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="event-query-server", daemon=True
+        )
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._httpd.server_address[:2]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,208 @@
+import datetime
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set, Tuple
+
+import psycopg2
+
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.detections import STATUS_EVALUATED, TrackResult
+from epi_monitor.db.database import create_rollup_tables, upsert_rollups
+
+logger = logging.getLogger(__name__)
+
+# Global rollup writer, started by start_rollup_writer
+rollup_writer = None
+
+# Width of a rollup bucket
+BUCKET_S: int = 60
+# How long a minute stays open after it ends, for frames still in the pipeline
+FLUSH_GRACE_S: float = 10.0
+
+# (camera_id, bucket start as a Unix timestamp)
+BucketKey = Tuple[str, int]
+
+
+@dataclass
+class RollupBucket:
+    """Compliance counts of one camera over one minute."""
+
+    person_frames: int = 0  # Persons evaluated, summed over the analysed frames
+    compliant_frames: int = 0  # Those wearing every required EPI
+    # Distinct persons seen, evaluated or not
+    track_ids: Set[int] = field(default_factory=set)
+    violations: Dict[str, int] = field(default_factory=dict)  # EPI -> frames
+
+    def merge(self, other: "RollupBucket") -> None:
+        self.person_frames += other.person_frames
+        self.compliant_frames += other.compliant_frames
+        self.track_ids |= other.track_ids
+        for epi, count in other.violations.items():
+            self.violations[epi] = self.violations.get(epi, 0) + count
+
+
+class RollupWriter:
+    """
+    Aggregates the compliance result of every evaluated person into per-camera,
+    per-minute counters in memory, and upserts them into the rollup tables from
+    a background thread every `flush_interval_s`. A minute is kept in memory
+    until `FLUSH_GRACE_S` after it ends and then written once; only the minute
+    in progress on stop is written early. Persons that were not evaluated (too
+    small, outside every zone) count in persons_seen only.
+    Unlike the events table, which only holds notified violations, the rollups
+    count compliant persons too: they are the denominator of compliance rates.
+    While the database is down, buckets stay in memory, at most `max_buckets`.
+    """
+
+    def __init__(self, flush_interval_s: float = 30.0, max_buckets: int = 10000):
+        self.flush_interval_s = flush_interval_s
+        self.max_buckets = max(1, max_buckets)
+        self._buckets: Dict[BucketKey, RollupBucket] = {}
+        self._lock = threading.Lock()
+        self._tables_ready = False
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="rollup-writer", daemon=True
+        )
+
+        self.flushed: int = 0  # Buckets written
+        self.dropped: int = 0  # Buckets lost while the database was down
+        self.failed_flushes: int = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flushes every bucket, including the current minute, then stops."""
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+
+    def record(
+        self, camera_id: str, timestamp: float, track_results: Sequence[TrackResult]
+    ) -> None:
+        """Counts the compliance results of one analysed frame."""
+        if not track_results:
+            return
+        key = (camera_id, int(timestamp // BUCKET_S) * BUCKET_S)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = RollupBucket()
+            for _, missing, _, track_id, status in track_results:
+                bucket.track_ids.add(track_id)
+                # Persons that were not evaluated are neither compliant nor not
+                if status != STATUS_EVALUATED:
+                    continue
+                bucket.person_frames += 1
+                if not missing:
+                    bucket.compliant_frames += 1
+                for epi in missing:
+                    bucket.violations[epi] = bucket.violations.get(epi, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._buckets)
+        return {
+            "pending": pending,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval_s):
+            # Buckets that ended more than FLUSH_GRACE_S ago
+            self._flush(time.time() - FLUSH_GRACE_S - BUCKET_S)
+        self._flush(float("inf"))
+
+    def _take(self, before: float) -> Dict[BucketKey, RollupBucket]:
+        """Removes and returns the buckets starting at or before `before`."""
+        with self._lock:
+            keys = [key for key in self._buckets if key[1] <= before]
+            return {key: self._buckets.pop(key) for key in keys}
+
+    def _flush(self, before: float) -> None:
+        buckets = self._take(before)
+        if not buckets:
+            return
+        try:
+            if not self._tables_ready:
+                create_rollup_tables()
+                self._tables_ready = True
+            upsert_rollups(*self._to_rows(buckets))
+            self.flushed += len(buckets)
+        except (psycopg2.Error, ConnectionError) as e:
+            self.failed_flushes += 1
+            logger.error(f"Rollup flush failed, keeping {len(buckets)} buckets: {e}")
+            self._restore(buckets)
+
+    def _restore(self, buckets: Dict[BucketKey, RollupBucket]) -> None:
+        """Puts back buckets that could not be written, dropping the oldest."""
+        with self._lock:
+            for key, bucket in buckets.items():
+                current = self._buckets.get(key)
+                if current is None:
+                    self._buckets[key] = bucket
+                else:
+                    current.merge(bucket)
+            excess = len(self._buckets) - self.max_buckets
+            if excess > 0:
+                for key in sorted(self._buckets, key=lambda k: k[1])[:excess]:
+                    del self._buckets[key]
+                self.dropped += excess
+                logger.warning(f"Dropped the {excess} oldest rollup buckets.")
+
+    @staticmethod
+    def _to_rows(
+        buckets: Dict[BucketKey, RollupBucket]
+    ) -> Tuple[List[tuple], List[tuple]]:
+        compliance_rows: List[tuple] = []
+        violation_rows: List[tuple] = []
+        for (camera_id, bucket_start), bucket in buckets.items():
+            start = datetime.datetime.fromtimestamp(
+                bucket_start, datetime.timezone.utc
+            )
+            compliance_rows.append(
+                (
+                    camera_id,
+                    start,
+                    bucket.person_frames,
+                    bucket.compliant_frames,
+                    len(bucket.track_ids),
+                )
+            )
+            violation_rows.extend(
+                (camera_id, start, epi, count)
+                for epi, count in bucket.violations.items()
+            )
+        return compliance_rows, violation_rows
+
+
+def start_rollup_writer() -> None:
+    """Starts the global rollup writer."""
+    global rollup_writer
+    rollup_writer = RollupWriter(
+        flush_interval_s=SETTINGS.ROLLUP_FLUSH_INTERVAL_S,
+        max_buckets=SETTINGS.ROLLUP_MAX_BUCKETS,
+    )
+    rollup_writer.start()
+    logger.info("Rollup writer started.")
+
+
+def stop_rollup_writer() -> None:
+    """Flushes the pending rollups and stops the global rollup writer."""
+    global rollup_writer
+    if rollup_writer:
+        rollup_writer.stop()
+        logger.info(f"Rollup writer stopped: {rollup_writer.stats()}")
+        rollup_writer = None
+
+
+def record_compliance(
+    camera_id: str, timestamp: float, track_results: Sequence[TrackResult]
+) -> None:
+    """Feeds the results of an analysed frame to the rollups, if running."""
+    if rollup_writer is not None:
+        rollup_writer.record(camera_id, timestamp, track_results)
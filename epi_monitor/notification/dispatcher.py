@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from epi_monitor.notification.notifier import STATUS_DROPPED, STATUS_FAILED, Notifier
+from epi_monitor.utils.event_logger import Snapshot
+from epi_monitor.utils.metrics import ALERTS
+
+logger = logging.getLogger(__name__)
+
+OnComplete = Callable[[str], None]
+
+
+@dataclass
+class AlertJob:
+    """A notification waiting to be sent by the dispatcher."""
+
+    message: str
+    snapshot: Optional[Snapshot]
+    on_complete: Optional[OnComplete]
+
+
+class NotificationDispatcher:
+    """
+    Sends alerts on a background thread so that slow or rate-limited webhook
+    calls never block the video loop.
+    Jobs wait in a bounded queue; when it is full new alerts are dropped.
+    Every job reports its final status (SENT, FAILED, SKIPPED or DROPPED)
+    through its `on_complete` callback.
+    """
+
+    def __init__(
+        self,
+        notifier: Notifier,
+        max_queue_size: int = 100,
+        snapshot_timeout_s: float = 10.0,
+    ):
+        self.notifier = notifier
+        self.snapshot_timeout_s = snapshot_timeout_s
+        self._queue: "queue.Queue[Optional[AlertJob]]" = queue.Queue(
+            maxsize=max(1, max_queue_size)
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="notification-dispatcher", daemon=True
+        )
+        # Updated from the worker and, for drops, from the submitting thread
+        self.status_counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def submit(
+        self,
+        message: str,
+        snapshot: Optional[Snapshot] = None,
+        on_complete: Optional[OnComplete] = None,
+    ) -> bool:
+        """
+        Queues an alert without blocking. Returns False if it was dropped
+        because the queue is full.
+        """
+        try:
+            self._queue.put_nowait(AlertJob(message, snapshot, on_complete))
+            return True
+        except queue.Full:
+            logger.warning("Notification queue is full. Dropping alert.")
+            self._complete(AlertJob(message, snapshot, on_complete), STATUS_DROPPED)
+            return False
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Sends the queued alerts and stops the worker, waiting up to `timeout`."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logger.warning("Notification dispatcher did not finish in time.")
+        self.notifier.close()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                image_bytes = self._snapshot_bytes(job.snapshot)
+                status = self.notifier.send_alert(
+                    job.message,
+                    image_name=job.snapshot.name if image_bytes else None,
+                    image_bytes=image_bytes,
+                )
+            except Exception as e:
+                logger.error(f"Unexpected error sending alert: {e}")
+                status = STATUS_FAILED
+            self._complete(job, status)
+
+    def _snapshot_bytes(self, snapshot: Optional[Snapshot]) -> Optional[bytes]:
+        """Waits for the snapshot encode; alerts are still sent if it fails."""
+        if snapshot is None:
+            return None
+        try:
+            return snapshot.jpeg.result(timeout=self.snapshot_timeout_s)
+        except Exception as e:
+            logger.error(f"Snapshot unavailable for alert: {e}")
+            return None
+
+    def _complete(self, job: AlertJob, status: str) -> None:
+        with self._counts_lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        ALERTS.labels(status).inc()
+        if job.on_complete is None:
+            return
+        try:
+            job.on_complete(status)
+        except Exception as e:
+            logger.error(f"Notification completion callback failed: {e}")
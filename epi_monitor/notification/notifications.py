@@ -1,12 +1,15 @@
 import logging
 import time
-from typing import Dict, List
+from typing import List, Optional
 
 import numpy as np
 
 from epi_monitor.config.settings import SETTINGS
-from epi_monitor.db.database import insert_event
-from epi_monitor.notification.notifier import Notifier
+from epi_monitor.core.track_state import TrackStateStore
+from epi_monitor.db.event_writer import queue_event
+from epi_monitor.notification.dispatcher import NotificationDispatcher
+from epi_monitor.utils.clip_recorder import save_clip
+from epi_monitor.utils.draw_utils import FrameOverlay
 from epi_monitor.utils.event_logger import log_event
 
 logger = logging.getLogger(__name__)
@@ -14,48 +17,65 @@ NOTIFICATION_COOLDOWN_S: int = 30
 
 
 def handle_notifications(
-    frame_with_detections: np.ndarray,
+    overlay: FrameOverlay,
     missing_epis: List[str],
     present_epis: List[str],
     track_id: int,
-    notified_track_ids: Dict[int, float],
-    notifier: Notifier,
+    track_states: TrackStateStore,
+    dispatcher: NotificationDispatcher,
+    camera_id: Optional[str] = None,
+    person_crop: Optional[np.ndarray] = None,
 ) -> List[str]:
     """
     Manages notifications, logs events, and saves them to the database,
     respecting a cooldown period for each tracked person.
+    The overlay is only rendered when an alert is actually sent, and a clip
+    around the event is saved when the clip recorder is running.
+    `person_crop`, cut from the frame before anything was drawn on it, adds a
+    thumbnail of the person to the snapshot.
     """
     if not missing_epis:
         return []
+    camera_id = camera_id or SETTINGS.CAMERA_ID
 
     current_time = time.time()
-    last_notified_time = notified_track_ids.get(track_id, 0)
+    last_notified_time = track_states.last_notified(track_id) or 0
 
     if (current_time - last_notified_time) > NOTIFICATION_COOLDOWN_S:
-        # 1. Log the event by saving an image
-        image_filepath = log_event(frame_with_detections, track_id)
-        notification_status = "SENT"
-
-        # 2. Insert the event into the database
-        insert_event(
-            track_id=track_id,
-            present_epis=present_epis,
-            missing_epis=missing_epis,
-            image_path=str(image_filepath) if image_filepath else None,
-            notification_status=notification_status,
-            camera_id=SETTINGS.CAMERA_ID,
+        # 1. Log the event: the image is encoded once and saved in the background
+        snapshot = log_event(
+            overlay.render(), track_id, camera_id, person_crop=person_crop
         )
+        clip_path = save_clip(camera_id, track_id, current_time)
 
-        # 3. Send the notification
-        alert_message = f"ID {track_id}: Person is missing: {', '.join(missing_epis)}"
-        logger.info(f"Sending alert for track ID {track_id}")
-        notifier.send_alert(
+        # 2. Queue the event for the database once the notification outcome
+        # is known, so the row records what really happened to the alert, but
+        # stamped with the time of the violation, not of the notification
+        def record_event(notification_status: str) -> None:
+            queue_event(
+                track_id=track_id,
+                present_epis=present_epis,
+                missing_epis=missing_epis,
+                image_path=str(snapshot.path) if snapshot else None,
+                notification_status=notification_status,
+                camera_id=camera_id,
+                clip_path=str(clip_path) if clip_path else None,
+                event_time=current_time,
+            )
+
+        # 3. Queue the notification, sent in the background
+        alert_message = (
+            f"[{camera_id}] ID {track_id}: Person is missing: {', '.join(missing_epis)}"
+        )
+        logger.info(f"Queueing alert for track ID {track_id}")
+        dispatcher.submit(
             f"🚨 ALERTA DE NÃO CONFORMIDADE 🚨\n{alert_message}",
-            image_path=image_filepath,
+            snapshot=snapshot,
+            on_complete=record_event,
         )
 
         # 4. Update the timestamp to enforce cooldown
-        notified_track_ids[track_id] = current_time
+        track_states.mark_notified(track_id, current_time)
 
         return [alert_message]
 
@@ -1,37 +1,124 @@
 import logging
-from pathlib import Path
+import time
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from epi_monitor.utils.metrics import NOTIFICATION_DURATION
 
 logger = logging.getLogger(__name__)
 
+# Final outcome of a notification, stored in events.notification_status
+STATUS_SENT: str = "SENT"
+STATUS_FAILED: str = "FAILED"
+STATUS_DROPPED: str = "DROPPED"
+STATUS_SKIPPED: str = "SKIPPED"
+
 
 class Notifier:
-    def __init__(self, webhook_url: Optional[str]) -> None:
+    def __init__(
+        self,
+        webhook_url: Optional[str],
+        timeout_s: float = 10.0,
+        max_retries: int = 3,
+        backoff_base_s: float = 1.0,
+        max_backoff_s: float = 30.0,
+        session: Optional[requests.Session] = None,
+    ) -> None:
         self.webhook_url = webhook_url
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.max_backoff_s = max_backoff_s
 
-    def send_alert(self, message: str, image_path: Optional[Path] = None) -> None:
+        # A persistent session keeps the TLS connection to Discord alive
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def send_alert(
+        self,
+        message: str,
+        image_name: Optional[str] = None,
+        image_bytes: Optional[bytes] = None,
+    ) -> str:
         """
         Sends a notification message to the configured Discord webhook.
-        If an image_path is provided, it sends the image along with the message.
+        If JPEG image bytes are provided, it sends the image along with the message.
+        Connection errors and 5xx responses are retried with exponential backoff,
+        and 429 responses are retried after the delay requested by Discord.
+        Returns the final status (SENT, FAILED or SKIPPED).
         """
         if not self.webhook_url:
             logger.warning("Discord webhook URL not set. Skipping notification.")
-            return
+            return STATUS_SKIPPED
 
-        payload = {"content": message}
+        start = time.perf_counter()
+        status = self._deliver(message, image_name, image_bytes)
+        NOTIFICATION_DURATION.labels().observe(time.perf_counter() - start)
+        return status
 
-        try:
-            if image_path and image_path.is_file():
-                with open(image_path, "rb") as f:
-                    files = {"file": (image_path.name, f, "image/jpeg")}
-                    response = requests.post(
-                        self.webhook_url, data=payload, files=files
-                    )
+    def _deliver(
+        self, message: str, image_name: Optional[str], image_bytes: Optional[bytes]
+    ) -> str:
+        for attempt in range(self.max_retries + 1):
+            delay = self._backoff(attempt)
+            try:
+                response = self._post(message, image_name, image_bytes)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Error sending Discord alert (try {attempt + 1}): {e}")
             else:
-                response = requests.post(self.webhook_url, json=payload)
+                if response.status_code == 429:
+                    delay = self._retry_after(response, default=delay)
+                    logger.warning(f"Discord rate limit hit, retrying in {delay:.1f}s")
+                elif response.status_code >= 500:
+                    logger.warning(
+                        f"Discord returned {response.status_code} (try {attempt + 1})"
+                    )
+                elif response.ok:
+                    return STATUS_SENT
+                else:
+                    logger.error(
+                        f"Error sending Discord alert: {response.status_code} "
+                        f"{response.text[:200]}"
+                    )
+                    return STATUS_FAILED
 
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error sending Discord alert: {e}")
+            if attempt < self.max_retries:
+                time.sleep(delay)
+
+        logger.error(f"Giving up on Discord alert after {self.max_retries + 1} tries")
+        return STATUS_FAILED
+
+    def close(self) -> None:
+        """Closes the pooled HTTP connections."""
+        self.session.close()
+
+    def _post(
+        self, message: str, image_name: Optional[str], image_bytes: Optional[bytes]
+    ) -> requests.Response:
+        payload = {"content": message}
+        if image_bytes:
+            files = {"file": (image_name or "snapshot.jpg", image_bytes, "image/jpeg")}
+            return self.session.post(
+                self.webhook_url, data=payload, files=files, timeout=self.timeout_s
+            )
+        return self.session.post(self.webhook_url, json=payload, timeout=self.timeout_s)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_backoff_s, self.backoff_base_s * 2**attempt)
+
+    def _retry_after(self, response: requests.Response, default: float) -> float:
+        """Reads the rate-limit delay from the Retry-After header or JSON body."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is None:
+            try:
+                retry_after = response.json().get("retry_after")
+            except ValueError:
+                retry_after = None
+        try:
+            return min(self.max_backoff_s, max(0.0, float(retry_after)))
+        except (TypeError, ValueError):
+            return default
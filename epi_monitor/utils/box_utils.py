@@ -0,0 +1,35 @@
+from typing import Sequence
+
+import numpy as np
+
+Box = Sequence[float]
+
+
+def box_area(box: Box) -> float:
+    """Returns the area of an [x1, y1, x2, y2] box (0 for degenerate boxes)."""
+    return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+
+def box_iou(box_a: Box, box_b: Box) -> float:
+    """Returns the intersection over union of two [x1, y1, x2, y2] boxes."""
+    inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    intersection = inter_w * inter_h
+    union = box_area(box_a) + box_area(box_b) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def box_areas(boxes: np.ndarray) -> np.ndarray:
+    """Returns the areas of an Nx4 array of [x1, y1, x2, y2] boxes."""
+    sizes = np.clip(boxes[:, 2:] - boxes[:, :2], 0, None)
+    return sizes[:, 0] * sizes[:, 1]
+
+
+def box_intersection_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Returns the (len(a), len(b)) matrix of intersection areas of two box arrays."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    sizes = np.clip(bottom_right - top_left, 0, None)
+    return sizes[..., 0] * sizes[..., 1]
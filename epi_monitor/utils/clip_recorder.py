@@ -0,0 +1,248 @@
+import datetime
+import logging
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from epi_monitor.config.settings import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Global clip recorder, started by start_clip_recorder
+clip_recorder = None
+
+# (capture timestamp, JPEG bytes)
+ClipFrame = Tuple[float, bytes]
+
+
+@dataclass
+class PendingClip:
+    """A clip still collecting its post-event frames."""
+
+    path: Path
+    start_time: float
+    end_time: float
+    frames: List[ClipFrame]
+
+
+class ClipRecorder:
+    """
+    Keeps the last `pre_event_s` seconds of every camera in memory, sampled at
+    `fps` and stored as downscaled JPEGs. `save_clip` turns the buffer into a
+    clip that keeps collecting frames until `post_event_s` after the event;
+    finished clips are written to disk by a background thread. Events close
+    together share a clip, which is extended up to `max_clip_s`.
+    """
+
+    def __init__(
+        self,
+        clip_dir: Path,
+        pre_event_s: float = 10.0,
+        post_event_s: float = 5.0,
+        fps: float = 10.0,
+        max_clip_s: float = 60.0,
+        max_dimension: int = 960,
+        jpeg_quality: int = 75,
+        max_queue_size: int = 8,
+    ):
+        self.clip_dir = Path(clip_dir)
+        self.pre_event_s = pre_event_s
+        self.post_event_s = post_event_s
+        self.fps = max(1.0, fps)
+        self.max_clip_s = max(max_clip_s, pre_event_s + post_event_s)
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self._buffer_size = max(1, int(pre_event_s * self.fps))
+        self._buffers: Dict[str, Deque[ClipFrame]] = {}
+        self._last_sample: Dict[str, float] = {}
+        self._pending: Dict[str, PendingClip] = {}
+        self._queue: "queue.Queue[PendingClip]" = queue.Queue(
+            maxsize=max(1, max_queue_size)
+        )
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="clip-writer", daemon=True
+        )
+
+        self.written: int = 0
+        self.dropped: int = 0  # Clips lost because the writer fell behind
+        self.failed: int = 0
+
+    def start(self) -> None:
+        self.clip_dir.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Writes the clips still collecting frames, then stops the writer."""
+        for pending in self._pending.values():
+            self._enqueue(pending)
+        self._pending.clear()
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+
+    def add_frame(self, camera_id: str, frame: np.ndarray, timestamp: float) -> None:
+        """
+        Buffers the frame if it is due for the sampling rate. Called by the
+        output stage for every frame, before anything is drawn on it.
+        """
+        last_sample = self._last_sample.get(camera_id)
+        if last_sample is not None and timestamp - last_sample < 1.0 / self.fps:
+            return
+        self._last_sample[camera_id] = timestamp
+        try:
+            clip_frame = (timestamp, self._encode(frame))
+        except (cv2.error, ValueError) as e:
+            logger.error(f"Could not buffer a clip frame for {camera_id}: {e}")
+            return
+
+        buffer = self._buffers.get(camera_id)
+        if buffer is None:
+            buffer = self._buffers[camera_id] = deque(maxlen=self._buffer_size)
+        buffer.append(clip_frame)
+
+        pending = self._pending.get(camera_id)
+        if pending is not None:
+            pending.frames.append(clip_frame)
+            if timestamp >= pending.end_time:
+                del self._pending[camera_id]
+                self._enqueue(pending)
+
+    def save_clip(
+        self, camera_id: str, track_id: int, event_time: float
+    ) -> Optional[Path]:
+        """
+        Starts a clip covering the buffered frames and the `post_event_s`
+        seconds after `event_time`. Returns its path, known immediately; the
+        file appears once the clip is complete.
+        """
+        pending = self._pending.get(camera_id)
+        if pending is not None:
+            pending.end_time = min(
+                max(pending.end_time, event_time + self.post_event_s),
+                pending.start_time + self.max_clip_s,
+            )
+            return pending.path
+
+        frames = list(self._buffers.get(camera_id, ()))
+        start_time = frames[0][0] if frames else event_time
+        timestamp = datetime.datetime.fromtimestamp(event_time).strftime(
+            "%Y-%m-%d_%H-%M-%S"
+        )
+        pending = PendingClip(
+            path=self.clip_dir / f"{timestamp}_{camera_id}_ID_{track_id}.mp4",
+            start_time=start_time,
+            end_time=event_time + self.post_event_s,
+            frames=frames,
+        )
+        self._pending[camera_id] = pending
+        return pending.path
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _encode(self, frame: np.ndarray) -> bytes:
+        h, w = frame.shape[:2]
+        scale = self.max_dimension / max(h, w)
+        if scale < 1:
+            frame = cv2.resize(
+                frame,
+                (round(w * scale), round(h * scale)),
+                interpolation=cv2.INTER_AREA,
+            )
+        ok, buffer = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        )
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    def _enqueue(self, pending: PendingClip) -> None:
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            self.dropped += 1
+            logger.error(f"Clip writer is behind, dropping clip {pending.path}")
+
+    def _run(self) -> None:
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                pending = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._write(pending)
+
+    def _write(self, pending: PendingClip) -> None:
+        if not pending.frames:
+            return
+        writer = None
+        try:
+            first = cv2.imdecode(
+                np.frombuffer(pending.frames[0][1], np.uint8), cv2.IMREAD_COLOR
+            )
+            size = first.shape[1::-1]
+            writer = cv2.VideoWriter(
+                str(pending.path), cv2.VideoWriter_fourcc(*"mp4v"), self.fps, size
+            )
+            for _, jpeg in pending.frames:
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if frame.shape[1::-1] != size:
+                    frame = cv2.resize(frame, size)
+                writer.write(frame)
+            self.written += 1
+            logger.info(f"Event clip saved to {pending.path}")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Could not save event clip {pending.path}. Reason: {e}")
+        finally:
+            if writer is not None:
+                writer.release()
+
+
+def start_clip_recorder() -> None:
+    """Starts the global clip recorder."""
+    global clip_recorder
+    clip_recorder = ClipRecorder(
+        clip_dir=SETTINGS.CLIP_DIR or Path(SETTINGS.EVENT_LOG_DIR) / "clips",
+        pre_event_s=SETTINGS.CLIP_PRE_EVENT_S,
+        post_event_s=SETTINGS.CLIP_POST_EVENT_S,
+        fps=SETTINGS.CLIP_FPS,
+        max_clip_s=SETTINGS.CLIP_MAX_S,
+        max_dimension=SETTINGS.CLIP_MAX_DIMENSION,
+        jpeg_quality=SETTINGS.CLIP_JPEG_QUALITY,
+    )
+    clip_recorder.start()
+    logger.info(f"Clip recorder started, saving to {clip_recorder.clip_dir}")
+
+
+def stop_clip_recorder() -> None:
+    """Writes the pending clips and stops the global clip recorder."""
+    global clip_recorder
+    if clip_recorder:
+        clip_recorder.stop()
+        logger.info(f"Clip recorder stopped: {clip_recorder.stats()}")
+        clip_recorder = None
+
+
+def buffer_frame(camera_id: str, frame: np.ndarray, timestamp: float) -> None:
+    """Feeds a frame to the clip recorder, if it is running."""
+    if clip_recorder is not None:
+        clip_recorder.add_frame(camera_id, frame, timestamp)
+
+
+def save_clip(camera_id: str, track_id: int, event_time: float) -> Optional[Path]:
+    """Starts an event clip. Returns None when the clip recorder is not running."""
+    if clip_recorder is None:
+        return None
+    return clip_recorder.save_clip(camera_id, track_id, event_time)
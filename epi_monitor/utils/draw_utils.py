@@ -1,8 +1,15 @@
-from typing import Any, Dict, List
+from typing import Dict, List, Optional
 
 import cv2
 import numpy as np
 
+from epi_monitor.core.detections import (
+    NO_TRACK,
+    STATUS_NO_ZONE,
+    STATUS_TOO_SMALL,
+    Detections,
+)
+
 # A dictionary mapping class names to specific BGR colors.
 CLASS_NAME_COLORS: Dict[str, tuple[int, int, int]] = {
     # --- EPI Classes ---
@@ -24,22 +31,44 @@ CLASS_NAME_COLORS: Dict[str, tuple[int, int, int]] = {
     "default": (0, 255, 0),  # Green
 }
 
-DetectionDict = Dict[str, Any]
+# Label of the tracked persons (rows with a track ID)
+PERSON_LABEL: str = "Pessoa"
+
+# Persons whose compliance was not checked, drawn in gray with their status
+UNEVALUATED_COLOR: tuple[int, int, int] = (128, 128, 128)
+STATUS_LABELS: Dict[str, str] = {
+    STATUS_TOO_SMALL: "too small to evaluate",
+    STATUS_NO_ZONE: "outside zones",
+}
 
 
-def draw_detections(frame: np.ndarray, detections: List[DetectionDict]) -> np.ndarray:
+def draw_detections(
+    frame: np.ndarray,
+    detections: Detections,
+    class_names: Dict[int, str],
+    unevaluated: Optional[Dict[int, str]] = None,
+) -> np.ndarray:
     """
     Draws bounding boxes and labels for all detections on the frame.
+    Persons are the rows with a track ID; EPI names come from `class_names`.
+    `unevaluated` maps the track IDs of persons that were not evaluated to
+    their status, shown instead of the confidence.
     """
-    for detection in detections:
-        box = [int(i) for i in detection["box"]]
-        x1, y1, x2, y2 = box
-
-        track_id = detection.get("track_id")
-        id_text = f"ID: {track_id} | " if track_id is not None else ""
-        label = f"{id_text}{detection['name']}: {detection['confidence']:.2f}"
+    unevaluated = unevaluated or {}
+    for (x1, y1, x2, y2), confidence, class_id, track_id in detections.tolist():
+        if track_id != NO_TRACK:
+            name = PERSON_LABEL
+            id_text = f"ID: {track_id} | "
+        else:
+            name = class_names.get(class_id, str(class_id))
+            id_text = ""
+        label = f"{id_text}{name}: {confidence:.2f}"
 
-        color = CLASS_NAME_COLORS.get(detection["name"], CLASS_NAME_COLORS["default"])
+        color = CLASS_NAME_COLORS.get(name, CLASS_NAME_COLORS["default"])
+        status = unevaluated.get(track_id) if track_id != NO_TRACK else None
+        if status is not None:
+            label = f"{id_text}{STATUS_LABELS.get(status, status)}"
+            color = UNEVALUATED_COLOR
 
         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
 
@@ -79,10 +108,32 @@ def draw_compliance_status(
     return frame
 
 
-def draw_final_results(
-    frame: np.ndarray, detections: List[DetectionDict], alerts: List[str]
-) -> np.ndarray:
-    """Draws all detections and compliance alerts on the frame."""
-    frame = draw_detections(frame, detections)
-    frame = draw_compliance_status(frame, alerts)
-    return cv2.resize(frame, (800, 600))
+class FrameOverlay:
+    """
+    Draws the detections of a frame on demand.
+    The boxes are drawn in place, at the frame's native resolution and at most
+    once, the first time a consumer (alert snapshot, recorder or viewer) asks
+    for the annotated frame. Frames nobody looks at are never drawn on.
+    """
+
+    def __init__(
+        self,
+        frame: np.ndarray,
+        detections: Detections,
+        class_names: Dict[int, str],
+        unevaluated: Optional[Dict[int, str]] = None,
+    ):
+        self.frame = frame
+        self.detections = detections
+        self.class_names = class_names
+        self.unevaluated = unevaluated
+        self.rendered = False
+
+    def render(self) -> np.ndarray:
+        """Returns the frame with its detections drawn."""
+        if not self.rendered:
+            draw_detections(
+                self.frame, self.detections, self.class_names, self.unevaluated
+            )
+            self.rendered = True
+        return self.frame
@@ -1,7 +1,12 @@
 import datetime
 import logging
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 import cv2
 import numpy as np
@@ -10,22 +15,192 @@ from epi_monitor.config.settings import SETTINGS
 
 logger = logging.getLogger(__name__)
 
+# Worker pool for snapshot encoding and file writes, created on first use
+snapshot_pool: Optional[ThreadPoolExecutor] = None
 
-def log_event(frame_with_detections: np.ndarray, track_id: int) -> Optional[Path]:
+# Suffix of the person-crop thumbnail saved next to every snapshot
+THUMBNAIL_SUFFIX = "_thumb.jpg"
+# Last snapshot of every (camera, track) as (time, dHash, snapshot), oldest
+# first, for deduplication. Entries older than the dedup window are dropped.
+_recent_snapshots: "OrderedDict[Tuple[str, int], Tuple[float, int, Snapshot]]" = (
+    OrderedDict()
+)
+
+
+@dataclass
+class Snapshot:
     """
-    Saves an image of the current frame and returns the path to the saved file.
+    An event image, encoded once in memory. The JPEG bytes are shared by the
+    notifier upload and the file persisted at `path`; the person-crop
+    thumbnail, when there is one, is saved at `thumbnail_path`.
     """
-    log_dir = Path(SETTINGS.EVENT_LOG_DIR)
-    log_dir.mkdir(parents=True, exist_ok=True)
 
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"{timestamp}_ID_{track_id}.jpg"
-    filepath = log_dir / filename
+    path: Path
+    jpeg: "Future[bytes]"
+    thumbnail_path: Optional[Path] = None
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+def _get_snapshot_pool() -> ThreadPoolExecutor:
+    global snapshot_pool
+    if snapshot_pool is None:
+        snapshot_pool = ThreadPoolExecutor(
+            max_workers=SETTINGS.SNAPSHOT_WORKERS, thread_name_prefix="snapshot"
+        )
+    return snapshot_pool
+
 
+def shutdown_snapshot_pool() -> None:
+    """Waits for pending encodes and file writes, then stops the workers."""
+    global snapshot_pool
+    if snapshot_pool is not None:
+        snapshot_pool.shutdown(wait=True)
+        snapshot_pool = None
+
+
+def _encode_jpeg(image: np.ndarray) -> bytes:
+    ok, buffer = cv2.imencode(
+        ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, SETTINGS.SNAPSHOT_JPEG_QUALITY]
+    )
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+def _persist(jpeg: "Future[bytes]", filepath: Path) -> None:
     try:
-        cv2.imwrite(str(filepath), frame_with_detections)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_bytes(jpeg.result())
         logger.info(f"Event image saved to {filepath}")
-        return filepath
+    except Exception as e:
+        logger.error(f"Could not save event image to {filepath}. Reason: {e}")
+
+
+def _prepare_image(frame: np.ndarray) -> np.ndarray:
+    """
+    Downscales the frame to SNAPSHOT_MAX_DIMENSION. The result never shares
+    memory with `frame`, so the caller can keep drawing on it.
+    """
+    h, w = frame.shape[:2]
+    scale = SETTINGS.SNAPSHOT_MAX_DIMENSION / max(h, w)
+    if scale >= 1:
+        return frame.copy()
+    return cv2.resize(
+        frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA
+    )
+
+
+def _prepare_thumbnail(person_crop: np.ndarray) -> np.ndarray:
+    """Downscales the crop to SNAPSHOT_THUMBNAIL_SIZE, never sharing its memory."""
+    h, w = person_crop.shape[:2]
+    scale = SETTINGS.SNAPSHOT_THUMBNAIL_SIZE / max(h, w)
+    if scale >= 1:
+        return person_crop.copy()
+    return cv2.resize(
+        person_crop,
+        (max(1, round(w * scale)), max(1, round(h * scale))),
+        interpolation=cv2.INTER_AREA,
+    )
+
+
+def dhash(image: np.ndarray) -> int:
+    """
+    64-bit difference hash: whether each pixel of a 9x8 grayscale copy is
+    brighter than its right neighbour. Near-identical images have hashes a few
+    bits apart, whatever their size or JPEG noise.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _find_duplicate(
+    camera_id: str, track_id: int, image_hash: int, now: float
+) -> Optional[Snapshot]:
+    """
+    Returns the recent snapshot of the same track when it looks the same.
+    Other tracks are never matched, however similar they look: two persons
+    standing at the same spot must keep their own images.
+    """
+    while _recent_snapshots:
+        saved_at, _, _ = next(iter(_recent_snapshots.values()))
+        if now - saved_at <= SETTINGS.SNAPSHOT_DEDUP_WINDOW_S:
+            break
+        _recent_snapshots.popitem(last=False)
+    if SETTINGS.SNAPSHOT_DEDUP_DISTANCE <= 0:
+        return None
+    recent = _recent_snapshots.get((camera_id, track_id))
+    if recent is None:
+        return None
+    _, saved_hash, snapshot = recent
+    if (saved_hash ^ image_hash).bit_count() <= SETTINGS.SNAPSHOT_DEDUP_DISTANCE:
+        return snapshot
+    return None
+
+
+def snapshot_path(camera_id: str, track_id: int, when: datetime.datetime) -> Path:
+    """
+    Where the snapshot of an event is saved: sharded by day and camera, with a
+    random suffix so that events of the same second never collide.
+    """
+    return (
+        Path(SETTINGS.EVENT_LOG_DIR)
+        / when.strftime("%Y-%m-%d")
+        / camera_id
+        / f"{when:%H-%M-%S}_ID_{track_id}_{uuid.uuid4().hex[:8]}.jpg"
+    )
+
+
+def thumbnail_path(path: Path) -> Path:
+    return path.with_name(path.stem + THUMBNAIL_SUFFIX)
+
+
+def log_event(
+    frame_with_detections: np.ndarray,
+    track_id: int,
+    camera_id: str,
+    person_crop: Optional[np.ndarray] = None,
+) -> Optional[Snapshot]:
+    """
+    Encodes a downscaled image of the current frame, plus a thumbnail of the
+    `person_crop` when given, to JPEG on the snapshot worker pool and saves
+    them to disk in the background.
+    When the last snapshot of the same track is recent and a near-duplicate
+    (see `dhash`), it is returned instead and nothing new is written.
+    Returns the snapshot, whose path is known immediately.
+    """
+    now = time.time()
+    filepath = snapshot_path(camera_id, track_id, datetime.datetime.fromtimestamp(now))
+    try:
+        thumbnail = (
+            _prepare_thumbnail(person_crop)
+            if person_crop is not None and person_crop.size
+            else None
+        )
+        image = _prepare_image(frame_with_detections)
+        image_hash = dhash(thumbnail if thumbnail is not None else image)
+        duplicate = _find_duplicate(camera_id, track_id, image_hash, now)
+        if duplicate is not None:
+            logger.debug(f"Snapshot of track {track_id} reuses {duplicate.path}")
+            return duplicate
+
+        pool = _get_snapshot_pool()
+        jpeg = pool.submit(_encode_jpeg, image)
+        pool.submit(_persist, jpeg, filepath)
+        snapshot = Snapshot(path=filepath, jpeg=jpeg)
+        if thumbnail is not None:
+            snapshot.thumbnail_path = thumbnail_path(filepath)
+            thumbnail_jpeg = pool.submit(_encode_jpeg, thumbnail)
+            pool.submit(_persist, thumbnail_jpeg, snapshot.thumbnail_path)
     except Exception as e:
         logger.error(f"Could not save event image to {filepath}. Reason: {e}")
         return None
+
+    key = (camera_id, track_id)
+    _recent_snapshots.pop(key, None)
+    _recent_snapshots[key] = (now, image_hash, snapshot)
+    return snapshot
@@ -0,0 +1,32 @@
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+LETTERBOX_PAD_VALUE: int = 114
+
+
+def letterbox(
+    image: np.ndarray, size: int, pad_value: int = LETTERBOX_PAD_VALUE
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resizes an image to fit a size x size square keeping its aspect ratio and
+    pads the remaining area.
+    Returns the letterboxed image, the scale factor and the (left, top) padding,
+    which are needed to map coordinates back to the original image.
+    """
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+
+    resized = (
+        image
+        if (new_w, new_h) == (w, h)
+        else cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    )
+
+    pad_left = (size - new_w) // 2
+    pad_top = (size - new_h) // 2
+    canvas = np.full((size, size, image.shape[2]), pad_value, dtype=image.dtype)
+    canvas[pad_top : pad_top + new_h, pad_left : pad_left + new_w] = resized
+    return canvas, scale, (pad_left, pad_top)
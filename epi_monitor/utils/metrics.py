@@ -0,0 +1,484 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from epi_monitor.utils.timing import STAGES, NullTimer
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from 1 ms to 10 s
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+# --- Metric children: one per label set, bound once and reused every frame ---
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class _GaugeChild:
+    __slots__ = ("_value",)
+
+    def __init__(self):
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def get(self) -> float:
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_counts", "_sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # The last slot counts the observations above the largest bucket (+Inf)
+        self._counts: List[int] = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Metric(ABC):
+    """
+    Base class of the metric families. Label sets are bound through `labels`,
+    which creates the child on first use; callers on the hot path keep the
+    child so that recording a value is a lock and an addition, nothing more.
+    Families implement `_new_child` and `_samples`.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> object:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self) -> object:
+        """Creates the child holding the value of one label set."""
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Returns the sample lines of the family, in text format."""
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+    def _items(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} "
+            f"{_format_value(child.get())}"
+            for values, child in self._items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} "
+            f"{_format_value(child.get())}"
+            for values, child in self._items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _samples(self) -> List[str]:
+        lines: List[str] = []
+        for values, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(self.labelnames, values, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+CallbackValues = Dict[Union[str, LabelValues], float]
+
+
+class CallbackMetric(_Metric):
+    """
+    Metric read at scrape time from a function, for values another component
+    already keeps (queue depths, drop counters). Costs nothing between scrapes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._function: Optional[Callable[[], CallbackValues]] = None
+
+    def set_function(self, function: Optional[Callable[[], CallbackValues]]) -> None:
+        self._function = function
+
+    def labels(self, *values: str) -> object:
+        raise TypeError(
+            f"{self.name} is read from a function at scrape time and has no "
+            "children to record into. Use set_function instead."
+        )
+
+    def _new_child(self) -> object:
+        return self.labels()
+
+    def _samples(self) -> List[str]:
+        if self._function is None:
+            return []
+        try:
+            values = self._function()
+        except Exception as e:
+            logger.error(f"Could not collect metric {self.name}: {e}")
+            return []
+        lines: List[str] = []
+        for key, value in values.items():
+            label_values = key if isinstance(key, tuple) else (key,)
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the metric families and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# --- Application metrics ---
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.register(
+    Histogram(
+        "epi_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",)
+    )
+)
+INFERENCE_DURATION = REGISTRY.register(
+    Histogram(
+        "epi_inference_duration_seconds",
+        "Duration of a detector call (one frame or one batch).",
+        ("model",),
+    )
+)
+EPI_CROPS = REGISTRY.register(
+    Counter(
+        "epi_crops_total",
+        "Person crops by stage-2 input size (too_small: not evaluated).",
+        ("bucket",),
+    )
+)
+EPI_BUCKET_DURATION = REGISTRY.register(
+    Histogram(
+        "epi_bucket_inference_duration_seconds",
+        "Duration of a stage-2 batch, by input size.",
+        ("bucket",),
+    )
+)
+FRAME_LATENCY = REGISTRY.register(
+    Histogram(
+        "epi_frame_latency_seconds",
+        "Time from capture to the end of the output stage.",
+        ("camera",),
+    )
+)
+FRAMES_PROCESSED = REGISTRY.register(
+    Counter("epi_frames_processed_total", "Frames fully processed.", ("camera",))
+)
+STARTUP_DURATION = REGISTRY.register(
+    Gauge(
+        "epi_startup_seconds",
+        "Duration of each startup phase; first_frame is the time to the first "
+        "processed frame since the process started.",
+        ("phase",),
+    )
+)
+FRAMES_IDLE = REGISTRY.register(
+    Counter(
+        "epi_frames_idle_total",
+        "Keyframes skipped by the motion gate on a static, empty scene.",
+        ("camera",),
+    )
+)
+FRAMES_STALE = REGISTRY.register(
+    Counter(
+        "epi_frames_stale_total",
+        "Live frames older than CAPTURE_STALE_S when inference picked them up.",
+        ("camera",),
+    )
+)
+CAPTURE_RECONNECTS = REGISTRY.register(
+    Counter(
+        "epi_capture_reconnects_total",
+        "Live streams reopened after being lost.",
+        ("camera",),
+    )
+)
+CAMERA_FPS = REGISTRY.register(
+    Gauge("epi_camera_fps", "Processed frames per second.", ("camera",))
+)
+ACTIVE_TRACKS = REGISTRY.register(
+    Gauge("epi_active_tracks", "Persons tracked in the last frame.", ("camera",))
+)
+FRAMES_DROPPED = REGISTRY.register(
+    CallbackMetric(
+        "epi_frames_dropped_total",
+        "Frames dropped by a full pipeline queue.",
+        ("queue",),
+        kind="counter",
+    )
+)
+QUEUE_DEPTH = REGISTRY.register(
+    CallbackMetric("epi_queue_depth", "Items waiting in a queue.", ("queue",))
+)
+TRACK_STATES = REGISTRY.register(
+    Gauge("epi_track_states", "Tracks held in the track state store.", ("camera",))
+)
+TRACK_STATE_EVICTIONS = REGISTRY.register(
+    Counter(
+        "epi_track_state_evictions_total",
+        "Tracks evicted from the track state store, by reason (ttl, capacity).",
+        ("camera", "reason"),
+    )
+)
+ALERTS = REGISTRY.register(
+    Counter("epi_alerts_total", "Alerts by final notification status.", ("status",))
+)
+NOTIFICATION_DURATION = REGISTRY.register(
+    Histogram(
+        "epi_notification_duration_seconds",
+        "Time to deliver one alert, retries included.",
+    )
+)
+DB_WRITE_DURATION = REGISTRY.register(
+    Histogram("epi_db_write_duration_seconds", "Duration of an event insert.")
+)
+DB_ROWS_WRITTEN = REGISTRY.register(
+    Counter("epi_db_rows_written_total", "Event rows inserted in the database.")
+)
+DB_WRITE_FAILURES = REGISTRY.register(
+    Counter("epi_db_write_failures_total", "Failed event inserts.")
+)
+
+
+class MetricsTimer(NullTimer):
+    """Stage timer feeding the `epi_stage_duration_seconds` histogram."""
+
+    def __init__(self):
+        self._children = {stage: STAGE_DURATION.labels(stage) for stage in STAGES}
+
+    def record(self, stage: str, seconds: float) -> None:
+        child = self._children.get(stage)
+        if child is None:
+            child = self._children[stage] = STAGE_DURATION.labels(stage)
+        child.observe(seconds)
+
+
+class FrameRateMeter:
+    """
+    Per-camera FPS as an exponential moving average of the frame interval,
+    published to the `epi_camera_fps` gauge.
+    """
+
+    def __init__(self, camera_id: str, smoothing: float = 0.1):
+        self.smoothing = smoothing
+        self._gauge = CAMERA_FPS.labels(camera_id)
+        self._last_time: Optional[float] = None
+        self._interval: Optional[float] = None
+
+    def tick(self) -> None:
+        now = time.monotonic()
+        if self._last_time is not None:
+            interval = now - self._last_time
+            self._interval = (
+                interval
+                if self._interval is None
+                else self._interval + self.smoothing * (interval - self._interval)
+            )
+            if self._interval > 0:
+                self._gauge.set(1.0 / self._interval)
+        self._last_time = now
+
+
+# --- HTTP endpoint ---
+class MetricsServer:
+    """Serves the registry on GET /metrics from a background thread."""
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="metrics-server", daemon=True
+        )
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._httpd.server_address[:2]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# Global server, started once at startup
+metrics_server = None
+
+
+def start_metrics_server(host: str, port: int) -> None:
+    """Starts the global metrics endpoint. Failure to bind is not fatal."""
+    global metrics_server
+    try:
+        metrics_server = MetricsServer(REGISTRY, host, port)
+    except OSError as e:
+        logger.error(f"Could not start metrics endpoint on {host}:{port}: {e}")
+        return
+    metrics_server.start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+
+
+def stop_metrics_server() -> None:
+    global metrics_server
+    if metrics_server:
+        metrics_server.stop()
+        metrics_server = None
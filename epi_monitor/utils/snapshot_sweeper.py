@@ -0,0 +1,185 @@
+import datetime
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.db.database import clear_event_image_paths
+from epi_monitor.utils.event_logger import THUMBNAIL_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+# Global sweeper, started by start_snapshot_sweeper
+snapshot_sweeper = None
+
+# (modification time, size in bytes, path)
+SnapshotFile = Tuple[float, int, Path]
+
+
+class SnapshotSweeper:
+    """
+    Enforces the retention policy of the snapshot store from a background
+    thread, every `interval_s`: day directories older than `retention_days`
+    are deleted, then the oldest snapshots go until the store fits in
+    `budget_bytes`. Events whose image was deleted get their image_path
+    cleared; when the database is down, the paths are kept for the next sweep.
+    Only the day directories (YYYY-MM-DD) of `root` are swept, so clips and
+    files saved before sharding are left alone. 0 disables a limit.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        retention_days: int = 30,
+        budget_bytes: int = 0,
+        interval_s: float = 600.0,
+    ):
+        self.root = Path(root)
+        self.retention_days = retention_days
+        self.budget_bytes = budget_bytes
+        self.interval_s = interval_s
+        self._uncleared: List[str] = []  # Deleted images still set in the database
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="snapshot-sweeper", daemon=True
+        )
+
+        self.deleted_files: int = 0
+        self.deleted_bytes: int = 0
+        self.cleared_rows: int = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "deleted_files": self.deleted_files,
+            "deleted_bytes": self.deleted_bytes,
+            "cleared_rows": self.cleared_rows,
+            "uncleared_paths": len(self._uncleared),
+        }
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sweep()
+            except OSError as e:
+                logger.error(f"Snapshot sweep failed: {e}")
+            if self._stop_event.wait(self.interval_s):
+                break
+
+    def sweep(self, today: Optional[datetime.date] = None) -> None:
+        """Deletes what the policy no longer allows and updates the events."""
+        today = today or datetime.date.today()
+        files: List[SnapshotFile] = []
+        for day, day_dir in self._day_dirs():
+            day_files = self._list_files(day_dir)
+            if self.retention_days and (today - day).days > self.retention_days:
+                self._delete(day_files)
+                self._remove_empty_dirs(day_dir)
+            else:
+                files.extend(day_files)
+
+        total = sum(size for _, size, _ in files)
+        if self.budget_bytes and total > self.budget_bytes:
+            files.sort()
+            excess = total - self.budget_bytes
+            to_delete: List[SnapshotFile] = []
+            for snapshot_file in files:
+                if excess <= 0:
+                    break
+                to_delete.append(snapshot_file)
+                excess -= snapshot_file[1]
+            self._delete(to_delete)
+            logger.info(
+                f"Snapshot store over its budget, deleted {len(to_delete)} files."
+            )
+        self._clear_image_paths()
+
+    def _day_dirs(self) -> List[Tuple[datetime.date, Path]]:
+        """The day directories of the store, oldest first."""
+        if not self.root.is_dir():
+            return []
+        days: List[Tuple[datetime.date, Path]] = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            try:
+                days.append((datetime.date.fromisoformat(entry.name), Path(entry.path)))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    @staticmethod
+    def _list_files(directory: Path) -> List[SnapshotFile]:
+        files: List[SnapshotFile] = []
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _delete(self, files: List[SnapshotFile]) -> None:
+        for _, size, path in files:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            self.deleted_files += 1
+            self.deleted_bytes += size
+            # Thumbnails are not referenced by the events
+            if not path.name.endswith(THUMBNAIL_SUFFIX):
+                self._uncleared.append(str(path))
+
+    @staticmethod
+    def _remove_empty_dirs(day_dir: Path) -> None:
+        for dirpath, _, _ in sorted(os.walk(day_dir), reverse=True):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+    def _clear_image_paths(self) -> None:
+        if not self._uncleared:
+            return
+        try:
+            self.cleared_rows += clear_event_image_paths(self._uncleared)
+            self._uncleared = []
+        except (psycopg2.Error, ConnectionError) as e:
+            logger.error(
+                f"Could not clear the image path of {len(self._uncleared)} "
+                f"deleted snapshots, retrying at the next sweep: {e}"
+            )
+
+
+def start_snapshot_sweeper() -> None:
+    """Starts the global snapshot sweeper."""
+    global snapshot_sweeper
+    snapshot_sweeper = SnapshotSweeper(
+        root=SETTINGS.EVENT_LOG_DIR,
+        retention_days=SETTINGS.SNAPSHOT_RETENTION_DAYS,
+        budget_bytes=SETTINGS.SNAPSHOT_DISK_BUDGET_MB * 1024 * 1024,
+        interval_s=SETTINGS.SNAPSHOT_SWEEP_INTERVAL_S,
+    )
+    snapshot_sweeper.start()
+    logger.info(f"Snapshot sweeper started on {snapshot_sweeper.root}")
+
+
+def stop_snapshot_sweeper() -> None:
+    global snapshot_sweeper
+    if snapshot_sweeper:
+        snapshot_sweeper.stop()
+        logger.info(f"Snapshot sweeper stopped: {snapshot_sweeper.stats()}")
+        snapshot_sweeper = None
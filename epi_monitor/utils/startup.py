@@ -0,0 +1,44 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from epi_monitor.utils.metrics import STARTUP_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """
+    Wall-clock breakdown of the startup of a process. Phases may overlap (the
+    models load while the cameras connect), so they do not add up to the
+    total; `first_frame` measures the time until the first processed frame.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: Optional[float]) -> None:
+        if seconds is None:
+            return
+        self.phases[name] = seconds
+        STARTUP_DURATION.labels(name).set(seconds)
+
+    def mark_first_frame(self) -> None:
+        """Records the time to the first frame and logs the breakdown, once."""
+        if "first_frame" in self.phases:
+            return
+        self.record("first_frame", time.perf_counter() - self.started_at)
+        breakdown = ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in self.phases.items()
+        )
+        logger.info(f"Startup: {breakdown}")
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+# Pipeline stages timed through `record`
+STAGES = (
+    "motion",
+    "person_detection",
+    "tracking",
+    "crop",
+    "epi_inference",
+    "evaluation",
+    "draw",
+    "notify",
+    "clip",
+    "db",
+)
+
+
+class NullTimer:
+    """Default timer: discards every measurement."""
+
+    def record(self, stage: str, seconds: float) -> None:
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class StageTimer(NullTimer):
+    """
+    Keeps every duration recorded per stage, for offline analysis such as the
+    benchmark suite. Not meant for long-running processes.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.samples[stage].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns count, total and mean/p50/p95/p99 (in ms) for every stage."""
+        return {
+            stage: summarize_ms(durations)
+            for stage, durations in self.samples.items()
+        }
+
+
+def summarize_ms(durations: List[float]) -> Dict[str, float]:
+    """Summarizes durations given in seconds; statistics are in milliseconds."""
+    if not durations:
+        return {"count": 0, "total_ms": 0.0}
+    values = np.asarray(durations) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "total_ms": float(values.sum()),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
@@ -0,0 +1,47 @@
+import argparse
+import logging
+import time
+
+from epi_monitor.config.logging_config import setup_logging
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.db.database import (
+    close_db_pool,
+    create_events_table,
+    initialize_db_pool,
+)
+from epi_monitor.db.query_server import EventQueryServer
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    setup_logging()
+    parser = argparse.ArgumentParser(
+        description=(
+            "Serve the event history as JSON on GET /events, read-only. Filters: "
+            "camera_id, since, until, missing (repeatable), limit, cursor."
+        )
+    )
+    parser.add_argument("--host", default=SETTINGS.EVENTS_API_HOST)
+    parser.add_argument("--port", type=int, default=SETTINGS.EVENTS_API_PORT)
+    args = parser.parse_args()
+
+    initialize_db_pool()
+    # Also builds the indexes the queries rely on, if they are missing
+    create_events_table()
+    server = EventQueryServer(args.host, args.port)
+    server.start()
+    host, port = server.address
+    logger.info(f"Event history available at http://{host}:{port}/events")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping the event history server.")
+    finally:
+        server.stop()
+        close_db_pool()
+
+
+if __name__ == "__main__":
+    main()
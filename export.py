@@ -0,0 +1,89 @@
+import argparse
+import logging
+from typing import Dict, List
+
+import numpy as np
+
+from epi_monitor.config.logging_config import setup_logging
+from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.detector import BACKENDS, PRECISIONS, Detector
+from epi_monitor.core.export import (
+    compare_detectors,
+    export_model,
+    person_crops,
+    sample_frames,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def export_models(
+    backend: str, precision: str, calibration_source: str, frames: int, compare: bool
+):
+    """
+    Exports the person and EPI models for a backend and, optionally, checks
+    that their detections match the original PyTorch models.
+    """
+    calibration_frames: List[np.ndarray] = []
+    if precision == "int8" or compare:
+        calibration_frames = sample_frames(calibration_source, frames)
+
+    # The person model sees full frames, the EPI model sees person crops
+    images: Dict[str, List[np.ndarray]] = {"person": calibration_frames, "epi": []}
+    if calibration_frames:
+        images["epi"] = person_crops(
+            calibration_frames, SETTINGS.MODEL_PERSON_PATH, SETTINGS.PERSON_CLASS_NAME
+        )
+
+    models = {
+        "person": (SETTINGS.MODEL_PERSON_PATH, SETTINGS.PERSON_CONFIDENCE_THRESHOLD),
+        "epi": (SETTINGS.EPI_DETECTOR_PATH, SETTINGS.EPI_CONFIDENCE_THRESHOLD),
+    }
+    for name, (model_path, conf) in models.items():
+        export_model(
+            model_path,
+            backend,
+            precision,
+            imgsz=SETTINGS.IMG_SIZE,
+            calibration_images=images[name] if precision == "int8" else None,
+            device=SETTINGS.INFERENCE_DEVICE,
+        )
+        if compare:
+            candidate = Detector(
+                model_path, backend=backend, device="cpu", precision=precision
+            )
+            report = compare_detectors(
+                Detector(model_path, device="cpu"),
+                candidate,
+                images[name],
+                conf=conf,
+            )
+            logger.info(f"{name} model, torch vs {backend} {precision}: {report}")
+
+
+def main() -> None:
+    setup_logging()
+    parser = argparse.ArgumentParser(
+        description="Export the person and EPI models for CPU-optimized inference."
+    )
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="openvino")
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32")
+    parser.add_argument(
+        "--calibration-source",
+        default=str(SETTINGS.VIDEO_SOURCE),
+        help="Video used to sample calibration/validation frames.",
+    )
+    parser.add_argument("--frames", type=int, default=SETTINGS.CALIBRATION_FRAMES)
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Compare the exported models against the PyTorch models.",
+    )
+    args = parser.parse_args()
+    export_models(
+        args.backend, args.precision, args.calibration_source, args.frames, args.compare
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,164 +1,286 @@
 import logging
-from typing import Any, Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 import cv2
 
+from epi_monitor.config.cameras import load_camera_configs
 from epi_monitor.config.logging_config import setup_logging
 from epi_monitor.config.settings import SETTINGS
+from epi_monitor.core.capture import VideoSource
+from epi_monitor.core.crop_buckets import build_crop_buckets
 from epi_monitor.core.detector import Detector
-from epi_monitor.core.evaluator import Evaluator
-from epi_monitor.core.processing import process_person_track
+from epi_monitor.core.epi_cache import EpiResultCache
+from epi_monitor.core.frame_processor import CameraState, build_frame_processor
+from epi_monitor.core.motion_gate import build_motion_gate
+from epi_monitor.core.output import OutputStage
+from epi_monitor.core.pipeline import END_OF_STREAM, Pipeline, is_live_source
+from epi_monitor.core.processing import EPI_MODE_CROP, EPI_MODE_FULL_FRAME
+from epi_monitor.core.tracking import PersonTracker
+from epi_monitor.core.zones import build_zone_map
 from epi_monitor.db.database import (
     close_db_pool,
     create_events_table,
     initialize_db_pool,
 )
-from epi_monitor.notification.notifications import handle_notifications
+from epi_monitor.db.event_writer import start_event_writer, stop_event_writer
+from epi_monitor.db.rollups import start_rollup_writer, stop_rollup_writer
+from epi_monitor.notification.dispatcher import NotificationDispatcher
 from epi_monitor.notification.notifier import Notifier
-from epi_monitor.utils.draw_utils import draw_detections, draw_final_results
+from epi_monitor.utils.clip_recorder import start_clip_recorder, stop_clip_recorder
+from epi_monitor.utils.event_logger import shutdown_snapshot_pool
+from epi_monitor.utils.metrics import (
+    FRAMES_DROPPED,
+    QUEUE_DEPTH,
+    MetricsTimer,
+    start_metrics_server,
+    stop_metrics_server,
+)
+from epi_monitor.utils.snapshot_sweeper import (
+    start_snapshot_sweeper,
+    stop_snapshot_sweeper,
+)
+from epi_monitor.utils.startup import StartupProfile
 
-DetectionDict = Dict[str, Any]
+
+def stop_services() -> None:
+    """
+    Stops the background services started during setup, in dependency order:
+    pending snapshots and clips are written before the events that reference
+    them are flushed, and the database pool closes last.
+    """
+    shutdown_snapshot_pool()
+    stop_clip_recorder()
+    stop_snapshot_sweeper()
+    stop_event_writer()
+    stop_rollup_writer()
+    close_db_pool()
+    stop_metrics_server()
 
 
 def main() -> None:
+    startup = StartupProfile()
+
     # --- Setup ---
-    setup_logging()
-    logger = logging.getLogger(__name__)
-    initialize_db_pool()
-    create_events_table()
+    with startup.phase("settings"):
+        setup_logging()
+        logger = logging.getLogger(__name__)
+        camera_configs = load_camera_configs()
+    with startup.phase("services"):
+        if SETTINGS.METRICS_ENABLED:
+            start_metrics_server(SETTINGS.METRICS_HOST, SETTINGS.METRICS_PORT)
+        initialize_db_pool()
+        create_events_table()
+        start_event_writer()
+        if SETTINGS.ROLLUPS_ENABLED:
+            start_rollup_writer()
+        if SETTINGS.CLIPS_ENABLED:
+            start_clip_recorder()
+        start_snapshot_sweeper()
 
     # --- Initialization ---
     logger.info("Initializing application components...")
-    person_detector = Detector(SETTINGS.MODEL_PERSON_PATH)
-    person_class_id: int = next(
-        cid
-        for cid, name in person_detector.model.names.items()
-        if name == SETTINGS.PERSON_CLASS_NAME
+    person_detector = Detector(
+        SETTINGS.MODEL_PERSON_PATH,
+        backend=SETTINGS.INFERENCE_BACKEND,
+        device=SETTINGS.INFERENCE_DEVICE,
+        precision=SETTINGS.INFERENCE_PRECISION,
+        name="person",
     )
-
-    epi_detector = Detector(SETTINGS.EPI_DETECTOR_PATH)
-    epi_class_names: Dict[int, str] = epi_detector.model.names
-    epi_model_person_class_id: int = next(
-        (
-            cid
-            for cid, name in epi_class_names.items()
-            if name == SETTINGS.EPI_MODEL_IGNORE_CLASS_NAME
-        ),
-        None,
+    epi_detector = Detector(
+        SETTINGS.EPI_DETECTOR_PATH,
+        backend=SETTINGS.INFERENCE_BACKEND,
+        device=SETTINGS.INFERENCE_DEVICE,
+        precision=SETTINGS.INFERENCE_PRECISION,
+        name="epi",
     )
 
-    required_ppe_names: List[str] = [
-        "Capacete de seguranca",
-        "Oculos de protecao",
-        "Luvas de protecao",
-    ]
-    required_ppe_ids: List[int] = [
-        cid for cid, name in epi_class_names.items() if name in required_ppe_names
-    ]
-    evaluator = Evaluator(
-        required_ppe_ids=required_ppe_ids, class_names=epi_class_names
-    )
+    # Models load and warm up in the background while the cameras connect
+    person_sizes: List[Optional[int]] = [None]
+    epi_sizes: List[Optional[int]] = list(build_crop_buckets().sizes)
+    if any(
+        (c.epi_mode or SETTINGS.EPI_MODE) == EPI_MODE_FULL_FRAME for c in camera_configs
+    ):
+        epi_sizes.append(SETTINGS.EPI_FULL_FRAME_IMG_SIZE)
+    model_loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-loader")
+    if SETTINGS.STARTUP_WARMUP:
+        models_ready = [
+            model_loader.submit(
+                person_detector.warmup, person_sizes, len(camera_configs)
+            ),
+            model_loader.submit(epi_detector.warmup, epi_sizes),
+        ]
+    else:
+        models_ready = [
+            model_loader.submit(person_detector.load),
+            model_loader.submit(epi_detector.load),
+        ]
 
-    notifier = Notifier(SETTINGS.DISCORD_WEBHOOK_URL)
-    cap = cv2.VideoCapture(
-        str(SETTINGS.VIDEO_SOURCE)
-        if not str(SETTINGS.VIDEO_SOURCE).isdigit()
-        else int(SETTINGS.VIDEO_SOURCE)
+    notifier = Notifier(
+        SETTINGS.DISCORD_WEBHOOK_URL,
+        timeout_s=SETTINGS.NOTIFICATION_TIMEOUT_S,
+        max_retries=SETTINGS.NOTIFICATION_MAX_RETRIES,
+        backoff_base_s=SETTINGS.NOTIFICATION_BACKOFF_S,
+    )
+    dispatcher = NotificationDispatcher(
+        notifier, max_queue_size=SETTINGS.NOTIFICATION_QUEUE_SIZE
     )
 
-    if not cap.isOpened():
-        logger.critical(f"Error: Could not open video source: {SETTINGS.VIDEO_SOURCE}")
-        return
+    # --- Cameras ---
+    captures: Dict[str, VideoSource] = {}
+    cameras: Dict[str, CameraState] = {}
+    video_writers: Dict[str, cv2.VideoWriter] = {}
+    record_sizes: Dict[str, Tuple[int, int]] = {}
+    cameras_start = time.perf_counter()
+    for camera_config in camera_configs:
+        camera_id, source = camera_config.camera_id, camera_config.source
+        cap = VideoSource(
+            source,
+            live=is_live_source(source),
+            camera_id=camera_id,
+            reconnect_initial_s=SETTINGS.CAPTURE_RECONNECT_INITIAL_S,
+            reconnect_max_s=SETTINGS.CAPTURE_RECONNECT_MAX_S,
+            max_reconnect_attempts=SETTINGS.CAPTURE_RECONNECT_MAX_ATTEMPTS,
+        )
+        if not cap.open():
+            logger.critical(f"Error: Could not open video source: {source}")
+            for opened_cap in captures.values():
+                opened_cap.release()
+            model_loader.shutdown(wait=False, cancel_futures=True)
+            notifier.close()
+            stop_services()
+            return
+        captures[camera_id] = cap
 
-    # --- Video Recording Setup ---
-    video_writer = None
-    if SETTINGS.RECORD_VIDEO:
-        output_path = str(SETTINGS.OUTPUT_VIDEO_PATH)
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         fps = int(cap.get(cv2.CAP_PROP_FPS))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        video_writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        logger.info(f"Recording enabled. Output will be saved to {output_path}")
+        epi_mode = camera_config.epi_mode or SETTINGS.EPI_MODE
+        cameras[camera_id] = CameraState(
+            camera_id=camera_id,
+            tracker=PersonTracker(frame_rate=fps),
+            epi_cache=(
+                EpiResultCache(
+                    ttl_s=SETTINGS.EPI_CACHE_TTL_S,
+                    min_iou=SETTINGS.EPI_CACHE_MIN_IOU,
+                    max_scale_change=SETTINGS.EPI_CACHE_MAX_SCALE_CHANGE,
+                )
+                if SETTINGS.EPI_CACHE_TTL_S > 0 and epi_mode == EPI_MODE_CROP
+                else None
+            ),
+            frame_stride=max(0, SETTINGS.SKIP_FRAMES) + 1,
+            epi_mode=epi_mode,
+            zones=build_zone_map(camera_config.zones),
+            motion_gate=build_motion_gate(camera_id),
+        )
+
+        # --- Video Recording Setup ---
+        if SETTINGS.RECORD_VIDEO:
+            output_path = Path(SETTINGS.OUTPUT_VIDEO_PATH)
+            if len(camera_configs) > 1:
+                output_path = output_path.with_name(
+                    f"{output_path.stem}_{camera_id}{output_path.suffix}"
+                )
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+            record_sizes[camera_id] = (
+                SETTINGS.RECORD_WIDTH or int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                SETTINGS.RECORD_HEIGHT or int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            )
+            video_writers[camera_id] = cv2.VideoWriter(
+                str(output_path), fourcc, fps, record_sizes[camera_id]
+            )
+            logger.info(f"Recording enabled. {camera_id} is saved to {output_path}")
+    startup.record("cameras", time.perf_counter() - cameras_start)
+
+    with startup.phase("models_wait"):
+        for future in models_ready:
+            future.result()
+        model_loader.shutdown()
+    for name, detector in (("person", person_detector), ("epi", epi_detector)):
+        startup.record(f"{name}_model_load", detector.load_time_s)
+        startup.record(f"{name}_model_warmup", detector.warmup_time_s)
+
+    timer = MetricsTimer()
+    frame_processor = build_frame_processor(
+        person_detector, epi_detector, cameras, timer=timer
+    )
+    pipeline = Pipeline(
+        captures,
+        frame_processor.process_batch,
+        capture_queue_size=SETTINGS.CAPTURE_QUEUE_SIZE,
+        result_queue_size=SETTINGS.RESULT_QUEUE_SIZE,
+        live_queue_size=SETTINGS.LIVE_CAPTURE_QUEUE_SIZE,
+        stale_after_s=SETTINGS.CAPTURE_STALE_S,
+    )
+    FRAMES_DROPPED.set_function(
+        lambda: {name: q["dropped"] for name, q in pipeline.queue_depths().items()}
+    )
+    QUEUE_DEPTH.set_function(
+        lambda: {
+            **{name: q["depth"] for name, q in pipeline.queue_depths().items()},
+            "notifications": dispatcher.queue_depth(),
+        }
+    )
+
+    output_stage = OutputStage(
+        dispatcher,
+        list(cameras),
+        frame_processor.epi_class_names,
+        video_writers=video_writers,
+        record_sizes=record_sizes,
+        headless=SETTINGS.HEADLESS,
+        display_size=(SETTINGS.DISPLAY_WIDTH, SETTINGS.DISPLAY_HEIGHT),
+        timer=timer,
+    )
 
     logger.info("Starting 2-Stage EPI Monitor with Re-ID...")
-    notified_track_ids: Dict[int, float] = {}
+    last_stats_time = time.monotonic()
 
-    # --- Main Loop ---
+    # --- Main Loop (output stage) ---
+    dispatcher.start()
+    pipeline.start()
     try:
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                logger.info("End of video stream.")
+            result = pipeline.get_result()
+            if result is END_OF_STREAM:
                 break
 
-            person_results = person_detector.model.track(
-                frame,
-                persist=True,
-                tracker="botsort.yaml",
-                verbose=False,
-                conf=SETTINGS.PERSON_CONFIDENCE_THRESHOLD,
-            )
-
-            all_detections: List[DetectionDict] = []
-            non_compliance_events = []
-
-            if person_results[0].boxes.id is not None:
-                for box in person_results[0].boxes:
-                    if int(box.cls) != person_class_id:
-                        continue
-
-                    detections, missing, present, track_id = process_person_track(
-                        box,
-                        frame,
-                        epi_detector,
-                        evaluator,
-                        epi_class_names,
-                        epi_model_person_class_id,
-                    )
-                    all_detections.extend(detections)
-                    if missing:
-                        non_compliance_events.append(
-                            {
-                                "track_id": track_id,
-                                "missing": missing,
-                                "present": present,
-                            }
-                        )
-
-            frame_with_detections = draw_detections(frame.copy(), all_detections)
-            all_display_alerts: List[str] = []
-            for event in non_compliance_events:
-                display_alerts = handle_notifications(
-                    frame_with_detections,
-                    event["missing"],
-                    event["present"],
-                    event["track_id"],
-                    notified_track_ids,
-                    notifier,
-                )
-                all_display_alerts.extend(display_alerts)
-
-            final_frame = draw_final_results(frame, all_detections, all_display_alerts)
-            cv2.imshow("EPI Monitor", final_frame)
-
-            if video_writer:
-                resized_frame = cv2.resize(final_frame, (width, height))
-                video_writer.write(resized_frame)
+            if time.monotonic() - last_stats_time > SETTINGS.PIPELINE_STATS_INTERVAL_S:
+                logger.info(f"Pipeline queues: {pipeline.queue_depths()}")
+                logger.info(f"Capture: {pipeline.capture_stats()}")
+                last_stats_time = time.monotonic()
 
-            if cv2.waitKey(1) & 0xFF == ord("q"):
-                logger.info("Quit key pressed. Finalizing video recording.")
+            if result is None:
+                continue
+            keep_running = output_stage.handle(result)
+            startup.mark_first_frame()
+            if not keep_running:
                 break
+    except KeyboardInterrupt:
+        logger.info("Interrupted. Finalizing video recording.")
     finally:
         # --- Cleanup ---
         logger.info("Releasing resources.")
-        if video_writer is not None:
-            logger.info("Finalizing video file. This may take a moment...")
-            video_writer.release()
-            logger.info("Video file has been saved.")
-        cap.release()
-        cv2.destroyAllWindows()
-        close_db_pool()
+        pipeline.stop()
+        logger.info(f"Pipeline queues: {pipeline.queue_depths()}")
+        logger.info(f"Capture: {pipeline.capture_stats()}")
+        logger.info("Sending pending notifications...")
+        dispatcher.stop()
+        logger.info(f"Notification results: {dispatcher.status_counts}")
+        for camera_id, camera in cameras.items():
+            if camera.epi_cache is not None:
+                logger.info(f"EPI cache stats {camera_id}: {camera.epi_cache.stats()}")
+        logger.info(f"Stage-2 crop buckets: {frame_processor.crop_buckets.stats()}")
+        if video_writers:
+            logger.info("Finalizing video files. This may take a moment...")
+            for video_writer in video_writers.values():
+                video_writer.release()
+            logger.info("Video files have been saved.")
+        for cap in captures.values():
+            cap.release()
+        if not SETTINGS.HEADLESS:
+            cv2.destroyAllWindows()
+        stop_services()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import threading
+from typing import Dict, List, Optional
+
+import pytest
+
+from epi_monitor.benchmark.stubs import StubResponse, StubWebhookServer
+from epi_monitor.notification.dispatcher import NotificationDispatcher
+from epi_monitor.notification.notifier import (
+    STATUS_DROPPED,
+    STATUS_FAILED,
+    STATUS_SENT,
+    Notifier,
+)
+
+
+@pytest.fixture
+def webhook_factory():
+    """Starts stub webhook servers and stops them after the test."""
+    servers: List[StubWebhookServer] = []
+
+    def start(
+        delay_s: float = 0.0, responses: Optional[List[StubResponse]] = None
+    ) -> StubWebhookServer:
+        server = StubWebhookServer(delay_s=delay_s, responses=responses)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+class StatusRecorder:
+    """Collects the statuses reported through `on_complete`."""
+
+    def __init__(self):
+        self.statuses: List[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, status: str) -> None:
+        with self._lock:
+            self.statuses.append(status)
+
+
+def _dispatch(notifier: Notifier, alerts: int = 1, **kwargs) -> StatusRecorder:
+    """Sends `alerts` alerts through a dispatcher and waits for all of them."""
+    recorder = StatusRecorder()
+    dispatcher = NotificationDispatcher(notifier, **kwargs)
+    dispatcher.start()
+    for i in range(alerts):
+        dispatcher.submit(f"alert {i}", on_complete=recorder)
+    dispatcher.stop(timeout=30.0)
+    return recorder
+
+
+def _gaps(server: StubWebhookServer) -> List[float]:
+    times = server.request_times
+    return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+def test_rate_limit_is_retried_after_the_requested_delay(webhook_factory):
+    server = webhook_factory(responses=[(429, {"Retry-After": "0.3"})])
+    # A large exponential backoff shows that Retry-After is used instead
+    notifier = Notifier(server.url, backoff_base_s=5.0, max_backoff_s=10.0)
+
+    recorder = _dispatch(notifier)
+
+    assert recorder.statuses == [STATUS_SENT]
+    assert server.requests == 2
+    assert 0.25 <= _gaps(server)[0] < 2.0
+
+
+def test_server_errors_are_retried_with_exponential_backoff(webhook_factory):
+    server = webhook_factory(responses=[(503, {}), (500, {})])
+    notifier = Notifier(server.url, max_retries=3, backoff_base_s=0.1)
+
+    recorder = _dispatch(notifier)
+
+    assert recorder.statuses == [STATUS_SENT]
+    assert server.requests == 3
+    first, second = _gaps(server)
+    assert first >= 0.09
+    assert second >= 0.19
+
+
+def test_persistent_server_errors_fail_after_the_last_retry(webhook_factory):
+    server = webhook_factory(responses=[(502, {})] * 10)
+    notifier = Notifier(server.url, max_retries=2, backoff_base_s=0.01)
+
+    recorder = _dispatch(notifier)
+
+    assert recorder.statuses == [STATUS_FAILED]
+    assert server.requests == 3
+
+
+def test_client_errors_fail_without_retrying(webhook_factory):
+    server = webhook_factory(responses=[(400, {})])
+    notifier = Notifier(server.url, max_retries=3, backoff_base_s=0.01)
+
+    recorder = _dispatch(notifier)
+
+    assert recorder.statuses == [STATUS_FAILED]
+    assert server.requests == 1
+
+
+def test_timeout_fails(webhook_factory):
+    server = webhook_factory(delay_s=1.0)
+    notifier = Notifier(server.url, timeout_s=0.1, max_retries=1, backoff_base_s=0.01)
+
+    recorder = _dispatch(notifier)
+
+    assert recorder.statuses == [STATUS_FAILED]
+    assert server.requests == 2
+
+
+def test_full_queue_drops_new_alerts(webhook_factory):
+    server = webhook_factory()
+    dispatcher = NotificationDispatcher(Notifier(server.url), max_queue_size=2)
+    recorder = StatusRecorder()
+
+    # Not started yet, so nothing leaves the queue
+    accepted = [
+        dispatcher.submit(f"alert {i}", on_complete=recorder) for i in range(5)
+    ]
+    assert accepted == [True, True, False, False, False]
+    assert recorder.statuses == [STATUS_DROPPED] * 3
+
+    dispatcher.start()
+    dispatcher.stop(timeout=30.0)
+
+    assert recorder.statuses == [STATUS_DROPPED] * 3 + [STATUS_SENT] * 2
+    assert server.requests == 2
+    expected: Dict[str, int] = {STATUS_DROPPED: 3, STATUS_SENT: 2}
+    assert dispatcher.status_counts == expected
@@ -0,0 +1,71 @@
+from epi_monitor.core.track_state import TrackStateStore
+
+DAY_S = 24 * 60 * 60
+
+
+class FakeClock:
+    """Time that only moves when the test says so."""
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        self.now = start
+
+    def advance(self, seconds: float) -> float:
+        self.now += seconds
+        return self.now
+
+
+def test_store_stays_bounded_over_30_days_of_new_track_ids():
+    # A busy camera: a new track every 10 s, each visible for about 1 minute
+    ttl_s, max_tracks, tick_s, visible_ticks = 30.0, 500, 10.0, 6
+    clock = FakeClock()
+    store = TrackStateStore(ttl_s=ttl_s, max_tracks=max_tracks, camera_id="test")
+
+    ticks = int(30 * DAY_S / tick_s)
+    largest = 0
+    for tick in range(ticks):
+        now = clock.advance(tick_s)
+        # The tracker never reuses IDs: track `tick` is new, older ones leave
+        for track_id in range(max(0, tick - visible_ticks + 1), tick + 1):
+            store.observe(track_id, frame_idx=tick, now=now)
+        store.evict_expired(now=now)
+        largest = max(largest, len(store))
+
+    # Only the tracks seen within the TTL are left
+    assert largest <= visible_ticks + int(ttl_s / tick_s)
+    assert len(store) <= visible_ticks + int(ttl_s / tick_s)
+    assert store.evictions["capacity"] == 0
+    assert store.evictions["ttl"] + len(store) == ticks
+    assert 0 not in store
+    assert ticks - 1 in store
+
+
+def test_capacity_evicts_least_recently_seen_tracks():
+    clock = FakeClock()
+    store = TrackStateStore(ttl_s=DAY_S, max_tracks=100)
+
+    for track_id in range(10_000):
+        now = clock.advance(1.0)
+        store.observe(track_id, frame_idx=track_id, now=now)
+        # Track 0 stays in the scene the whole time
+        store.observe(0, frame_idx=track_id, now=now)
+        store.evict_expired(now=now)
+        assert len(store) <= 100
+
+    assert len(store) == 100
+    assert store.evictions == {"ttl": 0, "capacity": 10_000 - 100}
+    assert 0 in store
+    assert 9_999 in store
+    assert 9_900 not in store
+
+
+def test_notification_state_is_evicted_with_the_track():
+    clock = FakeClock()
+    store = TrackStateStore(ttl_s=10.0, max_tracks=100)
+
+    store.mark_notified(1, now=clock.now)
+    assert store.last_notified(1) == clock.now
+
+    store.evict_expired(now=clock.advance(11.0))
+    assert 1 not in store
+    assert store.last_notified(1) is None
+    assert store.stats() == {"size": 0, "ttl": 1, "capacity": 0}